@@ -57,14 +57,24 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 100
+    'PAGE_SIZE': 100,
+    # Reverse proxies in front of the app; client IPs for throttling are read
+    # from X-Forwarded-For only this many hops deep (0 = use REMOTE_ADDR)
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
 
 
 TURKANA_LATITUDE = 3.1167
 TURKANA_LONGITUDE = 35.5989
+TURKANA_ELEVATION = 506  # metres, used when POWER does not report one
+DEFAULT_LOCATION_NAME = "Turkana County"
 
-NASA_POWER_API_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+# County bounding box (min_lon, min_lat, max_lon, max_lat) used to validate coordinates
+TURKANA_BBOX = (33.8, 1.6, 36.7, 5.6)
+
+NASA_POWER_API_URL = os.getenv(
+    "NASA_POWER_API_URL", "https://power.larc.nasa.gov/api/temporal/daily/point"
+)
 NASA_POWER_PARAMETERS = [
     "PRECTOTCORR",  # Precipitation
     "T2M",  # Temperature at 2m
@@ -72,8 +82,68 @@ NASA_POWER_PARAMETERS = [
     "T2M_MIN",  # Minimum Temperature
     "RH2M",  # Relative Humidity
     "WS2M",  # Wind Speed at 2m
+    "ALLSKY_SFC_SW_DWN",  # Solar Radiation (for Penman-Monteith)
+]
+
+NASA_POWER_HOURLY_API_URL = os.getenv(
+    "NASA_POWER_HOURLY_API_URL", "https://power.larc.nasa.gov/api/temporal/hourly/point"
+)
+NASA_POWER_HOURLY_PARAMETERS = [
+    "PRECTOTCORR",  # Precipitation (mm/hour)
+    "T2M",  # Temperature at 2m
+    "RH2M",  # Relative Humidity
+    "WS2M",  # Wind Speed at 2m
+    "ALLSKY_SFC_SW_DWN",  # Solar Radiation (Wh/m²)
 ]
 
+# Regional (bounding box) POWER requests used to cover many locations at once.
+# Point the URLs at `manage.py serve_power_stub` to work against recorded payloads.
+NASA_POWER_REGIONAL = {
+    'url': os.getenv("NASA_POWER_REGIONAL_API_URL", "https://power.larc.nasa.gov/api/temporal/daily/regional"),
+    'parameters_per_request': 1,  # upstream limit for regional requests
+    'padding_degrees': 0.5,  # added around the bbox so edge locations have a cell
+    'max_cell_distance_km': 75,  # locations further than this from every cell are skipped
+}
+
+# Concurrent multi-location weather sync
+WEATHER_INGESTION = {
+    'workers': 8,  # concurrent NASA POWER requests
+    'write_batch_rows': 5000,  # rows coalesced into one upsert
+    'refetch_days': 7,  # recent days fetched again, as POWER revises them
+    'default_years': 5,  # history fetched for a location never synced
+}
+
+# Mirror every daily write into the packed per-year series (prediction.series).
+# When on, predictions and climatology read their daily arrays from it wherever
+# the snapshot below does not cover a location, and WeatherData otherwise.
+# Run build_weather_series after turning it on.
+WEATHER_SERIES_STORAGE = False
+
+# Memory-mapped columnar snapshot of all daily data, re-exported after each
+# ingest and shared by every worker process (prediction.snapshot)
+WEATHER_SNAPSHOT = {
+    'enabled': True,
+    'directory': os.getenv('WEATHER_SNAPSHOT_DIR', str(BASE_DIR / 'var' / 'weather_snapshot')),
+    'keep': 2,  # published versions kept for readers still mapping them
+}
+
+# Long-term normals served by the climatology endpoint (prediction.climatology)
+CLIMATOLOGY = {
+    'base_period': None,  # (first_year, last_year), e.g. (1991, 2020); None uses every stored year
+    'window_days': 5,  # centered window pooled into each day-of-year normal
+    'min_month_coverage': 0.8,  # share of a month's days needed for it to count towards monthly normals
+}
+
+# Live Server-Sent Events stream at /prediction/events/ (prediction.events);
+# needs an ASGI server such as `uvicorn backend.asgi:application`
+EVENT_STREAM = {
+    'poll_seconds': 5,  # how often each process checks for new alerts, conditions and syncs
+    'heartbeat_seconds': 15,  # comment sent on idle connections so proxies keep them open
+    'retry_ms': 3000,  # reconnect delay suggested to browsers
+    'queue_size': 100,  # events buffered per client before it is disconnected
+    'backlog': 1000,  # recent events kept for Last-Event-ID resumption
+}
+
 # Weather prediction thresholds for Turkana
 DROUGHT_THRESHOLDS = {
     'severe_drought': 50,  # mm/month
@@ -86,6 +156,69 @@ FLOOD_THRESHOLDS = {
     'severe_flood': 200,  # mm/month
     'moderate_flood': 150,  # mm/month
 }
+
+# Rules evaluated on every ingested batch of daily data (prediction.alerts).
+# 'rolling_sum' fires when `field` summed over the last `days` days reaches
+# `threshold`; 'month_deficit' fires when month-to-date rainfall is at least
+# `percent` below the climatology normal to date, from `min_days` into the month.
+ALERT_RULES = [
+    {'name': 'heavy_rain_3day', 'kind': 'rolling_sum', 'field': 'precipitation',
+     'days': 3, 'threshold': 50, 'severity': 'high'},  # mm
+    {'name': 'heavy_rain_7day', 'kind': 'rolling_sum', 'field': 'precipitation',
+     'days': 7, 'threshold': 80, 'severity': 'critical'},  # mm
+    {'name': 'rainfall_deficit', 'kind': 'month_deficit', 'field': 'precipitation',
+     'percent': 50, 'min_days': 10, 'severity': 'medium'},
+]
+
+# Hourly rainfall intensity that raises flash-flood risk regardless of the
+# monthly total (Turkwel and Kerio basins flood within hours)
+FLASH_FLOOD_THRESHOLDS = {
+    'severe_flood': 40,  # mm/hour
+    'moderate_flood': 20,  # mm/hour
+}
+
+# Monthly supply/demand model for water sources. Recharge and evaporation
+# are fractions of a source's capacity.
+WATER_BALANCE = {
+    'liters_per_person_per_day': 15,
+    'liters_per_livestock_per_day': 20,
+    # share of capacity refilled per 100mm of monthly rainfall
+    'recharge_per_100mm': {'borehole': 0.05, 'well': 0.10, 'river': 0.60, 'lake': 0.20, 'dam': 0.35},
+    # share of capacity refilled each month regardless of rain (groundwater baseflow)
+    'baseflow': {'borehole': 0.03, 'well': 0.01, 'river': 0.0, 'lake': 0.0, 'dam': 0.0},
+    # share of capacity lost per month per °C above 20°C (open-water evaporation)
+    'evaporation_per_degree': {'borehole': 0.0, 'well': 0.001, 'river': 0.004, 'lake': 0.004, 'dam': 0.006},
+    'initial_storage': 0.5,  # storage at the start of the projection, as a share of capacity
+    'risk_storage': 0.2,  # below this share of capacity a month counts as at risk
+}
+
+# Chatbot conversation context sent to the LLM
+CHATBOT_CONTEXT = {
+    'max_turns': 6,  # recent turns kept verbatim
+    'token_budget': 1500,  # approx tokens for history, summary and the new message
+    'summary_max_chars': 1200,  # cap on the rolled-up summary of older turns
+}
+
+# Per-client token bucket for the chatbot endpoint. Set 'backend' to 'cache'
+# and point 'cache_alias' at a shared cache (database/file) to enforce the
+# limit across worker processes; 'key' may be 'ip' or 'session' (per existing
+# session within each client IP).
+CHATBOT_RATE_LIMIT = {
+    'rate_per_minute': 6,
+    'burst': 10,
+    'key': 'ip',
+    'backend': 'memory',
+    'cache_alias': 'default',
+}
+
+# Where archive_chat_messages writes compressed chat history
+CHAT_ARCHIVE_DIR = BASE_DIR / 'archive' / 'chat'
+
+# Concurrent Groq calls allowed per process before new ones are rejected
+CHATBOT_ADMISSION = {
+    'max_inflight': 8,
+    'retry_after': 5,  # seconds
+}
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -1,3 +1,22 @@
 from django.contrib import admin
+from .models import ChatMessage, ChatSession
 
-# Register your models here.
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_at', 'updated_at']
+    ordering = ['-updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'summarized_until']
+    show_full_result_count = False
+
+
+@admin.register(ChatMessage)
+class ChatMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'session', 'intent', 'created_at']
+    list_filter = ['intent']
+    search_fields = ['user_message']
+    ordering = ['-created_at', '-id']
+    raw_id_fields = ['session']
+    readonly_fields = ['created_at']
+    # Skip the COUNT(*) over the whole table on every changelist page
+    show_full_result_count = False
@@ -0,0 +1,83 @@
+from django.conf import settings
+
+from .models import ChatSession
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def get_session(session_id=None) -> ChatSession:
+    """Return the requested session, or start a new one"""
+    if session_id:
+        session = ChatSession.objects.filter(pk=session_id).first()
+        if session:
+            return session
+    return ChatSession.objects.create()
+
+
+def load_recent_turns(session: ChatSession) -> list:
+    """Load the newest turns not yet rolled into the summary, newest first
+
+    One query over the (session, created_at) index, fetching at most
+    max_turns rows no matter how long the conversation is.
+    """
+    limit = settings.CHATBOT_CONTEXT["max_turns"]
+    messages = session.messages.all()
+    if session.summarized_until:
+        messages = messages.filter(created_at__gt=session.summarized_until)
+    return list(messages.order_by("-created_at", "-id")[:limit])
+
+
+def fit_to_budget(turns: list, user_message: str, summary: str) -> list:
+    """Keep the newest turns that fit the token budget, returned oldest first"""
+    budget = (
+        settings.CHATBOT_CONTEXT["token_budget"]
+        - estimate_tokens(user_message)
+        - estimate_tokens(summary)
+    )
+
+    kept = []
+    for turn in turns:
+        cost = estimate_tokens(turn.user_message) + estimate_tokens(turn.bot_response)
+        if cost > budget:
+            break
+        budget -= cost
+        kept.append(turn)
+    kept.reverse()
+    return kept
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def roll_up(session: ChatSession, turns: list) -> None:
+    """Fold turns beyond the window into the session's running summary
+
+    `turns` is the newest-first list from load_recent_turns, taken before the
+    current message was stored. Once the window is full the oldest turn is
+    compressed into a one-line summary entry, so at most one turn is folded
+    per request and the summary never exceeds summary_max_chars.
+    """
+    config = settings.CHATBOT_CONTEXT
+    if len(turns) < config["max_turns"]:
+        return
+
+    oldest = turns[-1]
+    entry = (
+        f"- User asked: {_clip(oldest.user_message, 160)} "
+        f"Answer: {_clip(oldest.bot_response, 200)}"
+    )
+    summary = f"{session.summary}\n{entry}" if session.summary else entry
+
+    # Drop the oldest summary lines first when over the cap
+    limit = config["summary_max_chars"]
+    while len(summary) > limit and "\n" in summary:
+        summary = summary.split("\n", 1)[1]
+
+    session.summary = _clip(summary, limit) if len(summary) > limit else summary
+    session.summarized_until = oldest.created_at
+    session.save(update_fields=["summary", "summarized_until", "updated_at"])
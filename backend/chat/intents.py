@@ -0,0 +1,225 @@
+import math
+import re
+import time
+from collections import Counter
+
+from django.utils import timezone
+
+from climate.models import WaterSource
+from prediction.models import Location, WeatherPrediction
+
+
+# Minimum cosine similarity before a message is treated as a known intent
+MATCH_THRESHOLD = 0.3
+
+# How long the list of known village names is reused before re-reading it
+VILLAGE_CACHE_SECONDS = 300
+
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'be', 'of', 'to', 'for', 'in', 'on',
+    'at', 'and', 'or', 'what', 'whats', 'which', 'how', 'me', 'my', 'i', 'we',
+    'you', 'can', 'do', 'does', 'there', 'any', 'please', 'tell', 'about', 'it',
+    'get', 'much', 'many', 'so', 'far', 'right', 'now',
+}
+
+# Example phrasings per intent; these make up the TF-IDF index
+INTENT_EXAMPLES = {
+    'alert_level': [
+        "what is the current alert level",
+        "is there a drought alert",
+        "is there a flood warning",
+        "current weather conditions",
+        "what is the drought situation this month",
+        "are we in a drought",
+        "current risk level",
+    ],
+    'monthly_rainfall': [
+        "how much rain this month",
+        "rainfall this month",
+        "total precipitation this month",
+        "how much has it rained this month",
+        "current month rainfall",
+    ],
+    'water_sources': [
+        "water sources in village",
+        "where can i get water in village",
+        "boreholes near village",
+        "wells in village",
+        "nearest water source to village",
+        "where is the nearest borehole",
+        "list dams and rivers near village",
+    ],
+}
+
+# Keyword guards: an intent is only accepted if its pattern also matches.
+# Alert questions also need a status cue, so general drought questions
+# ("what does moderate drought mean?") still go to the LLM
+INTENT_PATTERNS = {
+    'alert_level': re.compile(r'^(?=.*\b(alerts?|warnings?|drought|flood|conditions?|situation|risk)\b)'
+                              r'(?=.*\b(current(ly)?|now|today|this (month|week)|level|alerts?|warnings?'
+                              r'|are we in)\b)', re.S),
+    'monthly_rainfall': re.compile(r'\b(rain\w*|precipitation)\b.*\b(this|current) month\b'
+                                   r'|\b(this|current) month\b.*\b(rain\w*|precipitation)\b'),
+    'water_sources': re.compile(r'\b(water|boreholes?|wells?|dams?|rivers?|lakes?|sources?)\b'),
+}
+
+TOKEN_RE = re.compile(r"[a-z]+")
+
+
+def _tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class TfidfIndex:
+    """Small in-memory TF-IDF index over labelled example phrases"""
+
+    def __init__(self, examples):
+        documents = [(label, _tokenize(text))
+                     for label, texts in examples.items() for text in texts]
+
+        document_frequency = Counter()
+        for _, tokens in documents:
+            document_frequency.update(set(tokens))
+
+        total = len(documents)
+        self.idf = {
+            token: math.log((1 + total) / (1 + count)) + 1
+            for token, count in document_frequency.items()
+        }
+        self.vectors = [(label, self._vectorize(tokens)) for label, tokens in documents]
+
+    def _vectorize(self, tokens):
+        counts = Counter(t for t in tokens if t in self.idf)
+        vector = {t: c * self.idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        if not norm:
+            return {}
+        return {t: v / norm for t, v in vector.items()}
+
+    def best_match(self, text):
+        """Return (label, score) of the closest example phrase"""
+        query = self._vectorize(_tokenize(text))
+        best_label, best_score = None, 0.0
+        for label, vector in self.vectors:
+            score = sum(w * vector.get(t, 0.0) for t, w in query.items())
+            if score > best_score:
+                best_label, best_score = label, score
+        return best_label, best_score
+
+
+class IntentRouter:
+    """Answer common data questions locally so they skip the LLM"""
+
+    def __init__(self):
+        self.index = TfidfIndex(INTENT_EXAMPLES)
+        self._villages = []
+        self._villages_loaded_at = None
+
+    def classify(self, message):
+        """Return the matched intent name, or None for open-ended questions"""
+        text = message.lower()
+        # Known village names are replaced by the placeholder used in the examples
+        village = self._find_village(text)
+        if village:
+            text = text.replace(village.lower(), 'village')
+
+        label, score = self.index.best_match(text)
+        if label is None or score < MATCH_THRESHOLD:
+            return None
+        if not INTENT_PATTERNS[label].search(text):
+            return None
+        return label
+
+    def answer(self, message):
+        """Return (intent, reply) when the message can be served locally, else None"""
+        intent = self.classify(message)
+        if intent is None:
+            return None
+
+        handler = getattr(self, f'_answer_{intent}')
+        reply = handler(message)
+        if reply is None:
+            return None
+        return intent, reply
+
+    def _latest_prediction(self):
+        now = timezone.now()
+        predictions = WeatherPrediction.objects.filter(location=Location.get_default())
+        prediction = predictions.filter(year=now.year, month=now.month).first()
+        if prediction is None:
+            prediction = predictions.order_by('-year', '-month').first()
+        return prediction
+
+    def _period_label(self, prediction):
+        now = timezone.now()
+        period = prediction.date.strftime('%B %Y')
+        if prediction.year == now.year and prediction.month == now.month:
+            return f"this month ({period})"
+        return f"the latest assessed month ({period})"
+
+    def _answer_alert_level(self, message):
+        prediction = self._latest_prediction()
+        if prediction is None:
+            return None
+
+        return (
+            f"The alert level for {self._period_label(prediction)} is "
+            f"{prediction.get_severity_display().upper()}: {prediction.get_condition_display()}.\n"
+            f"{prediction.description}\n\n"
+            f"Recommendations:\n{prediction.recommendations}"
+        )
+
+    def _answer_monthly_rainfall(self, message):
+        prediction = self._latest_prediction()
+        if prediction is None:
+            return None
+
+        return (
+            f"Rainfall for {self._period_label(prediction)} is "
+            f"{prediction.monthly_precipitation:.1f}mm, with an average temperature of "
+            f"{prediction.avg_temperature:.1f}°C and {prediction.avg_humidity:.1f}% humidity. "
+            f"Conditions are classified as {prediction.get_condition_display()}."
+        )
+
+    def _known_villages(self):
+        if (self._villages_loaded_at is None
+                or time.monotonic() - self._villages_loaded_at > VILLAGE_CACHE_SECONDS):
+            names = (WaterSource.objects.exclude(nearest_village__isnull=True)
+                     .exclude(nearest_village='')
+                     .values_list('nearest_village', flat=True).distinct())
+            # Longest names first so "Lodwar Town" wins over "Lodwar"
+            self._villages = sorted({n.strip() for n in names}, key=len, reverse=True)
+            self._villages_loaded_at = time.monotonic()
+        return self._villages
+
+    def _find_village(self, text):
+        return next(
+            (v for v in self._known_villages()
+             if re.search(rf'\b{re.escape(v.lower())}\b', text)),
+            None
+        )
+
+    def _answer_water_sources(self, message):
+        village = self._find_village(message.lower())
+        if village is None:
+            return None
+
+        sources = list(
+            WaterSource.objects.filter(nearest_village__iexact=village).order_by('name')
+        )
+        if not sources:
+            return None
+
+        lines = [
+            f"• {s.name} ({s.get_water_type_display()}) - condition: {s.condition}"
+            for s in sources
+        ]
+        return f"Water sources near {village}:\n" + "\n".join(lines)
+
+
+router = IntentRouter()
+
+
+def answer_locally(message):
+    """Return (intent, reply) if the message can be answered from our own data"""
+    return router.answer(message)
@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from chat.models import ChatMessage
+
+
+ARCHIVE_FIELDS = ['id', 'session_id', 'user_message', 'bot_response', 'intent', 'created_at']
+
+
+class Command(BaseCommand):
+    help = 'Move chat messages older than N days into compressed archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Archive messages older than this many days (default: 90)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Messages written and deleted per batch (default: 5000)'
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=None,
+            help='Directory for archive files (default: CHAT_ARCHIVE_DIR)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Write archive files but keep the messages in the database'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        output_dir = Path(options['output_dir'] or settings.CHAT_ARCHIVE_DIR)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        self.stdout.write(f'Archiving chat messages created before {cutoff:%Y-%m-%d %H:%M} to {output_dir}')
+
+        started = time.monotonic()
+        archived = 0
+        files = 0
+        position = None
+
+        while True:
+            # Keyset walk over the (created_at, id) index, oldest first
+            queryset = ChatMessage.objects.filter(created_at__lt=cutoff)
+            if position:
+                queryset = queryset.filter(
+                    Q(created_at__gt=position[0]) | Q(created_at=position[0], id__gt=position[1])
+                )
+            batch = list(queryset.order_by('created_at', 'id').values(*ARCHIVE_FIELDS)[:batch_size])
+            if not batch:
+                break
+
+            path = self._write_batch(output_dir, batch)
+            files += 1
+
+            if not dry_run:
+                with transaction.atomic():
+                    ChatMessage.objects.filter(id__in=[row['id'] for row in batch]).delete()
+
+            archived += len(batch)
+            position = (batch[-1]['created_at'], batch[-1]['id'])
+            self.stdout.write(f'  ✓ {len(batch)} messages -> {path.name}')
+
+        elapsed = time.monotonic() - started
+        rate = archived / elapsed if elapsed else 0
+        action = 'Archived (dry run, not deleted)' if dry_run else 'Archived'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ {action} {archived} messages into {files} files in {elapsed:.1f}s ({rate:.0f} msg/s)'
+            )
+        )
+
+    def _write_batch(self, output_dir, batch):
+        """Write one gzip JSON-lines file; renamed into place only once complete"""
+        first, last = batch[0], batch[-1]
+        path = output_dir / f"chat-{first['created_at']:%Y%m%d}-{first['id']}-{last['id']}.jsonl.gz"
+        tmp_path = path.with_name(path.name + '.tmp')
+
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as fh:
+            for row in batch:
+                fh.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+                fh.write('\n')
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='intent',
+            field=models.CharField(blank=True, default='', help_text='Local intent that answered the message; empty when the LLM answered', max_length=50),
+        ),
+    ]
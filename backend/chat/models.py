@@ -1,11 +1,43 @@
+import uuid
+
 from django.db import models
 
 
 # Create your models here.
+class ChatSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    summary = models.TextField(
+        blank=True, help_text="Running summary of turns that fell out of the context window"
+    )
+    summarized_until = models.DateTimeField(
+        null=True, blank=True, help_text="Messages created at or before this are in the summary"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"ChatSession {self.id} started {self.created_at}"
+
+
 class ChatMessage(models.Model):
+    session = models.ForeignKey(
+        ChatSession, on_delete=models.CASCADE, related_name="messages", null=True, blank=True
+    )
     user_message = models.TextField()
     bot_response = models.TextField()
+    intent = models.CharField(
+        max_length=50, blank=True, default='',
+        help_text="Local intent that answered the message; empty when the LLM answered"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["session", "created_at"], name="chat_msg_session_created_idx"),
+            # Backs keyset pagination, retention sweeps and admin ordering
+            models.Index(fields=["created_at", "id"], name="chat_msg_created_id_idx"),
+        ]
+
     def __str__(self):
-        return f"ChatMessage by {self.user.username} on {self.created_at}"
+        return f"ChatMessage {self.id} on {self.created_at}"
@@ -0,0 +1,98 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ChatHistoryPagination(BasePagination):
+    """Keyset pagination over (created_at, id), newest first
+
+    A cursor holds the (created_at, id) of the row at the edge of a page, and
+    the next page is the rows strictly before it in that order, fetched with a
+    range condition on the (created_at, id) index instead of OFFSET. Deep pages
+    cost the same as the first one, and rows sharing a timestamp are neither
+    skipped nor repeated.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if position is not None:
+            created_at, pk = position
+            if reverse:
+                queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            else:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        ordering = ("created_at", "id") if reverse else ("-created_at", "-id")
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            # Moving backwards we came from an older page
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, position is not None
+        self.next_position = (rows[-1].created_at, rows[-1].pk) if rows and has_next else None
+        self.previous_position = (rows[0].created_at, rows[0].pk) if rows and has_previous else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        """((created_at, id), reverse) from the request's cursor, or (None, False) on the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            created_at, pk, reverse = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            created_at = parse_datetime(created_at)
+            if created_at is None or reverse not in ("0", "1"):
+                raise ValueError
+            return (created_at, int(pk)), reverse == "1"
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        created_at, pk = position
+        cursor = f"{created_at.isoformat()}|{pk}|{int(reverse)}"
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, base64.urlsafe_b64encode(cursor.encode()).decode())
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.encode_cursor(self.next_position, False) if self.next_position else None,
+            "previous": self.encode_cursor(self.previous_position, True) if self.previous_position else None,
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
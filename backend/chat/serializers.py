@@ -10,3 +10,4 @@ class ChatMessageSerializer(serializers.ModelSerializer):
 
 class ChatRequestSerializer(serializers.Serializer):
     message = serializers.CharField()
+    session_id = serializers.UUIDField(required=False)
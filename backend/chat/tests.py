@@ -1,3 +1,134 @@
-from django.test import TestCase
+import uuid
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .intents import IntentRouter
+from .models import ChatMessage, ChatSession
+from .throttling import ChatbotRateThrottle, MemoryBucketStore
+
+
+class IntentRouterTests(TestCase):
+    def setUp(self):
+        self.router = IntentRouter()
+
+    def test_alert_level_questions(self):
+        for message in [
+            "What is the current alert level?",
+            "Is there a drought alert?",
+            "is there a flood warning",
+            "What is the drought situation this month?",
+            "Are we in a drought right now?",
+        ]:
+            with self.subTest(message=message):
+                self.assertEqual(self.router.classify(message), 'alert_level')
+
+    def test_general_drought_questions_go_to_llm(self):
+        for message in [
+            "how can I conserve water during drought",
+            "what does moderate drought mean?",
+            "explain the drought risk for farmers",
+            "is the risk of drought high next year?",
+        ]:
+            with self.subTest(message=message):
+                self.assertIsNone(self.router.classify(message))
+
+    def test_monthly_rainfall_questions(self):
+        for message in ["How much rain this month?", "total precipitation this month"]:
+            with self.subTest(message=message):
+                self.assertEqual(self.router.classify(message), 'monthly_rainfall')
+
+    def test_rainfall_without_month_goes_to_llm(self):
+        self.assertIsNone(self.router.classify("why does it rain so little in Turkana?"))
+
+    def test_no_local_answer_without_data(self):
+        self.assertIsNone(self.router.answer("What is the current alert level?"))
+
+
+class MemoryBucketStoreTests(TestCase):
+    def test_burst_then_refill(self):
+        store = MemoryBucketStore()
+        allowed = [store.consume('ip:1', rate=1.0, capacity=3, now=0.0)[0] for _ in range(4)]
+        self.assertEqual(allowed, [True, True, True, False])
+        self.assertTrue(store.consume('ip:1', rate=1.0, capacity=3, now=1.0)[0])
+        self.assertTrue(store.consume('ip:2', rate=1.0, capacity=3, now=1.0)[0])
+
+
+@override_settings(CHATBOT_RATE_LIMIT={'rate_per_minute': 6, 'burst': 2, 'key': 'session', 'backend': 'memory'})
+class ChatbotRateThrottleTests(TestCase):
+    def request(self, session_id=None, ip='10.0.0.1'):
+        body = {'message': 'hi'}
+        if session_id:
+            body['session_id'] = str(session_id)
+        request = APIRequestFactory().post('/chat/', body, format='json', REMOTE_ADDR=ip)
+        return Request(request, parsers=[JSONParser()])
+
+    def test_invented_sessions_share_the_ip_bucket(self):
+        throttle = ChatbotRateThrottle()
+        keys = {throttle.get_cache_key(self.request(uuid.uuid4())) for _ in range(3)}
+        self.assertEqual(keys, {'ip:10.0.0.1'})
+
+    def test_existing_session_gets_its_own_bucket_per_ip(self):
+        session = ChatSession.objects.create()
+        throttle = ChatbotRateThrottle()
+        self.assertEqual(throttle.get_cache_key(self.request(session.pk)), f'ip:10.0.0.1:session:{session.pk}')
+        self.assertEqual(throttle.get_cache_key(self.request(session.pk, ip='10.0.0.2')),
+                         f'ip:10.0.0.2:session:{session.pk}')
+        self.assertEqual(throttle.get_cache_key(self.request('not-a-uuid')), 'ip:10.0.0.1')
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        request = APIRequestFactory().post('/chat/', {}, format='json', REMOTE_ADDR='10.0.0.1',
+                                           HTTP_X_FORWARDED_FOR='1.2.3.4')
+        self.assertEqual(ChatbotRateThrottle().get_cache_key(Request(request, parsers=[JSONParser()])),
+                         'ip:10.0.0.1')
+
+
+class ChatHistoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.mine, self.other = ChatSession.objects.create(), ChatSession.objects.create()
+        ChatMessage.objects.create(session=self.mine, user_message='hi', bot_response='hello')
+        ChatMessage.objects.create(session=self.other, user_message='secret', bot_response='ok')
+
+    def test_session_is_required_for_anonymous_callers(self):
+        response = self.client.get('/chatbot/history/')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(str(self.other.pk), response.content.decode())
+
+    def test_lists_only_the_requested_session(self):
+        response = self.client.get('/chatbot/history/', {'session': str(self.mine.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['user_message'] for m in response.json()['results']], ['hi'])
+
+    def test_staff_may_list_every_session(self):
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        response = self.client.get('/chatbot/history/')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_pages_walk_equal_timestamps_without_gaps(self):
+        session = ChatSession.objects.create()
+        for i in range(7):
+            ChatMessage.objects.create(session=session, user_message=f'm{i}', bot_response='ok')
+        ChatMessage.objects.filter(session=session).update(created_at=timezone.now())
+        expected = list(ChatMessage.objects.filter(session=session).order_by('-id').values_list('id', flat=True))
+
+        seen, pages = [], []
+        url = f'/chatbot/history/?session={session.pk}&page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            pages.append(page)
+            seen += [message['id'] for message in page['results']]
+            url = page['next']
+        self.assertEqual(seen, expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual([message['id'] for message in previous['results']], expected[3:6])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/chatbot/history/', {'session': str(self.mine.pk), 'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,144 @@
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+from .models import ChatSession
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process"""
+
+    # Buckets that have refilled completely are dropped once the table grows past this
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, capacity, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(rate, capacity, now)
+        return allowed, tokens
+
+    def _prune(self, rate, capacity, now):
+        full_after = capacity / rate
+        self._buckets = {
+            k: v for k, v in self._buckets.items() if now - v[1] < full_after
+        }
+
+
+class CacheBucketStore:
+    """Token buckets kept in a Django cache so every process shares them
+
+    Point `cache_alias` at a DatabaseCache or FileBasedCache (or any shared
+    cache) for limits that hold across workers. The read-modify-write is not
+    atomic, so concurrent requests from one client may occasionally both pass.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def consume(self, key, rate, capacity, now):
+        cache_key = f"chatbot-bucket:{key}"
+        tokens, updated = self.cache.get(cache_key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.cache.set(cache_key, (tokens, now), timeout=math.ceil(capacity / rate) + 1)
+        return allowed, tokens
+
+
+_memory_store = MemoryBucketStore()
+
+
+class ChatbotRateThrottle(BaseThrottle):
+    """Token-bucket limit per client, configured by CHATBOT_RATE_LIMIT"""
+
+    def __init__(self):
+        config = settings.CHATBOT_RATE_LIMIT
+        self.rate = config['rate_per_minute'] / 60.0
+        self.capacity = config['burst']
+        self.key_by = config.get('key', 'ip')
+        if config.get('backend') == 'cache':
+            self.store = CacheBucketStore(config.get('cache_alias', 'default'))
+        else:
+            self.store = _memory_store
+        self.tokens = self.capacity
+
+    def get_cache_key(self, request):
+        key = f"ip:{self.get_ident(request)}"
+        if self.key_by == 'session':
+            session_id = self._existing_session(request)
+            if session_id:
+                # New sessions share the IP bucket, so inventing ids buys no extra requests
+                return f"{key}:session:{session_id}"
+        return key
+
+    def _existing_session(self, request):
+        session_id = request.data.get('session_id') if hasattr(request, 'data') else None
+        if not session_id:
+            return None
+        try:
+            session_id = uuid.UUID(str(session_id))
+        except ValueError:
+            return None
+        return session_id if ChatSession.objects.filter(pk=session_id).exists() else None
+
+    def allow_request(self, request, view):
+        allowed, self.tokens = self.store.consume(
+            self.get_cache_key(request), self.rate, self.capacity, time.time()
+        )
+        return allowed
+
+    def wait(self):
+        # Seconds until the bucket holds one whole token again
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class LLMBusy(APIException):
+    status_code = 503
+    default_detail = "The assistant is busy right now. Please try again shortly."
+    default_code = "llm_busy"
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns this into a Retry-After header
+        self.wait = wait
+
+
+class LLMAdmissionController:
+    """Caps concurrent LLM calls and rejects new ones instead of queueing them"""
+
+    def __init__(self, max_inflight, retry_after):
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_inflight)
+
+    def __enter__(self):
+        if not self._slots.acquire(blocking=False):
+            raise LLMBusy(self.retry_after)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._slots.release()
+        return False
+
+
+llm_admission = LLMAdmissionController(
+    settings.CHATBOT_ADMISSION['max_inflight'],
+    settings.CHATBOT_ADMISSION['retry_after'],
+)
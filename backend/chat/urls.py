@@ -3,4 +3,6 @@ from .views import *
 
 urlpatterns = [
     path("analyze/", ChatbotAnalyzeView.as_view(), name="chatbot-analyze"),
+    path("history/", ChatHistoryListView.as_view(), name="chatbot-history"),
+    path("stats/", ChatbotStatsView.as_view(), name="chatbot-stats"),
 ]
@@ -6,28 +6,52 @@ from django.conf import settings
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
 
-def get_bot_response(user_message: str) -> str:
+def get_bot_response(user_message: str, history=(), summary: str = "") -> str:
     headers = {
         "Authorization": f"Bearer {settings.GROQ_API_KEY}",
         "Content-Type": "application/json",
     }
 
-    data = {
-        "model": "meta-llama/llama-4-scout-17b-16e-instruct",
-        "messages": [
+    messages = [
+        {
+            "role": "system",
+            "content": "You are a water access support.You help people understand the questions they have on the weather graphs, weather predictions, explain the different weather seasons and what they mean and the different water sources they can access.Use the data from different sources which are relevant. If an individual ask about water sources answer based on the person's location by providing the nearest water source available. Dont keep mentioning your name Water support when giving responses",
+        },
+    ]
+
+    if summary:
+        messages.append(
             {
                 "role": "system",
-                "content": "You are a water access support.You help people understand the questions they have on the weather graphs, weather predictions, explain the different weather seasons and what they mean and the different water sources they can access.Use the data from different sources which are relevant. If an individual ask about water sources answer based on the person's location by providing the nearest water source available. Dont keep mentioning your name Water support when giving responses",
-            },
-            {
-                "role": "user",
-                "content": user_message,
-            },
-        ],
+                "content": f"Summary of the earlier conversation:\n{summary}",
+            }
+        )
+
+    # history is a list of ChatMessage turns, oldest first
+    for turn in history:
+        messages.append({"role": "user", "content": turn.user_message})
+        messages.append({"role": "assistant", "content": turn.bot_response})
+
+    messages.append(
+        {
+            "role": "user",
+            "content": user_message,
+        }
+    )
+
+    data = {
+        "model": "meta-llama/llama-4-scout-17b-16e-instruct",
+        "messages": messages,
         "temperature": 0.7,
     }
 
-    response = requests.post(GROQ_API_URL, headers=headers, json=data)
+    try:
+        response = requests.post(GROQ_API_URL, headers=headers, json=data, timeout=30)
+    except requests.exceptions.RequestException as e:
+        print("GROQ API Error:", e)
+        return (
+            "Sorry, I couldn't process your request right now. Please try again later."
+        )
 
     if response.status_code == 200:
         return response.json()["choices"][0]["message"]["content"]
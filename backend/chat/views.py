@@ -1,11 +1,18 @@
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from .serializers import *
 from .models import ChatMessage
 from .utils import get_bot_response
+from .intents import answer_locally
+from .context import get_session, load_recent_turns, fit_to_budget, roll_up
+from .throttling import ChatbotRateThrottle, llm_admission
+from .pagination import ChatHistoryPagination
+from django.db.models import Count, Q
 import re
+import uuid
 
 from datetime import timedelta
 from django.utils import timezone
@@ -13,31 +20,25 @@ from django.utils import timezone
 
 class ChatbotAnalyzeView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [ChatbotRateThrottle]
 
     def post(self, request):
         serializer = ChatRequestSerializer(data=request.data)
         if serializer.is_valid():
-            now = timezone.now()
-            start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            # recent_messages = ChatMessage.objects.filter(
-            #     created_at__gte=start_of_day
-            # ).count()
-
-            # if not request.user.is_subscribed and recent_messages >= two_msg_limit:
-            #     # if recent_messages >= two_msg_limit:
-            #     return Response(
-            #         {
-            #             "error": "You've reached your daily limit of 10 messages. Please subscribe to continue chatting."
-            #         },
-            #         status=403,
-            #     )
-            #
-            #
-
-            # Continue as normal
             user_msg = serializer.validated_data["message"]
-            bot_msg = get_bot_response(user_msg)
+            session = get_session(serializer.validated_data.get("session_id"))
+            recent_turns = load_recent_turns(session)
+
+            # Questions answerable from our own data skip the LLM entirely
+            intent = ""
+            local_answer = answer_locally(user_msg)
+            if local_answer:
+                intent, bot_msg = local_answer
+            else:
+                history = fit_to_budget(recent_turns, user_msg, session.summary)
+                # Raises a 503 straight away when too many LLM calls are in flight
+                with llm_admission:
+                    bot_msg = get_bot_response(user_msg, history, session.summary)
 
           
             clean_bot_msg = re.sub(r'\*{1,2}', '', bot_msg)
@@ -45,8 +46,56 @@ class ChatbotAnalyzeView(APIView):
 
 
             chat = ChatMessage.objects.create(
-                user_message=user_msg, bot_response= clean_bot_msg
+                session=session, user_message=user_msg, bot_response= clean_bot_msg, intent=intent
             )
+            roll_up(session, recent_turns)
 
             return Response(ChatMessageSerializer(chat).data)
         return Response(serializer.errors, status=400)
+
+
+class ChatHistoryListView(ListAPIView):
+    """One session's messages; only staff may list every session's history"""
+    permission_classes = [AllowAny]
+    serializer_class = ChatMessageSerializer
+    pagination_class = ChatHistoryPagination
+
+    def get_queryset(self):
+        queryset = ChatMessage.objects.all()
+        session_id = self.request.query_params.get("session")
+        if not session_id:
+            if not IsAdminUser().has_permission(self.request, self):
+                raise ValidationError({"session": "This query parameter is required."})
+            return queryset
+        try:
+            session_id = uuid.UUID(session_id)
+        except ValueError:
+            raise ValidationError({"session": "Must be a valid session UUID."})
+        return queryset.filter(session_id=session_id)
+
+
+class ChatbotStatsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        stats = ChatMessage.objects.aggregate(
+            total=Count("id"),
+            served_locally=Count("id", filter=~Q(intent="")),
+        )
+        by_intent = (
+            ChatMessage.objects.exclude(intent="")
+            .values("intent")
+            .annotate(count=Count("id"))
+            .order_by("-count")
+        )
+
+        total = stats["total"]
+        return Response(
+            {
+                "total_messages": total,
+                "served_locally": stats["served_locally"],
+                "served_by_llm": total - stats["served_locally"],
+                "local_fraction": round(stats["served_locally"] / total, 4) if total else 0.0,
+                "by_intent": {row["intent"]: row["count"] for row in by_intent},
+            }
+        )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ContactMessage, WaterSource
+from .models import ContactMessage, WaterSource, WaterSourceReading
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
@@ -13,3 +13,12 @@ class WaterSourceAdmin(admin.ModelAdmin):
     list_display = ['name', 'water_type', 'nearest_village', 'condition']
     list_filter = ['water_type', 'condition']
     search_fields = ['name', 'nearest_village']
+
+
+@admin.register(WaterSourceReading)
+class WaterSourceReadingAdmin(admin.ModelAdmin):
+    list_display = ['source', 'timestamp', 'water_level', 'yield_lph', 'functional_status']
+    list_filter = ['functional_status']
+    raw_id_fields = ['source']
+    ordering = ['-timestamp']
+    show_full_result_count = False
@@ -0,0 +1,358 @@
+import codecs
+import csv
+import io
+import json
+import math
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import WaterSource
+from .spatial import KM_PER_DEGREE, bump_version, haversine_km
+
+
+# Rows with the same name closer than this are treated as one source
+DEDUP_RADIUS_KM = 0.1
+
+# Only the first errors are kept in the report; the total is always counted
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FIELDS = [
+    'name', 'water_type', 'latitude', 'longitude', 'nearest_village',
+    'capacity_liters', 'population_served', 'livestock_served', 'condition', 'image',
+]
+WATER_TYPES = {value for value, _ in WaterSource.WATER_TYPES}
+WATER_TYPE_LABELS = {label.lower(): value for value, label in WaterSource.WATER_TYPES}
+
+
+def iter_csv_rows(stream):
+    """Yield (row_number, dict) from a binary or text CSV stream"""
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    for number, row in enumerate(reader, start=2):  # header is line 1
+        yield number, row
+
+
+def iter_geojson_features(stream, chunk_size=64 * 1024):
+    """Yield (feature_number, dict) from a GeoJSON FeatureCollection stream
+
+    Features are decoded one at a time from a sliding buffer, so memory
+    stays proportional to the largest feature rather than the whole file.
+    """
+    decoder = json.JSONDecoder()
+    # Incremental, so a character split across two chunks is decoded whole
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        if isinstance(chunk, bytes):
+            chunk = text_decoder.decode(chunk, final=eof)
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    # Seek to the opening bracket of the "features" array
+    while True:
+        start = buffer.find('"features"', position)
+        if start != -1:
+            bracket = buffer.find('[', start)
+            if bracket != -1:
+                position = bracket + 1
+                break
+        if eof:
+            raise ValueError('No "features" array found in GeoJSON')
+        fill()
+
+    number = 0
+    while True:
+        # Skip whitespace and separators between features
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            fill()
+
+        if position >= len(buffer) or buffer[position] == ']':
+            return
+
+        try:
+            feature, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+
+        position = end
+        number += 1
+        properties = dict(feature.get('properties') or {})
+        geometry = feature.get('geometry') or {}
+        coordinates = geometry.get('coordinates') or []
+        if geometry.get('type') == 'Point' and len(coordinates) >= 2:
+            properties['longitude'], properties['latitude'] = coordinates[0], coordinates[1]
+        yield number, properties
+
+
+def _text(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def clean_row(raw, bbox):
+    """Validate one raw row into WaterSource field values; raises ValueError"""
+    name = _text(raw.get('name'))
+    if not name:
+        raise ValueError('name is required')
+    if len(name) > 100:
+        raise ValueError('name is longer than 100 characters')
+
+    water_type = _text(raw.get('water_type')).lower()
+    water_type = WATER_TYPE_LABELS.get(water_type, water_type)
+    if water_type not in WATER_TYPES:
+        raise ValueError(f"unknown water_type '{raw.get('water_type')}'")
+
+    try:
+        latitude = float(raw.get('latitude'))
+        longitude = float(raw.get('longitude'))
+    except (TypeError, ValueError):
+        raise ValueError('latitude and longitude must be numbers')
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        raise ValueError('latitude and longitude must be finite')
+
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if not (min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon):
+        raise ValueError(f'coordinates ({latitude}, {longitude}) are outside Turkana County')
+
+    capacity = _text(raw.get('capacity_liters'))
+    if capacity:
+        try:
+            capacity = Decimal(capacity).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError(f"capacity_liters '{capacity}' is not a number")
+        if capacity < 0 or capacity >= Decimal('1e10'):
+            raise ValueError('capacity_liters is out of range')
+    else:
+        capacity = None
+
+    counts = {}
+    for field in ('population_served', 'livestock_served'):
+        value = _text(raw.get(field))
+        if not value:
+            counts[field] = None
+            continue
+        try:
+            counts[field] = int(float(value))
+        except ValueError:
+            raise ValueError(f"{field} '{value}' is not a number")
+        if counts[field] < 0:
+            raise ValueError(f'{field} must not be negative')
+
+    return {
+        'name': name,
+        'water_type': water_type,
+        'latitude': Decimal(f'{latitude:.6f}'),
+        'longitude': Decimal(f'{longitude:.6f}'),
+        'nearest_village': _text(raw.get('nearest_village')) or None,
+        'capacity_liters': capacity,
+        **counts,
+        'condition': _text(raw.get('condition')) or 'Unknown',
+        'image': _text(raw.get('image')) or None,
+    }
+
+
+class SpatialHash:
+    """Name + location lookup used to spot duplicate sources"""
+
+    def __init__(self, radius_km=DEDUP_RADIUS_KM):
+        self.radius_km = radius_km
+        self.cell_size = radius_km / KM_PER_DEGREE
+        self._cells = {}
+
+    @staticmethod
+    def _name_key(name):
+        return ' '.join(name.casefold().split())
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def add(self, name, lat, lon, target):
+        row, col = self._cell(lat, lon)
+        self._cells.setdefault((self._name_key(name), row, col), []).append((lat, lon, target))
+
+    def replace(self, name, lat, lon, old, new):
+        """Swap the target of an entry added with `old` for `new`"""
+        row, col = self._cell(lat, lon)
+        entries = self._cells.get((self._name_key(name), row, col), [])
+        for i, (entry_lat, entry_lon, target) in enumerate(entries):
+            if target is old:
+                entries[i] = (entry_lat, entry_lon, new)
+                return
+
+    def find(self, name, lat, lon):
+        """Return the target of a same-named entry within the radius, or None"""
+        key = self._name_key(name)
+        row, col = self._cell(lat, lon)
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                for other_lat, other_lon, target in self._cells.get((key, row + dr, col + dc), ()):
+                    if haversine_km(lat, lon, other_lat, other_lon) <= self.radius_km:
+                        return target
+        return None
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+class WaterSourceImporter:
+    """Stream rows into WaterSource with validation, dedup and chunked writes"""
+
+    def __init__(self, chunk_size=1000, bbox=None):
+        self.chunk_size = chunk_size
+        self.bbox = bbox or settings.TURKANA_BBOX
+        # Targets are primary keys, or the unsaved instance until its chunk is written
+        self.index = SpatialHash()
+        self._to_create = []
+        self._to_update = {}  # pk -> (fields present in the row, WaterSource)
+
+    def _load_existing(self):
+        rows = WaterSource.objects.values_list('id', 'name', 'latitude', 'longitude')
+        for pk, name, lat, lon in rows.iterator(chunk_size=5000):
+            self.index.add(name, float(lat), float(lon), pk)
+
+    def run(self, rows):
+        """Import (row_number, dict) pairs and return an ImportReport"""
+        report = ImportReport()
+        self._load_existing()
+
+        try:
+            for row_number, raw in rows:
+                self._import_row(row_number, raw, report)
+        except (ValueError, csv.Error) as e:
+            # The file itself is malformed; keep what was imported so far
+            report.add_error(None, f'Could not read file: {e}')
+
+        self._flush(report)
+        report.elapsed = time.monotonic() - report.started
+        return report
+
+    def _import_row(self, row_number, raw, report):
+        report.rows += 1
+        try:
+            values = clean_row(raw, self.bbox)
+        except ValueError as e:
+            report.add_error(row_number, str(e))
+            return
+        # Columns missing from the file keep their stored values on update
+        present = {field for field in IMPORT_FIELDS if field in raw}
+
+        lat, lon = float(values['latitude']), float(values['longitude'])
+        match = self.index.find(values['name'], lat, lon)
+
+        if match is None:
+            source = WaterSource(**values)
+            self._to_create.append(source)
+            self.index.add(values['name'], lat, lon, source)
+        elif isinstance(match, WaterSource):
+            # Repeated within the file before being written: last row wins
+            for field, value in values.items():
+                setattr(match, field, value)
+        elif match in self._to_update:
+            fields, source = self._to_update[match]
+            for field in present:
+                setattr(source, field, values[field])
+            self._to_update[match] = (fields | present, source)
+        else:
+            self._to_update[match] = (present, WaterSource(pk=match, **values))
+
+        if len(self._to_create) + len(self._to_update) >= self.chunk_size:
+            self._flush(report)
+
+    def _flush(self, report):
+        if not self._to_create and not self._to_update:
+            return
+
+        now = timezone.now()
+        by_fields = {}
+        for fields, source in self._to_update.values():
+            # bulk_create skips auto_now on conflict updates
+            source.last_updated = now
+            by_fields.setdefault(frozenset(fields), []).append(source)
+        with transaction.atomic():
+            if self._to_create:
+                WaterSource.objects.bulk_create(self._to_create)
+            for fields, updates in by_fields.items():
+                # An upsert on the primary key is one INSERT per chunk, unlike
+                # bulk_update's per-row CASE expressions
+                WaterSource.objects.bulk_create(
+                    updates,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=[field for field in IMPORT_FIELDS if field in fields] + ['last_updated'],
+                )
+            # Bulk writes send no signals, so move the shared version here
+            bump_version()
+
+        # Later rows match written sources by primary key, so instances are not kept
+        for source in self._to_create:
+            self.index.replace(source.name, float(source.latitude), float(source.longitude), source, source.pk)
+
+        report.created += len(self._to_create)
+        report.updated += len(self._to_update)
+        self._to_create = []
+        self._to_update = {}
+
+
+def detect_format(filename, declared=None):
+    if declared:
+        return declared
+    lowered = (filename or '').lower()
+    if lowered.endswith(('.geojson', '.json')):
+        return 'geojson'
+    return 'csv'
+
+
+def import_water_sources(stream, file_format, chunk_size=1000):
+    """Import a CSV or GeoJSON stream and return an ImportReport"""
+    rows = iter_geojson_features(stream) if file_format == 'geojson' else iter_csv_rows(stream)
+    return WaterSourceImporter(chunk_size=chunk_size).run(rows)
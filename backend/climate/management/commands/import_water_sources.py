@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from climate.importers import detect_format, import_water_sources
+
+
+class Command(BaseCommand):
+    help = 'Stream-import water sources from a CSV or GeoJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or GeoJSON file to import')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'geojson'],
+            default=None,
+            help='File format (default: inferred from the file extension)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows written per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--show-errors',
+            type=int,
+            default=20,
+            help='Number of row errors to print (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = detect_format(path, options['format'])
+
+        self.stdout.write(f'Importing water sources from {path} ({file_format})...')
+        try:
+            with open(path, 'rb') as stream:
+                report = import_water_sources(stream, file_format, chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ {report.rows} rows: {report.created} created, {report.updated} updated '
+                f'in {report.elapsed:.1f}s ({report.rows_per_second:.0f} rows/s)'
+            )
+        )
+
+        if report.error_count:
+            self.stdout.write(self.style.WARNING(f'✗ {report.error_count} rows rejected'))
+            for error in report.errors[:options['show_errors']]:
+                self.stdout.write(f"  row {error['row']}: {error['error']}")
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climate', '0002_contactmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='watersource',
+            index=models.Index(fields=['latitude', 'longitude'], name='watersource_lat_lon_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climate', '0003_watersource_lat_lon_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaterSourceReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('water_level', models.FloatField(blank=True, help_text='Water level (m)', null=True)),
+                ('yield_lph', models.FloatField(blank=True, help_text='Yield (litres/hour)', null=True)),
+                ('functional_status', models.CharField(choices=[('functional', 'Functional'), ('partially_functional', 'Partially Functional'), ('non_functional', 'Non-functional')], max_length=25)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='climate.watersource')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['source', 'timestamp'], name='reading_source_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WaterSourceReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('reading_count', models.IntegerField(default=0)),
+                ('functional_count', models.IntegerField(default=0)),
+                ('level_count', models.IntegerField(default=0)),
+                ('level_sum', models.FloatField(default=0)),
+                ('level_min', models.FloatField(blank=True, null=True)),
+                ('level_max', models.FloatField(blank=True, null=True)),
+                ('yield_count', models.IntegerField(default=0)),
+                ('yield_sum', models.FloatField(default=0)),
+                ('yield_min', models.FloatField(blank=True, null=True)),
+                ('yield_max', models.FloatField(blank=True, null=True)),
+                ('last_timestamp', models.DateTimeField()),
+                ('last_status', models.CharField(choices=[('functional', 'Functional'), ('partially_functional', 'Partially Functional'), ('non_functional', 'Non-functional')], max_length=25)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reading_rollups', to='climate.watersource')),
+            ],
+            options={
+                'ordering': ['period_start'],
+                'unique_together': {('source', 'period', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climate', '0004_watersourcereading'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watersource',
+            name='livestock_served',
+            field=models.PositiveIntegerField(blank=True, help_text='Head of livestock watered here', null=True),
+        ),
+        migrations.AddField(
+            model_name='watersource',
+            name='population_served',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
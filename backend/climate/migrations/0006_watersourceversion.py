@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    apps.get_model('climate', 'WaterSourceVersion').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climate', '0005_watersource_demand'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaterSourceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
@@ -29,9 +29,95 @@ class WaterSource(models.Model):
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
     nearest_village = models.CharField(max_length=100, blank=True, null=True)
     capacity_liters = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    population_served = models.PositiveIntegerField(null=True, blank=True)
+    livestock_served = models.PositiveIntegerField(null=True, blank=True, help_text="Head of livestock watered here")
     condition = models.CharField(max_length=100, default='Unknown')
     image = models.URLField(blank=True, null=True)
     last_updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Bounding-box filters range over latitude first, then longitude
+            models.Index(fields=['latitude', 'longitude'], name='watersource_lat_lon_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.water_type})"
+
+
+
+class WaterSourceVersion(models.Model):
+    """Single-row counter bumped by every write to the water source table
+
+    In-memory structures built from the table (spatial index, cluster
+    pyramid, risk results) compare it with the version they were built at,
+    which costs one primary-key read instead of scanning the table.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Water sources version {self.version}"
+
+class WaterSourceReading(models.Model):
+    """Point-in-time measurement of a water source"""
+    STATUS_CHOICES = [
+        ('functional', 'Functional'),
+        ('partially_functional', 'Partially Functional'),
+        ('non_functional', 'Non-functional'),
+    ]
+
+    source = models.ForeignKey(WaterSource, on_delete=models.CASCADE, related_name='readings')
+    timestamp = models.DateTimeField()
+    water_level = models.FloatField(null=True, blank=True, help_text="Water level (m)")
+    yield_lph = models.FloatField(null=True, blank=True, help_text="Yield (litres/hour)")
+    functional_status = models.CharField(max_length=25, choices=STATUS_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['source', 'timestamp'], name='reading_source_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_id} reading at {self.timestamp}"
+
+
+class WaterSourceReadingRollup(models.Model):
+    """Daily, weekly or monthly aggregate of a source's readings
+
+    Sums and counts are stored instead of averages so new readings can be
+    merged into an existing bucket without rereading the raw rows.
+    """
+    PERIOD_CHOICES = [
+        ('day', 'Day'),
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    source = models.ForeignKey(WaterSource, on_delete=models.CASCADE, related_name='reading_rollups')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+
+    reading_count = models.IntegerField(default=0)
+    functional_count = models.IntegerField(default=0)
+
+    level_count = models.IntegerField(default=0)
+    level_sum = models.FloatField(default=0)
+    level_min = models.FloatField(null=True, blank=True)
+    level_max = models.FloatField(null=True, blank=True)
+
+    yield_count = models.IntegerField(default=0)
+    yield_sum = models.FloatField(default=0)
+    yield_min = models.FloatField(null=True, blank=True)
+    yield_max = models.FloatField(null=True, blank=True)
+
+    last_timestamp = models.DateTimeField()
+    last_status = models.CharField(max_length=25, choices=WaterSourceReading.STATUS_CHOICES)
+
+    class Meta:
+        ordering = ['period_start']
+        unique_together = ['source', 'period', 'period_start']
+
+    def __str__(self):
+        return f"{self.source_id} {self.period} from {self.period_start}"
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import WaterSource, ContactMessage
+from .models import WaterSource, WaterSourceReading, ContactMessage
+from .spatial import MAX_CLUSTER_ZOOM, parse_bbox
 
 class ContactMessageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,3 +12,57 @@ class WaterSourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = WaterSource
         fields = '__all__'
+
+
+class NearestWaterSourceQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(default=5, min_value=1, max_value=50)
+    type = serializers.ChoiceField(choices=WaterSource.WATER_TYPES, required=False)
+
+
+class BoundingBoxField(serializers.CharField):
+    """'min_lon,min_lat,max_lon,max_lat' parsed into a tuple of floats"""
+
+    def to_internal_value(self, data):
+        try:
+            return parse_bbox(super().to_internal_value(data))
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+
+class WaterSourceClusterQuerySerializer(serializers.Serializer):
+    bbox = BoundingBoxField(required=False)
+    zoom = serializers.IntegerField(min_value=0, max_value=MAX_CLUSTER_ZOOM)
+
+
+class WaterSourceReadingInputSerializer(serializers.Serializer):
+    """One reading in a bulk append; source ids are checked in bulk by the view"""
+    source = serializers.IntegerField()
+    timestamp = serializers.DateTimeField()
+    water_level = serializers.FloatField(required=False, allow_null=True)
+    yield_lph = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    functional_status = serializers.ChoiceField(choices=WaterSourceReading.STATUS_CHOICES)
+
+
+class WaterSourceHistoryQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    resolution = serializers.ChoiceField(
+        choices=['auto', 'raw', 'day', 'week', 'month'], default='auto'
+    )
+    max_points = serializers.IntegerField(default=500, min_value=10, max_value=5000)
+
+    def validate(self, data):
+        if data.get('start') and data.get('end') and data['start'] > data['end']:
+            raise serializers.ValidationError('start must not be after end')
+        return data
+
+
+class WaterRiskQuerySerializer(serializers.Serializer):
+    months = serializers.IntegerField(default=24, min_value=1, max_value=120)
+    risk_level = serializers.ChoiceField(
+        choices=['low', 'medium', 'high', 'critical', 'unknown'], required=False
+    )
+    type = serializers.ChoiceField(choices=WaterSource.WATER_TYPES, required=False)
+    location = serializers.IntegerField(required=False, help_text="Only sources nearest this location")
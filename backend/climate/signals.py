@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import WaterSource
+from .spatial import bump_version, cluster_pyramid
+
+
+# Bumped inside the writing transaction; the pyramid applies the change in
+# place only if it is still at the version just before this write
+@receiver(post_save, sender=WaterSource)
+def water_source_saved(sender, instance, **kwargs):
+    after = bump_version()
+    transaction.on_commit(lambda: cluster_pyramid.apply_save(instance, after - 1, after))
+
+
+@receiver(post_delete, sender=WaterSource)
+def water_source_deleted(sender, instance, **kwargs):
+    source_id = instance.pk
+    after = bump_version()
+    transaction.on_commit(lambda: cluster_pyramid.apply_delete(source_id, after - 1, after))
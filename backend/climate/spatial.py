@@ -0,0 +1,293 @@
+import heapq
+import math
+import threading
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import WaterSource, WaterSourceVersion
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Grid cell edge in degrees (~11 km at Turkana's latitude)
+CELL_SIZE_DEGREES = 0.1
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# Primary key of the single WaterSourceVersion row
+VERSION_ROW = 1
+
+
+def current_version():
+    """Version of the water source table, shared by every process through one row"""
+    return WaterSourceVersion.objects.filter(pk=VERSION_ROW).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    """Advance the shared version after writing water sources; returns the new version
+
+    Call inside the writing transaction: the row stays locked until commit,
+    so concurrent writers are ordered and each reads back its own version.
+    """
+    with transaction.atomic():
+        if not WaterSourceVersion.objects.filter(pk=VERSION_ROW).update(version=F('version') + 1):
+            WaterSourceVersion.objects.get_or_create(pk=VERSION_ROW)
+            WaterSourceVersion.objects.filter(pk=VERSION_ROW).update(version=F('version') + 1)
+        return current_version()
+
+
+def parse_bbox(value):
+    """Parse 'min_lon,min_lat,max_lon,max_lat' into a tuple of floats"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError("bbox must be 'min_lon,min_lat,max_lon,max_lat'")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox minimums must not exceed maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+class WaterSourceIndex:
+    """In-memory grid index over water source coordinates
+
+    Sources are bucketed into fixed-size lat/lon cells. A nearest query
+    scans rings of cells outward from the query point and stops as soon as
+    the next ring cannot hold anything closer than the current k-th hit, so
+    only a handful of cells are touched regardless of inventory size.
+    The index is rebuilt lazily from one query when the version changes.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE_DEGREES):
+        self.cell_size = cell_size
+        self._grids = None  # water_type (None = all) -> {(row, col): [record, ...]}
+        self._extent = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def _ensure_current(self):
+        version = current_version()
+        if self._grids is not None and version == self._version:
+            return
+        with self._lock:
+            if self._grids is None or version != self._version:
+                self._build()
+                self._version = version
+
+    def _build(self):
+        # Imported here to avoid a circular import with serializers
+        from .serializers import WaterSourceSerializer
+
+        grids = {None: {}}
+        rows, cols = [], []
+        for data in WaterSourceSerializer(WaterSource.objects.all(), many=True).data:
+            lat, lon = float(data['latitude']), float(data['longitude'])
+            record = (lat, lon, data)
+            cell = self._cell(lat, lon)
+            grids[None].setdefault(cell, []).append(record)
+            grids.setdefault(data['water_type'], {}).setdefault(cell, []).append(record)
+            rows.append(cell[0])
+            cols.append(cell[1])
+
+        self._grids = grids
+        self._extent = (min(rows), max(rows), min(cols), max(cols)) if rows else None
+
+    def _ring(self, center, radius):
+        row, col = center
+        if radius == 0:
+            yield center
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, col - radius
+            yield r, col + radius
+
+    def _max_radius(self, center):
+        min_row, max_row, min_col, max_col = self._extent
+        return max(
+            abs(center[0] - min_row), abs(center[0] - max_row),
+            abs(center[1] - min_col), abs(center[1] - max_col),
+        )
+
+    def nearest(self, lat, lon, k=5, water_type=None):
+        """Return up to k (distance_km, source_data) pairs, closest first"""
+        self._ensure_current()
+        grid = self._grids.get(water_type)
+        if not grid or k <= 0:
+            return []
+
+        center = self._cell(lat, lon)
+        max_radius = self._max_radius(center)
+        best = []  # max-heap of (-distance, tiebreak, data)
+        counter = 0
+
+        for radius in range(max_radius + 1):
+            for cell in self._ring(center, radius):
+                for src_lat, src_lon, data in grid.get(cell, ()):
+                    distance = haversine_km(lat, lon, src_lat, src_lon)
+                    counter += 1
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, counter, data))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, counter, data))
+
+            if len(best) == k:
+                # Anything outside this ring is at least `radius` whole cells away
+                widest_lat = min(89.9, abs(lat) + (radius + 1) * self.cell_size)
+                bound_km = radius * self.cell_size * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+                if bound_km >= -best[0][0]:
+                    break
+
+        return [(-d, data) for d, _, data in sorted(best, reverse=True)]
+
+
+# Zoom levels with precomputed clusters; cells are a quarter of a map tile
+MAX_CLUSTER_ZOOM = 16
+CELLS_PER_TILE = 4
+
+
+def cluster_cell_size(zoom):
+    """Cluster cell edge in degrees at a web-map zoom level"""
+    return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+
+class ClusterCell:
+    __slots__ = ('count', 'lat_sum', 'lon_sum', 'types')
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        self.types = Counter()
+
+    def add(self, lat, lon, water_type, sign=1):
+        self.count += sign
+        self.lat_sum += sign * lat
+        self.lon_sum += sign * lon
+        self.types[water_type] += sign
+        if self.types[water_type] <= 0:
+            del self.types[water_type]
+
+
+class WaterSourceClusterPyramid:
+    """Grid clusters of water sources precomputed for every zoom level
+
+    Cells are square in degrees, which is close enough to Web Mercator
+    tiles at Turkana's latitude. Saving or deleting a source adjusts one
+    cell per level instead of rebuilding the pyramid; a full rebuild only
+    happens when another process changed the data in between.
+    """
+
+    def __init__(self, max_zoom=MAX_CLUSTER_ZOOM):
+        self.max_zoom = max_zoom
+        self._levels = None  # zoom -> {(row, col): ClusterCell}
+        self._positions = {}  # source id -> (lat, lon, water_type)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _cell(self, zoom, lat, lon):
+        size = cluster_cell_size(zoom)
+        return math.floor(lat / size), math.floor(lon / size)
+
+    def _add(self, source_id, lat, lon, water_type):
+        self._positions[source_id] = (lat, lon, water_type)
+        for zoom, cells in self._levels.items():
+            key = self._cell(zoom, lat, lon)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = ClusterCell()
+            cell.add(lat, lon, water_type)
+
+    def _remove(self, source_id):
+        position = self._positions.pop(source_id, None)
+        if position is None:
+            return
+        lat, lon, water_type = position
+        for zoom, cells in self._levels.items():
+            key = self._cell(zoom, lat, lon)
+            cell = cells[key]
+            cell.add(lat, lon, water_type, sign=-1)
+            if cell.count <= 0:
+                del cells[key]
+
+    def _build(self):
+        self._levels = {zoom: {} for zoom in range(self.max_zoom + 1)}
+        self._positions = {}
+        rows = WaterSource.objects.values_list('id', 'latitude', 'longitude', 'water_type')
+        for source_id, lat, lon, water_type in rows.iterator(chunk_size=5000):
+            self._add(source_id, float(lat), float(lon), water_type)
+
+    def _ensure_current(self):
+        version = current_version()
+        if self._levels is not None and version == self._version:
+            return
+        with self._lock:
+            if self._levels is None or version != self._version:
+                self._build()
+                self._version = version
+
+    def apply_save(self, source, before, after):
+        """Move one saved source to its new cells, given the versions around the save"""
+        with self._lock:
+            if self._levels is None or self._version != before:
+                return  # missed another change; rebuild on next read
+            self._remove(source.pk)
+            self._add(source.pk, float(source.latitude), float(source.longitude), source.water_type)
+            self._version = after
+
+    def apply_delete(self, source_id, before, after):
+        with self._lock:
+            if self._levels is None or self._version != before:
+                return
+            self._remove(source_id)
+            self._version = after
+
+    def clusters(self, zoom, bbox=None):
+        """Return cluster dicts for one zoom level, optionally limited to a bbox"""
+        self._ensure_current()
+        zoom = max(0, min(self.max_zoom, zoom))
+        cells = self._levels[zoom]
+
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            row_min, col_min = self._cell(zoom, min_lat, min_lon)
+            row_max, col_max = self._cell(zoom, max_lat, max_lon)
+            span = (row_max - row_min + 1) * (col_max - col_min + 1)
+            if span < len(cells):
+                keys = ((r, c) for r in range(row_min, row_max + 1)
+                        for c in range(col_min, col_max + 1))
+                selected = ((key, cells[key]) for key in keys if key in cells)
+            else:
+                selected = ((key, cell) for key, cell in cells.items()
+                            if row_min <= key[0] <= row_max and col_min <= key[1] <= col_max)
+        else:
+            selected = cells.items()
+
+        return [
+            {
+                'cell': list(key),
+                'count': cell.count,
+                'latitude': round(cell.lat_sum / cell.count, 6),
+                'longitude': round(cell.lon_sum / cell.count, 6),
+                'types': dict(cell.types),
+            }
+            for key, cell in selected
+        ]
+
+
+water_source_index = WaterSourceIndex()
+cluster_pyramid = WaterSourceClusterPyramid()
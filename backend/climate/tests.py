@@ -1,3 +1,279 @@
+import io
+import json
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.conf import settings
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .importers import WaterSourceImporter, import_water_sources, iter_geojson_features
+from .models import WaterSource, WaterSourceReading, WaterSourceReadingRollup
+from .spatial import WaterSourceClusterPyramid, WaterSourceIndex, bump_version, cluster_pyramid, current_version
+from .timeseries import append_readings, source_history
+from .water_balance import WaterRiskEngine, load_sources, project_storage
+
+
+def make_source(name, lat, lon, water_type='borehole'):
+    return WaterSource.objects.create(name=name, water_type=water_type, latitude=lat, longitude=lon)
+
+
+class SpatialIndexTests(TestCase):
+    def setUp(self):
+        self.near = make_source('Near', 3.10, 35.60)
+        self.far = make_source('Far', 4.00, 36.00, water_type='well')
+
+    def test_nearest_orders_by_distance_and_filters_type(self):
+        index = WaterSourceIndex()
+        self.assertEqual([data['name'] for _, data in index.nearest(3.11, 35.61, k=2)], ['Near', 'Far'])
+        self.assertEqual([data['name'] for _, data in index.nearest(3.11, 35.61, water_type='well')], ['Far'])
+
+    def test_bulk_writes_that_bump_the_version_invalidate(self):
+        # Another process (or a bulk update) changes the table behind our back
+        index = WaterSourceIndex()
+        index.nearest(3.11, 35.61)
+        WaterSource.objects.filter(pk=self.far.pk).update(latitude=3.11, longitude=35.61)
+        bump_version()
+        self.assertEqual(index.nearest(3.11, 35.61, k=1)[0][1]['name'], 'Far')
+
+    def test_version_moves_on_save_delete_and_import(self):
+        before = current_version()
+        WaterSource.objects.filter(pk=self.near.pk).delete()
+        self.far.save()
+        import_water_sources(io.BytesIO(geojson(('Nakuprat', 3.5, 35.8))), 'geojson')
+        self.assertEqual(current_version(), before + 3)
+
+    def test_version_is_a_single_row_read(self):
+        with self.assertNumQueries(1):
+            current_version()
+
+
+class ClusterPyramidTests(TestCase):
+    def test_incremental_updates_match_a_rebuild(self):
+        source = make_source('A', 3.10, 35.60)
+        make_source('B', 3.12, 35.61, water_type='well')
+        # Signals update the process-wide pyramid
+        pyramid = cluster_pyramid
+        pyramid.clusters(8)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            source.latitude, source.longitude = 3.50, 35.90
+            source.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_source('C', 3.51, 35.91)
+        with self.captureOnCommitCallbacks(execute=True):
+            WaterSource.objects.get(name='B').delete()
+
+        # Every change was applied in place, so no rebuild is pending
+        self.assertEqual(pyramid._version, current_version())
+        rebuilt = WaterSourceClusterPyramid()
+        for zoom in range(pyramid.max_zoom + 1):
+            self.assertCountEqual(pyramid.clusters(zoom), rebuilt.clusters(zoom))
+
+
+class WaterSourceMapApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        make_source('Lodwar', 3.12, 35.60)
+        make_source('Kalokol', 3.55, 35.92, water_type='well')
+        make_source('Lokichoggio', 4.20, 34.35)
+
+    def test_clusters_sum_to_the_sources_in_the_box(self):
+        clusters = self.client.get('/api/watersources/clusters/', {'zoom': 0}).json()['clusters']
+        self.assertEqual(sum(cluster['count'] for cluster in clusters), 3)
+
+        response = self.client.get('/api/watersources/clusters/', {'zoom': 10, 'bbox': '35.5,3.0,36.0,3.6'})
+        clusters = response.json()['clusters']
+        self.assertEqual(sum(cluster['count'] for cluster in clusters), 2)
+        self.assertEqual(sum(cluster['types'].get('well', 0) for cluster in clusters), 1)
+
+    def test_clusters_follow_bulk_writes_that_bump_the_version(self):
+        self.client.get('/api/watersources/clusters/', {'zoom': 10})
+        WaterSource.objects.filter(name='Lokichoggio').update(latitude=3.13, longitude=35.61)
+        bump_version()
+        response = self.client.get('/api/watersources/clusters/', {'zoom': 10, 'bbox': '35.5,3.0,36.0,3.6'})
+        self.assertEqual(sum(cluster['count'] for cluster in response.json()['clusters']), 3)
+
+    def test_list_filters_by_bbox(self):
+        response = self.client.get('/api/watersources/', {'bbox': '34.0,4.0,34.5,4.5'})
+        names = [source['name'] for source in response.json()['results']]
+        self.assertEqual(names, ['Lokichoggio'])
+        self.assertEqual(self.client.get('/api/watersources/', {'bbox': '1,2,3'}).status_code, 400)
+
+
+def geojson(*features):
+    return json.dumps({'type': 'FeatureCollection', 'features': [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'name': name, 'water_type': 'borehole'},
+        }
+        for name, lat, lon in features
+    ]}, ensure_ascii=False).encode('utf-8')
+
+
+class WaterSourceImportTests(TestCase):
+    def test_multibyte_character_across_chunk_boundary(self):
+        data = b'\xef\xbb\xbf' + geojson(('Kalokol\u00e9 \u2013 Nakuprat', 3.5, 35.8))
+        # Small chunks put every split point inside the two multibyte characters
+        for chunk_size in range(1, 16):
+            with self.subTest(chunk_size=chunk_size):
+                features = list(iter_geojson_features(io.BytesIO(data), chunk_size=chunk_size))
+                self.assertEqual(features[0][1]['name'], 'Kalokol\u00e9 \u2013 Nakuprat')
+
+    def test_reimport_updates_instead_of_duplicating(self):
+        data = geojson(('Nakuprat', 3.5, 35.8), ('Kerio', 3.0, 35.9))
+        first = import_water_sources(io.BytesIO(data), 'geojson')
+        second = import_water_sources(io.BytesIO(data), 'geojson')
+        self.assertEqual((first.created, first.updated), (2, 0))
+        self.assertEqual((second.created, second.updated), (0, 2))
+        self.assertEqual(WaterSource.objects.count(), 2)
+
+    def test_columns_missing_from_the_file_are_kept(self):
+        full = (b'name,water_type,latitude,longitude,capacity_liters,condition\n'
+                b'Nakuprat,borehole,3.5,35.8,20000,Good\n')
+        import_water_sources(io.BytesIO(full), 'csv')
+        partial = b'name,water_type,latitude,longitude\nNakuprat,well,3.5,35.8\n'
+        report = import_water_sources(io.BytesIO(partial), 'csv')
+        self.assertEqual(report.updated, 1)
+        source = WaterSource.objects.get()
+        self.assertEqual((source.water_type, source.capacity_liters, source.condition), ('well', 20000, 'Good'))
+
+    def test_written_sources_are_indexed_by_primary_key(self):
+        importer = WaterSourceImporter(chunk_size=2)
+        data = geojson(*[(f'Source {i}', 3.0 + i / 100, 35.5) for i in range(5)], ('Source 0', 3.0, 35.5))
+        report = importer.run(iter_geojson_features(io.BytesIO(data)))
+        self.assertEqual((report.created, report.updated), (5, 1))
+        targets = [target for entries in importer.index._cells.values() for _, _, target in entries]
+        self.assertEqual(sorted(targets), sorted(WaterSource.objects.values_list('pk', flat=True)))
+
+    def test_invalid_rows_are_reported(self):
+        report = import_water_sources(io.BytesIO(geojson(('', 3.5, 35.8), ('Far away', 40.0, 35.8))), 'geojson')
+        self.assertEqual((report.created, report.error_count), (0, 2))
+
+
+class SourceHistoryTests(TestCase):
+    def setUp(self):
+        self.source = make_source('Nakuprat', 3.5, 35.8)
+        start = timezone.make_aware(datetime(2024, 1, 1, 6))
+        append_readings(
+            WaterSourceReading(source=self.source, timestamp=start + timedelta(hours=12 * i),
+                               water_level=float(i), functional_status='functional')
+            for i in range(60)  # two readings a day for 30 days
+        )
+
+    def test_rollups_match_readings(self):
+        day = WaterSourceReadingRollup.objects.get(source=self.source, period='day', period_start=date(2024, 1, 2))
+        self.assertEqual((day.reading_count, day.level_min, day.level_max), (2, 2.0, 3.0))
+        month = WaterSourceReadingRollup.objects.get(source=self.source, period='month')
+        self.assertEqual((month.reading_count, month.level_sum), (60, float(sum(range(60)))))
+
+    def test_auto_picks_the_finest_resolution_that_fits(self):
+        self.assertEqual(source_history(self.source.id, date(2024, 1, 1), date(2024, 1, 30), max_points=100)[0], 'raw')
+        resolution, points = source_history(self.source.id, date(2024, 1, 1), date(2024, 1, 30), max_points=40)
+        self.assertEqual((resolution, len(points)), ('day', 30))
+
+    def test_raw_respects_max_points(self):
+        resolution, points = source_history(self.source.id, date(2024, 1, 1), date(2024, 1, 30), 'raw', max_points=40)
+        self.assertEqual(resolution, 'day')
+        self.assertLessEqual(len(points), 40)
+        resolution, points = source_history(self.source.id, date(2024, 1, 1), date(2024, 1, 5), 'raw', max_points=10)
+        self.assertEqual((resolution, len(points)), ('raw', 10))
+
+
+    def test_months_beyond_max_points_are_merged(self):
+        source = make_source('Kerio', 3.0, 35.9)
+        append_readings(
+            WaterSourceReading(source=source, timestamp=timezone.make_aware(datetime(2020 + i // 12, i % 12 + 1, 15)),
+                               water_level=float(i), functional_status='functional')
+            for i in range(36)
+        )
+        for resolution in ('auto', 'month'):
+            with self.subTest(resolution=resolution):
+                resolution, points = source_history(source.id, date(2020, 1, 1), date(2022, 12, 31), resolution,
+                                                    max_points=10)
+                self.assertEqual((resolution, len(points)), ('month', 9))
+                self.assertEqual(sum(point['reading_count'] for point in points), 36)
+                first = points[0]
+                self.assertEqual((first['period_start'], first['water_level_min'], first['water_level_max']),
+                                 (date(2020, 1, 1), 0.0, 3.0))
+                self.assertEqual(first['water_level_avg'], 1.5)
+
+class WaterRiskTests(TestCase):
+    def setUp(self):
+        WaterSource.objects.create(name='Dam', water_type='dam', latitude=3.1, longitude=35.6,
+                                   capacity_liters=1_000_000, population_served=800, livestock_served=500)
+        WaterSource.objects.create(name='Borehole', water_type='borehole', latitude=3.2, longitude=35.7,
+                                   capacity_liters=50_000, population_served=2)
+        WaterSource.objects.create(name='Unknown', water_type='well', latitude=3.3, longitude=35.8)
+
+    def test_projection_matches_a_month_by_month_loop(self):
+        config = settings.WATER_BALANCE
+        sources = load_sources()
+        precipitation = np.array([0.0, 5.0, 120.0, 30.0])
+        temperature = np.array([31.0, 30.0, 26.0, 29.0])
+        days = np.array([31.0, 28.0, 31.0, 30.0])
+        storage, _ = project_storage(sources, precipitation, temperature, days, config)
+
+        for i, row in enumerate(sources['rows']):
+            if row[4] is None:
+                self.assertTrue(np.isnan(storage[i]).all())
+                continue
+            kind, capacity = row[2], float(row[4])
+            level = capacity * config['initial_storage']
+            for month in range(len(days)):
+                inflow = capacity * (config['recharge_per_100mm'][kind] * precipitation[month] / 100
+                                     + config['baseflow'][kind])
+                loss = capacity * config['evaporation_per_degree'][kind] * max(temperature[month] - 20, 0)
+                use = ((row[5] or 0) * config['liters_per_person_per_day']
+                       + (row[6] or 0) * config['liters_per_livestock_per_day']) * days[month]
+                level = min(max(level + inflow - loss - use, 0.0), capacity)
+                self.assertAlmostEqual(storage[i, month], level, places=3)
+
+    def test_dry_months_fail_the_dam_and_results_follow_source_changes(self):
+        from prediction.models import Location, WeatherPrediction
+        location = Location.get_default()
+        for month in range(1, 7):
+            WeatherPrediction.objects.create(
+                location=location, year=2024, month=month, date=date(2024, month, 1), condition='severe_drought',
+                severity='critical', monthly_precipitation=0.0, avg_temperature=32.0, avg_humidity=30.0,
+                confidence_score=100, description='', recommendations='',
+            )
+        engine = WaterRiskEngine()
+        result = engine.results(months=6)
+        levels = {source['name']: source['risk_level'] for source in result['sources']}
+        self.assertEqual(levels, {'Dam': 'critical', 'Borehole': 'low', 'Unknown': 'unknown'})
+        self.assertIs(engine.results(months=6), result)
+
+        WaterSource.objects.filter(name='Dam').update(population_served=0, livestock_served=0)
+        bump_version()
+        levels = {source['name']: source['risk_level'] for source in engine.results(months=6)['sources']}
+        self.assertNotEqual(levels['Dam'], 'critical')
+
+    def test_sources_use_their_nearest_location(self):
+        from prediction.models import Location, WeatherPrediction
+        wet = Location.objects.create(name='Lokichoggio', latitude=4.2, longitude=34.35)
+        dry = Location.objects.create(name='Lodwar', latitude=3.12, longitude=35.6)
+        for location, rain in ((wet, 400.0), (dry, 0.0)):
+            for month in range(1, 7):
+                WeatherPrediction.objects.create(
+                    location=location, year=2024, month=month, date=date(2024, month, 1), condition='normal',
+                    severity='low', monthly_precipitation=rain, avg_temperature=30.0, avg_humidity=40.0,
+                    confidence_score=100, description='', recommendations='',
+                )
+        WaterSource.objects.create(name='Northern dam', water_type='dam', latitude=4.1, longitude=34.4,
+                                   capacity_liters=1_000_000, population_served=800, livestock_served=500)
+
+        engine = WaterRiskEngine()
+        result = engine.results(months=6)
+        levels = {source['name']: (source['location'], source['risk_level']) for source in result['sources']}
+        self.assertEqual(levels['Dam'], (dry.pk, 'critical'))
+        self.assertEqual(levels['Northern dam'], (wet.pk, 'low'))
+        self.assertEqual(result['summary']['critical'] + result['summary']['low'], 3)
 
-# Create your tests here.
+        # Each location keeps its own cached result
+        northern = engine.results(months=6, location_id=wet.pk)
+        self.assertEqual([source['name'] for source in northern['sources']], ['Northern dam'])
+        engine.results(months=6, location_id=dry.pk)
+        self.assertIs(engine.results(months=6, location_id=wet.pk), northern)
@@ -0,0 +1,213 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import WaterSourceReading, WaterSourceReadingRollup
+
+
+# Readings written (and rolled up) per transaction
+APPEND_CHUNK_SIZE = 5000
+
+# Approximate bucket length in days, finest first
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 30.44}
+
+ROLLUP_UPDATE_FIELDS = [
+    'reading_count', 'functional_count',
+    'level_count', 'level_sum', 'level_min', 'level_max',
+    'yield_count', 'yield_sum', 'yield_min', 'yield_max',
+    'last_timestamp', 'last_status',
+]
+
+
+def period_start(day, period):
+    """First day of the day/week/month bucket containing `day`"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _min(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+def _merge(rollup, reading):
+    rollup.reading_count += 1
+    if reading.functional_status == 'functional':
+        rollup.functional_count += 1
+    if reading.water_level is not None:
+        rollup.level_count += 1
+        rollup.level_sum += reading.water_level
+        rollup.level_min = _min(rollup.level_min, reading.water_level)
+        rollup.level_max = _max(rollup.level_max, reading.water_level)
+    if reading.yield_lph is not None:
+        rollup.yield_count += 1
+        rollup.yield_sum += reading.yield_lph
+        rollup.yield_min = _min(rollup.yield_min, reading.yield_lph)
+        rollup.yield_max = _max(rollup.yield_max, reading.yield_lph)
+    if reading.timestamp >= rollup.last_timestamp:
+        rollup.last_timestamp = reading.timestamp
+        rollup.last_status = reading.functional_status
+
+
+def _update_rollups(readings):
+    """Fold a chunk of new readings into their day/week/month buckets"""
+    keyed = []
+    for reading in readings:
+        day = timezone.localtime(reading.timestamp).date()
+        for period in PERIOD_DAYS:
+            keyed.append(((reading.source_id, period, period_start(day, period)), reading))
+
+    keys = {key for key, _ in keyed}
+    existing = WaterSourceReadingRollup.objects.filter(
+        source_id__in={k[0] for k in keys},
+        period__in={k[1] for k in keys},
+        period_start__in={k[2] for k in keys},
+    )
+    rollups = {
+        (r.source_id, r.period, r.period_start): r
+        for r in existing
+        if (r.source_id, r.period, r.period_start) in keys
+    }
+
+    for key, reading in keyed:
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = WaterSourceReadingRollup(
+                source_id=key[0], period=key[1], period_start=key[2],
+                last_timestamp=reading.timestamp, last_status=reading.functional_status,
+            )
+        _merge(rollup, reading)
+
+    WaterSourceReadingRollup.objects.bulk_create(
+        list(rollups.values()),
+        update_conflicts=True,
+        unique_fields=['source', 'period', 'period_start'],
+        update_fields=ROLLUP_UPDATE_FIELDS,
+    )
+
+
+def append_readings(readings, chunk_size=APPEND_CHUNK_SIZE):
+    """Bulk-append WaterSourceReading instances and maintain their rollups
+
+    Returns the number of readings stored.
+    """
+    stored = 0
+    chunk = []
+    for reading in readings:
+        chunk.append(reading)
+        if len(chunk) >= chunk_size:
+            stored += _append_chunk(chunk)
+            chunk = []
+    if chunk:
+        stored += _append_chunk(chunk)
+    return stored
+
+
+def _append_chunk(chunk):
+    with transaction.atomic():
+        WaterSourceReading.objects.bulk_create(chunk)
+        _update_rollups(chunk)
+    return len(chunk)
+
+
+def choose_resolution(source_id, start, end, max_points):
+    """Finest resolution whose point count over [start, end] fits max_points"""
+    span_days = (end - start).days + 1
+
+    if span_days <= max_points:
+        raw_count = WaterSourceReadingRollup.objects.filter(
+            source_id=source_id, period='day', period_start__range=(start, end)
+        ).aggregate(total=Sum('reading_count'))['total'] or 0
+        if raw_count <= max_points:
+            return 'raw'
+
+    for period, days in PERIOD_DAYS.items():
+        if span_days / days <= max_points:
+            return period
+    # Even months do not fit; source_history merges them down to max_points
+    return 'month'
+
+
+def _average(total, count):
+    return total / count if count else None
+
+
+def _bound(values, pick):
+    values = [value for value in values if value is not None]
+    return pick(values) if values else None
+
+
+def merge_rollups(rollups):
+    """One unsaved rollup covering consecutive buckets, starting at the first"""
+    merged = WaterSourceReadingRollup(
+        source_id=rollups[0].source_id, period=rollups[0].period, period_start=rollups[0].period_start,
+        last_timestamp=rollups[-1].last_timestamp, last_status=rollups[-1].last_status,
+    )
+    for field in ('reading_count', 'functional_count', 'level_count', 'level_sum', 'yield_count', 'yield_sum'):
+        setattr(merged, field, sum(getattr(rollup, field) for rollup in rollups))
+    for field, pick in (('level_min', min), ('level_max', max), ('yield_min', min), ('yield_max', max)):
+        setattr(merged, field, _bound([getattr(rollup, field) for rollup in rollups], pick))
+    return merged
+
+
+def serialize_rollup(rollup):
+    return {
+        'period_start': rollup.period_start,
+        'reading_count': rollup.reading_count,
+        'functional_ratio': _average(rollup.functional_count, rollup.reading_count),
+        'water_level_avg': _average(rollup.level_sum, rollup.level_count),
+        'water_level_min': rollup.level_min,
+        'water_level_max': rollup.level_max,
+        'yield_avg': _average(rollup.yield_sum, rollup.yield_count),
+        'yield_min': rollup.yield_min,
+        'yield_max': rollup.yield_max,
+        'last_status': rollup.last_status,
+    }
+
+
+def _raw_readings(source_id, start, end, limit):
+    # Plain timestamp bounds so the (source, timestamp) index is used
+    return list(WaterSourceReading.objects.filter(
+        source_id=source_id,
+        timestamp__gte=timezone.make_aware(datetime.combine(start, time.min)),
+        timestamp__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    ).order_by('timestamp').values('timestamp', 'water_level', 'yield_lph', 'functional_status')[:limit])
+
+
+def source_history(source_id, start, end, resolution='auto', max_points=500):
+    """Return (resolution, points) for a source between two dates
+
+    Never returns more than `max_points` points: raw readings that would
+    exceed it fall back to the finest rollup that fits, and rollups that
+    still exceed it are merged into runs of consecutive buckets, each point
+    starting at its first bucket.
+    """
+    if resolution == 'raw':
+        readings = _raw_readings(source_id, start, end, max_points + 1)
+        if len(readings) <= max_points:
+            return resolution, readings
+        resolution = 'auto'
+
+    if resolution == 'auto':
+        resolution = choose_resolution(source_id, start, end, max_points)
+        if resolution == 'raw':
+            return resolution, _raw_readings(source_id, start, end, max_points)
+
+    rollups = WaterSourceReadingRollup.objects.filter(
+        source_id=source_id,
+        period=resolution,
+        period_start__range=(period_start(start, resolution), end),
+    ).order_by('period_start')
+    rollups = list(rollups)
+    if len(rollups) > max_points:
+        size = -(-len(rollups) // max_points)
+        rollups = [merge_rollups(rollups[i:i + size]) for i in range(0, len(rollups), size)]
+    return resolution, [serialize_rollup(r) for r in rollups]
@@ -1,7 +1,17 @@
 from django.urls import path
-from .views import WaterSourceListView, ContactMessageCreateView
+from .views import (
+    WaterSourceListView, NearestWaterSourceView, WaterSourceClusterView,
+    WaterSourceImportView, WaterSourceReadingAppendView, WaterSourceHistoryView,
+    WaterSourceRiskView, ContactMessageCreateView
+)
 
 urlpatterns = [
     path('watersources/', WaterSourceListView.as_view(), name='water-source-list'),
+    path('watersources/nearest/', NearestWaterSourceView.as_view(), name='water-source-nearest'),
+    path('watersources/clusters/', WaterSourceClusterView.as_view(), name='water-source-clusters'),
+    path('watersources/import/', WaterSourceImportView.as_view(), name='water-source-import'),
+    path('watersources/readings/', WaterSourceReadingAppendView.as_view(), name='water-source-readings'),
+    path('watersources/<int:pk>/readings/', WaterSourceHistoryView.as_view(), name='water-source-history'),
+    path('watersources/risk/', WaterSourceRiskView.as_view(), name='water-source-risk'),
     path('contact/', ContactMessageCreateView.as_view(), name='contact-message-create'),
 ]
@@ -1,7 +1,23 @@
 from django.shortcuts import render
 from rest_framework import generics
-from .models import WaterSource, ContactMessage
-from .serializers import WaterSourceSerializer, ContactMessageSerializer
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from datetime import timedelta
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from .models import WaterSource, WaterSourceReading, ContactMessage
+from rest_framework.exceptions import ValidationError
+from .serializers import (
+    WaterSourceSerializer, ContactMessageSerializer, NearestWaterSourceQuerySerializer,
+    WaterSourceClusterQuerySerializer, WaterSourceReadingInputSerializer,
+    WaterSourceHistoryQuerySerializer, WaterRiskQuerySerializer
+)
+from .water_balance import water_risk_engine
+from .timeseries import append_readings, source_history
+from .importers import detect_format, import_water_sources
+from .spatial import water_source_index, cluster_pyramid, cluster_cell_size, parse_bbox
 
 class ContactMessageCreateView(generics.CreateAPIView):
     queryset = ContactMessage.objects.all()
@@ -10,3 +26,175 @@ class ContactMessageCreateView(generics.CreateAPIView):
 class WaterSourceListView(generics.ListAPIView):
     queryset = WaterSource.objects.all()
     serializer_class = WaterSourceSerializer
+
+    def get_queryset(self):
+        """Optionally limit to ?bbox=min_lon,min_lat,max_lon,max_lat"""
+        queryset = WaterSource.objects.all()
+
+        bbox = self.request.query_params.get('bbox', None)
+        if bbox:
+            try:
+                min_lon, min_lat, max_lon, max_lat = parse_bbox(bbox)
+            except ValueError as e:
+                raise ValidationError({'bbox': str(e)})
+            # Served by the (latitude, longitude) index
+            queryset = queryset.filter(
+                latitude__range=(min_lat, max_lat),
+                longitude__range=(min_lon, max_lon),
+            )
+
+        return queryset
+
+
+class NearestWaterSourceView(APIView):
+    """
+    k nearest water sources to a point, served from the in-memory grid index
+    GET /api/watersources/nearest/?lat=3.12&lon=35.6&k=5&type=borehole
+    """
+
+    def get(self, request):
+        query = NearestWaterSourceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        matches = water_source_index.nearest(
+            params['lat'], params['lon'], k=params['k'], water_type=params.get('type')
+        )
+        return Response([
+            {**data, 'distance_km': round(distance, 3)} for distance, data in matches
+        ])
+
+
+class WaterSourceClusterView(APIView):
+    """
+    Precomputed grid clusters of water sources for a map zoom level
+    GET /api/watersources/clusters/?zoom=8&bbox=34.0,1.6,36.6,5.6
+    """
+
+    def get(self, request):
+        query = WaterSourceClusterQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        clusters = cluster_pyramid.clusters(params['zoom'], params.get('bbox'))
+        return Response({
+            'zoom': params['zoom'],
+            'cell_size_degrees': cluster_cell_size(params['zoom']),
+            'count': len(clusters),
+            'clusters': clusters,
+        })
+
+
+class WaterSourceImportView(APIView):
+    """
+    Bulk import water sources from an uploaded CSV or GeoJSON file
+    POST /api/watersources/import/  (multipart: file, optional format=csv|geojson)
+    """
+    parser_classes = [MultiPartParser]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Upload a CSV or GeoJSON file.'})
+
+        file_format = detect_format(upload.name, request.data.get('format'))
+        if file_format not in ('csv', 'geojson'):
+            raise ValidationError({'format': "Must be 'csv' or 'geojson'."})
+
+        report = import_water_sources(upload.file, file_format)
+        return Response(report.to_dict())
+
+
+class WaterSourceReadingAppendView(APIView):
+    """
+    Bulk-append condition readings for any number of sources
+    POST /api/watersources/readings/
+    Body: [{"source": 1, "timestamp": "...", "water_level": 12.5, "yield_lph": 900,
+            "functional_status": "functional"}, ...]
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = WaterSourceReadingInputSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        rows = serializer.validated_data
+
+        source_ids = {row['source'] for row in rows}
+        known = set(WaterSource.objects.filter(id__in=source_ids).values_list('id', flat=True))
+        unknown = sorted(source_ids - known)
+        if unknown:
+            raise ValidationError({'source': f'Unknown water source ids: {unknown}'})
+
+        stored = append_readings(
+            WaterSourceReading(
+                source_id=row['source'],
+                timestamp=row['timestamp'],
+                water_level=row.get('water_level'),
+                yield_lph=row.get('yield_lph'),
+                functional_status=row['functional_status'],
+            )
+            for row in rows
+        )
+        return Response({'stored': stored})
+
+
+class WaterSourceHistoryView(APIView):
+    """
+    Condition history of one source, downsampled to at most max_points
+    GET /api/watersources/<id>/readings/?start=2020-01-01&end=2024-12-31&resolution=auto
+    """
+
+    def get(self, request, pk):
+        source = get_object_or_404(WaterSource, pk=pk)
+        query = WaterSourceHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        end = params.get('end') or timezone.now().date()
+        start = params.get('start') or end - timedelta(days=365)
+
+        resolution, points = source_history(
+            source.id, start, end, params['resolution'], params['max_points']
+        )
+        return Response({
+            'source': source.id,
+            'start': start,
+            'end': end,
+            'resolution': resolution,
+            'count': len(points),
+            'points': points,
+        })
+
+
+class WaterSourceRiskView(generics.GenericAPIView):
+    """
+    Projected supply vs demand risk for every water source
+    GET /api/watersources/risk/?months=24&risk_level=critical&type=dam&location=<id>
+    Each source is projected with the predictions of its nearest location.
+    """
+
+    def get(self, request):
+        query = WaterRiskQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        result = water_risk_engine.results(months=params['months'], location_id=params.get('location'))
+        if result is None:
+            return Response({
+                'status': 'error',
+                'message': 'No monthly predictions available. Please sync weather data first.'
+            }, status=404)
+
+        sources = result['sources']
+        if params.get('risk_level'):
+            sources = [s for s in sources if s['risk_level'] == params['risk_level']]
+        if params.get('type'):
+            sources = [s for s in sources if s['water_type'] == params['type']]
+
+        page = self.paginate_queryset(sources)
+        response = self.get_paginated_response(page)
+        response.data['data_version'] = result['data_version']
+        response.data['months'] = result['months']
+        response.data['summary'] = result['summary']
+        return response
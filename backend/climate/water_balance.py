@@ -0,0 +1,234 @@
+import calendar
+import hashlib
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from prediction.models import Location, WeatherPrediction
+
+from .models import WaterSource
+from .spatial import current_version
+
+
+TYPE_CODES = [value for value, _ in WaterSource.WATER_TYPES]
+
+RISK_LEVELS = ['low', 'medium', 'high', 'critical']
+
+
+def load_months(months, location_id):
+    """Most recent `months` monthly predictions for a location, oldest first"""
+    rows = list(
+        WeatherPrediction.objects.filter(location_id=location_id)
+        .order_by('-year', '-month')
+        .values_list('year', 'month', 'monthly_precipitation', 'avg_temperature')[:months]
+    )
+    rows.reverse()
+    return rows
+
+
+def load_stations():
+    """Locations that have monthly predictions, as (id, name, latitude, longitude) rows"""
+    return list(
+        Location.objects.filter(id__in=WeatherPrediction.objects.values('location_id'))
+        .order_by('id').values_list('id', 'name', 'latitude', 'longitude')
+    )
+
+
+def load_sources():
+    """Source attributes as parallel NumPy arrays (one query)"""
+    rows = list(
+        WaterSource.objects.order_by('id').values_list(
+            'id', 'name', 'water_type', 'nearest_village',
+            'capacity_liters', 'population_served', 'livestock_served', 'latitude', 'longitude',
+        )
+    )
+    type_index = {code: i for i, code in enumerate(TYPE_CODES)}
+    return {
+        'rows': rows,
+        'type': np.array([type_index[r[2]] for r in rows], dtype=np.intp),
+        'capacity': np.array([np.nan if r[4] is None else float(r[4]) for r in rows], dtype=float),
+        'population': np.array([r[5] or 0 for r in rows], dtype=float),
+        'livestock': np.array([r[6] or 0 for r in rows], dtype=float),
+        'latitude': np.array([float(r[7]) for r in rows], dtype=float),
+        'longitude': np.array([float(r[8]) for r in rows], dtype=float),
+    }
+
+
+def select_sources(sources, mask):
+    """The sources where `mask` is true, in the same layout"""
+    return {
+        key: [row for row, keep in zip(values, mask) if keep] if key == 'rows' else values[mask]
+        for key, values in sources.items()
+    }
+
+
+def nearest_stations(sources, stations):
+    """Index into `stations` of the nearest station for every source (haversine)"""
+    lat1 = np.radians(sources['latitude'])[:, None]
+    lon1 = np.radians(sources['longitude'])[:, None]
+    lat2 = np.radians([station[2] for station in stations])[None, :]
+    lon2 = np.radians([station[3] for station in stations])[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return np.argmin(a, axis=1)
+
+
+def project_storage(sources, precipitation, temperature, days, config):
+    """Monthly storage for every source × month in one vectorized pass
+
+    Returns (storage, demand) where storage is an (S, M) array in litres,
+    NaN for sources with no recorded capacity.
+    """
+    capacity = sources['capacity']
+    types = sources['type']
+    recharge_rate = np.array([config['recharge_per_100mm'][t] for t in TYPE_CODES])[types]
+    baseflow = np.array([config['baseflow'][t] for t in TYPE_CODES])[types]
+    evaporation = np.array([config['evaporation_per_degree'][t] for t in TYPE_CODES])[types]
+
+    # (S, M) inflows and losses
+    inflow = capacity[:, None] * (
+        recharge_rate[:, None] * (precipitation[None, :] / 100.0) + baseflow[:, None]
+    )
+    evaporation_loss = capacity[:, None] * evaporation[:, None] * np.clip(temperature - 20.0, 0, None)[None, :]
+    daily_demand = (sources['population'] * config['liters_per_person_per_day']
+                    + sources['livestock'] * config['liters_per_livestock_per_day'])
+    demand = daily_demand[:, None] * days[None, :]
+
+    net = inflow - evaporation_loss - demand
+    storage = np.empty_like(net)
+    level = capacity * config['initial_storage']
+    # Storage is bounded by [0, capacity] every month, so step through the
+    # months; each step is one array operation across all sources
+    for month in range(net.shape[1]):
+        level = np.clip(level + net[:, month], 0.0, capacity)
+        storage[:, month] = level
+    return storage, demand
+
+
+def assess(sources, storage, demand, config):
+    """Summarise projected storage into per-source risk records"""
+    capacity = sources['capacity']
+    known = ~np.isnan(capacity) & (capacity > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = storage / capacity[:, None]
+
+    failed = known[:, None] & (storage <= 0) & (demand > 0)
+    at_risk = known[:, None] & (fraction < config['risk_storage'])
+    months_at_risk = at_risk.sum(axis=1)
+    months_failed = failed.sum(axis=1)
+    first_failure = np.where(failed.any(axis=1), failed.argmax(axis=1), -1)
+    min_fraction = np.where(known, np.nanmin(np.where(known[:, None], fraction, np.inf), axis=1), np.nan)
+
+    risk = np.select(
+        [months_failed > 0, months_at_risk >= 3, months_at_risk >= 1],
+        [3, 2, 1],
+        default=0,
+    )
+    return known, risk, months_at_risk, months_failed, first_failure, min_fraction
+
+
+class WaterRiskEngine:
+    """Projects supply vs demand for every water source over recent months
+
+    Each source is projected with the monthly predictions of its nearest
+    location. Results are kept in memory per location, keyed by the water
+    source version, the set of locations and a fingerprint of that
+    location's predictions, so repeated requests are answered without
+    recomputing and requests for different locations do not evict each
+    other.
+    """
+
+    def __init__(self):
+        self._results = {}  # location_id -> (key, result)
+        self._lock = threading.Lock()
+
+    def data_version(self, stations, months_rows):
+        fingerprint = hashlib.sha1(repr((stations, months_rows)).encode()).hexdigest()[:12]
+        return f"{current_version()}-{fingerprint}"
+
+    def results(self, months=24, location_id=None):
+        """Risk assessment dict, or None when there are no monthly predictions
+
+        With `location_id`, only the sources nearest that location are assessed.
+        """
+        stations = load_stations()
+        selected = [station for station in stations if location_id is None or station[0] == location_id]
+        if not selected:
+            return None
+        return self._combine([self._location_results(stations, station, months) for station in selected])
+
+    def _location_results(self, stations, station, months):
+        months_rows = load_months(months, station[0])
+        key = (months, self.data_version(stations, months_rows))
+        cached = self._results.get(station[0])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        with self._lock:
+            cached = self._results.get(station[0])
+            if cached is None or cached[0] != key:
+                cached = (key, self._compute(stations, station, months_rows, key[1]))
+                self._results[station[0]] = cached
+        return cached[1]
+
+    def _combine(self, results):
+        if len(results) == 1:
+            return results[0]
+        summary = {level: 0 for level in RISK_LEVELS + ['unknown']}
+        for result in results:
+            for level, count in result['summary'].items():
+                summary[level] += count
+        versions = ','.join(result['data_version'] for result in results)
+        return {
+            'data_version': hashlib.sha1(versions.encode()).hexdigest()[:12],
+            'months': sorted({label for result in results for label in result['months']}),
+            'summary': summary,
+            'sources': sorted((record for result in results for record in result['sources']),
+                              key=lambda record: record['id']),
+        }
+
+    def _compute(self, stations, station, months_rows, version):
+        location_id, location_name = station[0], station[1]
+        config = settings.WATER_BALANCE
+        labels = [f"{year}-{month:02d}" for year, month, _, _ in months_rows]
+        precipitation = np.array([r[2] for r in months_rows], dtype=float)
+        temperature = np.array([r[3] for r in months_rows], dtype=float)
+        days = np.array([calendar.monthrange(y, m)[1] for y, m, _, _ in months_rows], dtype=float)
+
+        sources = load_sources()
+        if sources['rows']:
+            sources = select_sources(sources, nearest_stations(sources, stations) == stations.index(station))
+        storage, demand = project_storage(sources, precipitation, temperature, days, config)
+        known, risk, months_at_risk, months_failed, first_failure, min_fraction = assess(
+            sources, storage, demand, config
+        )
+
+        records = []
+        for i, (pk, name, water_type, village, *_) in enumerate(sources['rows']):
+            records.append({
+                'id': pk,
+                'name': name,
+                'water_type': water_type,
+                'nearest_village': village,
+                'location': location_id,
+                'location_name': location_name,
+                'risk_level': RISK_LEVELS[risk[i]] if known[i] else 'unknown',
+                'months_at_risk': int(months_at_risk[i]),
+                'months_failed': int(months_failed[i]),
+                'first_failure_month': labels[first_failure[i]] if first_failure[i] >= 0 else None,
+                'min_storage_percent': round(float(min_fraction[i]) * 100, 1) if known[i] else None,
+            })
+
+        summary = {level: 0 for level in RISK_LEVELS + ['unknown']}
+        for record in records:
+            summary[record['risk_level']] += 1
+
+        return {
+            'data_version': version,
+            'months': labels,
+            'summary': summary,
+            'sources': records,
+        }
+
+
+water_risk_engine = WaterRiskEngine()
@@ -1,22 +1,39 @@
 from django.contrib import admin
-from .models import WeatherData, WeatherPrediction, YearlyForecast
+from .models import Alert, ClimatologyNormal, HourlyWeatherDay, Location, WeatherData, WeatherPrediction, YearlyForecast
+
+
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'latitude', 'longitude', 'is_active', 'last_synced_date']
+    list_filter = ['kind', 'is_active']
+    search_fields = ['name']
+    ordering = ['name']
+    readonly_fields = ['last_synced_date', 'created_at']
 
 
 @admin.register(WeatherData)
 class WeatherDataAdmin(admin.ModelAdmin):
-    list_display = ['date', 'precipitation', 'temperature', 'relative_humidity', 'created_at']
-    list_filter = ['date', 'created_at']
-    search_fields = ['date']
+    list_display = ['date', 'location', 'precipitation', 'temperature', 'relative_humidity', 'created_at']
+    list_filter = ['location__kind', 'date', 'created_at']
+    search_fields = ['date', 'location__name']
     ordering = ['-date']
+    list_select_related = ['location']
     readonly_fields = ['created_at', 'updated_at']
 
     fieldsets = (
         ('Location', {
-            'fields': ('date', 'latitude', 'longitude')
+            'fields': ('location', 'date', 'latitude', 'longitude')
         }),
         ('Weather Parameters', {
             'fields': ('precipitation', 'temperature', 'temperature_max',
-                      'temperature_min', 'relative_humidity', 'wind_speed')
+                      'temperature_min', 'relative_humidity', 'wind_speed',
+                      'solar_radiation', 'max_hourly_precipitation')
+        }),
+        ('Evapotranspiration', {
+            'fields': ('pet_hargreaves', 'pet_penman_monteith', 'water_balance')
+        }),
+        ('Quality', {
+            'fields': ('quality_flags',)
         }),
         ('Metadata', {
             'fields': ('created_at', 'updated_at'),
@@ -25,24 +42,48 @@ class WeatherDataAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(HourlyWeatherDay)
+class HourlyWeatherDayAdmin(admin.ModelAdmin):
+    list_display = ['date', 'location', 'precipitation_total', 'max_intensity', 'peak_hour',
+                    'wet_hours', 'valid_hours']
+    list_filter = ['location__kind', 'date']
+    search_fields = ['date', 'location__name']
+    ordering = ['-date']
+    list_select_related = ['location']
+    exclude = ['values']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ClimatologyNormal)
+class ClimatologyNormalAdmin(admin.ModelAdmin):
+    list_display = ['location', 'parameter', 'period', 'updated_at']
+    list_filter = ['period', 'parameter']
+    search_fields = ['location__name', 'parameter']
+    list_select_related = ['location']
+    exclude = ['values']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(WeatherPrediction)
 class WeatherPredictionAdmin(admin.ModelAdmin):
-    list_display = ['date', 'condition', 'severity', 'monthly_precipitation',
+    list_display = ['date', 'location', 'condition', 'severity', 'monthly_precipitation',
                     'confidence_score', 'created_at']
     list_filter = ['condition', 'severity', 'year', 'month']
-    search_fields = ['year', 'month', 'description']
+    search_fields = ['year', 'month', 'description', 'location__name']
     ordering = ['-date']
+    list_select_related = ['location']
     readonly_fields = ['created_at']
 
     fieldsets = (
         ('Time Period', {
-            'fields': ('date', 'month', 'year')
+            'fields': ('location', 'date', 'month', 'year')
         }),
         ('Prediction', {
             'fields': ('condition', 'severity', 'confidence_score')
         }),
         ('Metrics', {
-            'fields': ('monthly_precipitation', 'avg_temperature', 'avg_humidity')
+            'fields': ('monthly_precipitation', 'avg_temperature', 'avg_humidity',
+                      'monthly_pet', 'monthly_water_balance', 'max_hourly_precipitation')
         }),
         ('Details', {
             'fields': ('description', 'recommendations')
@@ -56,16 +97,17 @@ class WeatherPredictionAdmin(admin.ModelAdmin):
 
 @admin.register(YearlyForecast)
 class YearlyForecastAdmin(admin.ModelAdmin):
-    list_display = ['year', 'overall_risk_level', 'drought_months',
+    list_display = ['year', 'location', 'overall_risk_level', 'drought_months',
                     'flood_risk_months', 'normal_months', 'created_at']
     list_filter = ['year', 'overall_risk_level']
-    search_fields = ['year', 'summary']
+    search_fields = ['year', 'summary', 'location__name']
     ordering = ['-year']
+    list_select_related = ['location']
     readonly_fields = ['created_at', 'updated_at']
 
     fieldsets = (
         ('Year', {
-            'fields': ('year',)
+            'fields': ('location', 'year')
         }),
         ('Annual Metrics', {
             'fields': ('total_precipitation', 'avg_temperature')
@@ -80,4 +122,14 @@ class YearlyForecastAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(Alert)
+class AlertAdmin(admin.ModelAdmin):
+    list_display = ['rule', 'location', 'severity', 'start_date', 'end_date', 'value', 'updated_at']
+    list_filter = ['severity', 'rule', 'location__kind']
+    search_fields = ['location__name', 'rule', 'message']
+    ordering = ['-updated_at']
+    list_select_related = ['location']
+    readonly_fields = ['created_at', 'updated_at']
@@ -0,0 +1,202 @@
+"""
+Threshold alerts evaluated incrementally as daily data is ingested.
+
+Each rule in settings.ALERT_RULES keeps a small AlertRuleState per
+location: the last day evaluated, the few trailing values its window
+needs and the open episode. An ingest batch only steps the rules through
+its new days, so the cost is proportional to the batch, not the history.
+Days that rewrite already evaluated dates (POWER revises recent days)
+update the stored window without re-raising alerts.
+
+Consecutive days on which a rule holds form one episode and extend a
+single Alert row, so a wet week raises one alert instead of seven.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .climatology import MONTH_OFFSETS, STATISTICS, ClimatologyService, day_slots
+from .models import Alert, AlertRuleState
+
+logger = logging.getLogger(__name__)
+
+# Days older than this when first evaluated only warm up rule state, so
+# syncing years of history does not flood the feed with old alerts
+ALERT_LOOKBACK_DAYS = 30
+
+
+class RollingSumRule:
+    """Fires when a field summed over the last `days` days reaches `threshold`"""
+
+    def __init__(self, name, field, days, threshold, severity, **options):
+        self.name = name
+        self.field = field
+        self.days = days
+        self.threshold = threshold
+        self.severity = severity
+
+    def start(self):
+        return {'window': {}, 'episode': None}
+
+    def prepare(self, location):
+        pass
+
+    def revise(self, state, day, value):
+        if day.isoformat() in state['window']:
+            state['window'][day.isoformat()] = value
+
+    def step(self, state, day, value):
+        """Evaluate one new day; returns the open episode or None"""
+        first = (day - timedelta(days=self.days - 1)).isoformat()
+        window = {key: stored for key, stored in state['window'].items() if key >= first}
+        window[day.isoformat()] = value
+        # Keep only the days the next evaluation can still see
+        state['window'] = {key: stored for key, stored in window.items() if key > first}
+
+        total = sum(window.values())
+        if total < self.threshold:
+            state['episode'] = None
+            return None
+        episode = state['episode'] or {'start': day.isoformat(), 'peak': total}
+        episode['peak'] = max(episode['peak'], total)
+        state['episode'] = episode
+        return {
+            'start_date': date.fromisoformat(episode['start']),
+            'value': episode['peak'],
+            'message': f"{total:.0f} mm of rain in {self.days} days (threshold {self.threshold} mm)",
+        }
+
+
+class MonthDeficitRule:
+    """Fires when month-to-date rainfall is `percent` below the normal to date"""
+
+    def __init__(self, name, field, percent, min_days, severity, **options):
+        self.name = name
+        self.field = field
+        self.threshold = percent
+        self.min_days = min_days
+        self.severity = severity
+
+    def start(self):
+        return {'month': None, 'values': {}, 'peak': None}
+
+    def prepare(self, location):
+        """Cumulative daily normal means for the location, or None without climatology"""
+        normals = ClimatologyService(location).normals().get((self.field, 'day'))
+        self.cumulative = None
+        if normals is not None:
+            means = np.nan_to_num(normals[STATISTICS.index('mean')].astype(float))
+            self.cumulative = np.cumsum(means)
+
+    def revise(self, state, day, value):
+        if day.strftime('%Y-%m') == state['month']:
+            state['values'][str(day.day)] = value
+
+    def step(self, state, day, value):
+        month = day.strftime('%Y-%m')
+        if month != state['month']:
+            state.update(month=month, values={}, peak=None)
+        state['values'][str(day.day)] = value
+        if self.cumulative is None or len(state['values']) < self.min_days:
+            return None
+
+        first_slot = MONTH_OFFSETS[day.month - 1]
+        slot = day_slots(day.month, day.day)
+        normal = self.cumulative[slot] - (self.cumulative[first_slot - 1] if first_slot else 0.0)
+        observed = sum(state['values'].values())
+        if normal <= 0:
+            return None
+        deficit = (1 - observed / normal) * 100
+        if deficit < self.threshold:
+            return None
+        state['peak'] = max(state['peak'] or deficit, deficit)
+        return {
+            'start_date': day.replace(day=1),
+            'value': state['peak'],
+            'message': (
+                f"Rainfall {deficit:.0f}% below normal for {day:%B %Y} to date "
+                f"({observed:.0f} of {normal:.0f} mm)"
+            ),
+        }
+
+
+RULE_KINDS = {
+    'rolling_sum': RollingSumRule,
+    'month_deficit': MonthDeficitRule,
+}
+
+
+def alert_rules():
+    return [RULE_KINDS[rule['kind']](**rule) for rule in settings.ALERT_RULES]
+
+
+def evaluate_alerts(rows, fields=None):
+    """Step every alert rule through a batch of WeatherData rows
+
+    Only rules whose field is among `fields` (default: all) are evaluated.
+    Returns the number of alerts raised or extended.
+    """
+    rules = [rule for rule in alert_rules() if fields is None or rule.field in fields]
+    if not rows or not rules:
+        return 0
+
+    by_location = defaultdict(list)
+    locations = {}
+    for row in rows:
+        by_location[row.location_id].append(row)
+        locations[row.location_id] = row.location
+
+    states = {
+        (state.location_id, state.rule): state
+        for state in AlertRuleState.objects.filter(
+            location_id__in=list(by_location), rule__in=[rule.name for rule in rules]
+        )
+    }
+    horizon = timezone.now().date() - timedelta(days=ALERT_LOOKBACK_DAYS)
+
+    alerts = {}
+    for location_id, location_rows in by_location.items():
+        location_rows.sort(key=lambda row: row.date)
+        for rule in rules:
+            rule.prepare(locations[location_id])
+            stored = states.get((location_id, rule.name))
+            if stored is None:
+                stored = AlertRuleState(location_id=location_id, rule=rule.name, last_date=date.min,
+                                        state=rule.start())
+                states[(location_id, rule.name)] = stored
+
+            for row in location_rows:
+                value = getattr(row, rule.field)
+                if value is None:
+                    continue
+                if row.date <= stored.last_date:
+                    rule.revise(stored.state, row.date, value)
+                    continue
+                stored.last_date = row.date
+                raised = rule.step(stored.state, row.date, value)
+                if raised is None or row.date < horizon:
+                    continue
+                alerts[(location_id, rule.name, raised['start_date'])] = Alert(
+                    location_id=location_id, rule=rule.name, severity=rule.severity,
+                    end_date=row.date, threshold=rule.threshold, **raised,
+                )
+
+    AlertRuleState.objects.bulk_create(
+        [state for state in states.values() if state.last_date != date.min],
+        update_conflicts=True,
+        unique_fields=['location', 'rule'],
+        update_fields=['last_date', 'state', 'updated_at'],
+    )
+    if alerts:
+        Alert.objects.bulk_create(
+            list(alerts.values()),
+            update_conflicts=True,
+            unique_fields=['location', 'rule', 'start_date'],
+            update_fields=['severity', 'end_date', 'value', 'threshold', 'message', 'updated_at'],
+        )
+        logger.info(f"Raised or extended {len(alerts)} alerts for {len(by_location)} locations")
+    return len(alerts)
@@ -0,0 +1,169 @@
+"""
+Parallel regeneration of monthly predictions and yearly forecasts.
+
+Each (location, year) is classified in a worker process from one bulk load
+of its daily rows, using the same rules as WeatherPredictionService but
+without touching the prediction tables. Results stream back to the calling
+process, which is the single writer and upserts them in batches.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DirtyMonth, WeatherData, WeatherPrediction, YearlyForecast
+from .services import ANALYSIS_FIELDS, WeatherPredictionService, monthly_stats_from_arrays
+
+logger = logging.getLogger(__name__)
+
+# (location, year) results written per transaction
+WRITE_BATCH_YEARS = 50
+
+
+def _init_worker():
+    django.setup()
+
+
+def classify_year(location, year):
+    """Monthly prediction values and the yearly forecast for one location-year
+
+    Returns (months, empty_months, forecast): prediction values by month,
+    months that have rows but no valid data, and forecast values or None.
+    """
+    stored = list(WeatherData.objects.filter(
+        location=location, date__year=year
+    ).order_by('date').values_list('date', *ANALYSIS_FIELDS))
+    if not stored:
+        return {}, [], None
+    service = WeatherPredictionService(location)
+
+    columns = list(zip(*stored))
+    month_of_day = np.array([day.month for day in columns[0]])
+    arrays = {field: np.array(columns[i + 1], dtype=float) for i, field in enumerate(ANALYSIS_FIELDS)}
+
+    months = {}
+    empty = []
+    for month in sorted(set(month_of_day.tolist())):
+        in_month = month_of_day == month
+        stats = monthly_stats_from_arrays({field: values[in_month] for field, values in arrays.items()})
+        values = service.prediction_values(year, month, stats)
+        if values is None:
+            empty.append(month)
+        else:
+            months[month] = values
+
+    forecast = service.yearly_values(year, months.values()) if months else None
+    return months, empty, forecast
+
+
+def _classify_task(task):
+    location, year = task
+    return (location.pk, year) + classify_year(location, year)
+
+
+class ForecastBackfill:
+    """Regenerate WeatherPrediction and YearlyForecast rows for ranges of years"""
+
+    def __init__(self, workers=1, write_batch_years=WRITE_BATCH_YEARS):
+        self.workers = max(workers, 1)
+        self.write_batch_years = write_batch_years
+
+    def run(self, locations, years, on_result=None):
+        """Backfill every (location, year); returns a summary dict
+
+        `on_result` is called once per finished location-year, e.g. to
+        advance a progress bar.
+        """
+        tasks = [(location, year) for location in locations for year in years]
+        started = time.monotonic()
+        self.claimed = timezone.now()
+        summary = {'years': 0, 'forecasts': 0, 'predictions': 0, 'writes': 0}
+
+        pending = []
+        for result in self._results(tasks):
+            pending.append(result)
+            if on_result:
+                on_result()
+            if len(pending) >= self.write_batch_years:
+                self._write(pending, summary)
+                pending = []
+        self._write(pending, summary)
+
+        summary['elapsed_seconds'] = time.monotonic() - started
+        logger.info(
+            f"Backfilled {summary['forecasts']} forecasts and {summary['predictions']} monthly "
+            f"predictions in {summary['elapsed_seconds']:.1f}s"
+        )
+        return summary
+
+    def _results(self, tasks):
+        if self.workers == 1:
+            for task in tasks:
+                yield _classify_task(task)
+            return
+
+        # Forked workers must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_classify_task, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _write(self, results, summary):
+        if not results:
+            return
+        predictions = []
+        forecasts = []
+        stale_months = Q()
+        stale_forecasts = Q()
+        processed = Q()
+        for location_id, year, months, empty, forecast in results:
+            for month, values in months.items():
+                predictions.append(WeatherPrediction(location_id=location_id, year=year, month=month, **values))
+            if empty:
+                stale_months |= Q(location_id=location_id, year=year, month__in=empty)
+            if forecast is None:
+                stale_forecasts |= Q(location_id=location_id, year=year)
+            else:
+                forecasts.append(YearlyForecast(location_id=location_id, year=year, **forecast))
+            processed |= Q(location_id=location_id, year=year)
+
+        with transaction.atomic():
+            if predictions:
+                WeatherPrediction.objects.bulk_create(
+                    predictions,
+                    batch_size=500,
+                    update_conflicts=True,
+                    unique_fields=['location', 'year', 'month'],
+                    update_fields=_update_fields(WeatherPrediction) + ['updated_at'],
+                )
+            if forecasts:
+                YearlyForecast.objects.bulk_create(
+                    forecasts,
+                    batch_size=500,
+                    update_conflicts=True,
+                    unique_fields=['location', 'year'],
+                    update_fields=_update_fields(YearlyForecast) + ['updated_at'],
+                )
+            if stale_months:
+                WeatherPrediction.objects.filter(stale_months).delete()
+            if stale_forecasts:
+                YearlyForecast.objects.filter(stale_forecasts).delete()
+            # Months marked after the backfill started still need a recompute
+            DirtyMonth.objects.filter(processed, marked_at__lte=self.claimed).delete()
+
+        summary['years'] += len(results)
+        summary['forecasts'] += len(forecasts)
+        summary['predictions'] += len(predictions)
+        summary['writes'] += 1
+
+
+def _update_fields(model):
+    """Concrete fields set by the classifier, excluding keys and timestamps"""
+    skipped = {'id', 'location', 'year', 'month', 'created_at', 'updated_at'}
+    return [field.name for field in model._meta.concrete_fields if field.name not in skipped]
@@ -0,0 +1,303 @@
+"""
+Long-term climatology normals for "this month vs normal" comparisons.
+
+A location's daily history is laid out as a [field][year][day slot] cube on
+a 366-day calendar (so Feb 29 has its own slot) and every statistic is
+computed in one vectorized pass over it: day-of-year normals pool a
+centered window of days across all years, monthly normals use each year's
+monthly total (for accumulated fields) or mean. Results are packed into
+one ClimatologyNormal row per (location, parameter, period).
+
+After an ingest only the calendar months whose daily data changed are
+recomputed, from the rows of those months and their neighbours. That runs
+before the ingest re-exports the weather snapshot, so it reads the packed
+series when WEATHER_SERIES_STORAGE is on and the database otherwise; full
+rebuilds and observed-month lookups read the snapshot when they are given
+one. Readers keep decoded normals in process memory and
+reload them when the location's rows change, which they detect from the
+row count and latest updated_at in the database, so writes made by other
+processes are picked up too.
+"""
+import calendar
+import logging
+import warnings
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import ClimatologyNormal, WeatherData
+from .series import SERIES_FIELDS, read_series
+
+logger = logging.getLogger(__name__)
+
+CLIMATOLOGY_FIELDS = SERIES_FIELDS
+
+# Fields whose monthly value is the total of the days rather than the mean
+ACCUMULATED_FIELDS = ['precipitation', 'pet_hargreaves', 'pet_penman_monteith', 'water_balance']
+
+STATISTICS = ['mean', 'std', 'p10', 'p50', 'p90', 'years']
+PERCENTILES = [10, 50, 90]
+
+DAY_SLOTS = 366
+# First day slot of each month on the leap-year calendar
+MONTH_OFFSETS = np.cumsum([0] + [calendar.monthrange(2000, month)[1] for month in range(1, 12)])
+PERIOD_SLOTS = {'day': DAY_SLOTS, 'month': 12}
+
+_loaded = {}  # location_id -> (data version, {(parameter, period): ndarray})
+
+
+def day_slots(months, days):
+    """Day-of-year slot (0-365) on the leap-year calendar"""
+    return MONTH_OFFSETS[np.asarray(months) - 1] + np.asarray(days) - 1
+
+
+def climatology_cube(dates, arrays, fields=CLIMATOLOGY_FIELDS):
+    """Daily values as (years, cube[field][year][day slot]) with NaN for missing days"""
+    years = np.array([day.year for day in dates])
+    found, row = np.unique(years, return_inverse=True)
+    slot = day_slots([day.month for day in dates], [day.day for day in dates])
+    cube = np.full((len(fields), len(found), DAY_SLOTS), np.nan)
+    for i, field in enumerate(fields):
+        cube[i, row, slot] = arrays[field]
+    return found, cube
+
+
+def _statistics(values, axis):
+    """STATISTICS over `axis`, stacked as [..., statistic, slot]"""
+    counts = np.isfinite(values).sum(axis=axis)
+    with warnings.catch_warnings():
+        # Slots with no data at all come out as NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(values, axis=axis)
+        std = np.nanstd(values, axis=axis)
+        percentiles = np.nanpercentile(values, PERCENTILES, axis=axis)
+    return np.stack([mean, std, *percentiles, counts], axis=-2)
+
+
+def daily_normals(cube, window_days):
+    """[field][statistic][day slot] pooling `window_days` centered days of every year
+
+    The window wraps around the year end.
+    """
+    half = window_days // 2
+    windowed = np.concatenate([np.roll(cube, shift, axis=2) for shift in range(-half, half + 1)], axis=1)
+    normals = _statistics(windowed, axis=1)
+    # 'years' counts samples; report how many years contributed to the centre day
+    normals[:, STATISTICS.index('years')] = np.isfinite(cube).sum(axis=1)
+    return normals
+
+
+def monthly_values(years, cube, fields=CLIMATOLOGY_FIELDS, min_coverage=0.8):
+    """[field][year][month] totals or means; NaN for months below the coverage"""
+    counts = np.add.reduceat(np.isfinite(cube).astype(int), MONTH_OFFSETS, axis=2)
+    sums = np.add.reduceat(np.nan_to_num(cube), MONTH_OFFSETS, axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = np.where(np.isin(fields, ACCUMULATED_FIELDS)[:, None, None], sums, sums / counts)
+    month_days = np.array([[calendar.monthrange(year, month)[1] for month in range(1, 13)] for year in years])
+    values[counts < min_coverage * month_days] = np.nan
+    return values
+
+
+def monthly_normals(years, cube, fields=CLIMATOLOGY_FIELDS, min_coverage=0.8):
+    """[field][statistic][month] over the years' monthly values"""
+    return _statistics(monthly_values(years, cube, fields, min_coverage), axis=1)
+
+
+def encode(normals):
+    return np.asarray(normals, dtype=np.float32).tobytes()
+
+
+def decode(values, period):
+    return np.frombuffer(bytes(values), dtype=np.float32).reshape(len(STATISTICS), PERIOD_SLOTS[period])
+
+
+def _affected_slots(months, half_window):
+    """Day slots of the months plus those whose window reaches into them"""
+    return np.unique(np.concatenate([
+        np.arange(
+            MONTH_OFFSETS[month - 1] - half_window,
+            MONTH_OFFSETS[month - 1] + calendar.monthrange(2000, month)[1] + half_window,
+        ) % DAY_SLOTS
+        for month in months
+    ]))
+
+
+class ClimatologyService:
+    """Compute, store and read the climatology normals of one location"""
+
+    def __init__(self, location, snapshot=None):
+        self.location = location
+        # Optional WeatherSnapshot to read daily data from instead of the database
+        self.snapshot = snapshot
+        config = settings.CLIMATOLOGY
+        self.base_period = config['base_period']
+        self.window_days = config['window_days']
+        self.min_coverage = config['min_month_coverage']
+
+    def refresh(self, months=None):
+        """Recompute normals for the given calendar months (default: all)
+
+        Returns the number of stored rows that changed.
+        """
+        months = sorted(set(months or range(1, 13)))
+        days = self._snapshot_days(*(self._base_dates() or (None, None)))
+        if days is None:
+            days = read_series(self.location, *(self._base_dates() or (None, None)), CLIMATOLOGY_FIELDS)
+        if days is None:
+            queryset = WeatherData.objects.filter(location=self.location)
+            if len(months) < 12:
+                # Day-of-year windows reach into the neighbouring months
+                loaded = set(months) | {month % 12 + 1 for month in months} | {(month - 2) % 12 + 1 for month in months}
+                queryset = queryset.filter(date__month__in=sorted(loaded))
+            if self.base_period:
+                queryset = queryset.filter(date__year__range=self.base_period)
+            days = _stored_days(queryset)
+        if days is None:
+            return 0
+        years, cube = climatology_cube(*days)
+
+        computed = {
+            'day': daily_normals(cube, self.window_days),
+            'month': monthly_normals(years, cube, min_coverage=self.min_coverage),
+        }
+        slots = {'day': _affected_slots(months, self.window_days // 2), 'month': np.array(months) - 1}
+        return self._write(computed, slots)
+
+    def _base_dates(self):
+        """(first_date, last_date) of the base period, or None to use every year"""
+        if not self.base_period:
+            return None
+        return date(self.base_period[0], 1, 1), date(self.base_period[1], 12, 31)
+
+    def _snapshot_days(self, start_date=None, end_date=None):
+        """(dates, arrays) from the snapshot, or None if it does not cover the range"""
+        if self.snapshot is None:
+            return None
+        series = self.snapshot.series(self.location, start_date, end_date, CLIMATOLOGY_FIELDS)
+        if series is None or not series[0]:
+            return None
+        return series
+
+    def _write(self, computed, slots):
+        existing = {
+            (parameter, period): bytes(values)
+            for parameter, period, values in ClimatologyNormal.objects.filter(
+                location=self.location
+            ).values_list('parameter', 'period', 'values')
+        }
+        changed = []
+        for period, normals in computed.items():
+            for i, parameter in enumerate(CLIMATOLOGY_FIELDS):
+                stored = existing.get((parameter, period))
+                if stored is None:
+                    current = np.full((len(STATISTICS), PERIOD_SLOTS[period]), np.nan, dtype=np.float32)
+                else:
+                    current = decode(stored, period).copy()
+                current[:, slots[period]] = normals[i][:, slots[period]]
+                values = encode(current)
+                if values != stored:
+                    changed.append(ClimatologyNormal(
+                        location=self.location, parameter=parameter, period=period, values=values
+                    ))
+
+        if changed:
+            ClimatologyNormal.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['location', 'parameter', 'period'],
+                update_fields=['values', 'updated_at'],
+            )
+        return len(changed)
+
+    def data_version(self):
+        """Row count and latest write of the location's normals"""
+        state = ClimatologyNormal.objects.filter(location=self.location).aggregate(
+            count=Count('id'), latest=Max('updated_at')
+        )
+        return state['count'], state['latest']
+
+    def normals(self):
+        """Decoded normals as {(parameter, period): ndarray[statistic][slot]}, kept in memory"""
+        version = self.data_version()
+        loaded = _loaded.get(self.location.pk)
+        if loaded is None or loaded[0] != version:
+            loaded = (version, {
+                (parameter, period): decode(values, period)
+                for parameter, period, values in ClimatologyNormal.objects.filter(
+                    location=self.location
+                ).values_list('parameter', 'period', 'values')
+            })
+            _loaded[self.location.pk] = loaded
+        return loaded[1]
+
+    def month_vs_normal(self, year, month):
+        """Observed monthly values next to their normals, anomaly and band per parameter
+
+        Numbers are rounded and missing values are None.
+        """
+        month_dates = date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+        days = self._snapshot_days(*month_dates)
+        if days is None:
+            days = read_series(self.location, *month_dates, CLIMATOLOGY_FIELDS)
+        if days is None:
+            days = _stored_days(WeatherData.objects.filter(
+                location=self.location, date__year=year, date__month=month
+            ))
+        observed = np.full(len(CLIMATOLOGY_FIELDS), np.nan)
+        if days is not None:
+            years, cube = climatology_cube(*days)
+            observed = monthly_values(years, cube, min_coverage=self.min_coverage)[:, 0, month - 1]
+
+        normals = self.normals()
+        comparison = {}
+        for i, parameter in enumerate(CLIMATOLOGY_FIELDS):
+            stored_normals = normals.get((parameter, 'month'))
+            if stored_normals is None:
+                continue
+            statistics = dict(zip(STATISTICS, stored_normals[:, month - 1].astype(float)))
+            values = {'observed': observed[i], **statistics, **_anomaly(observed[i], statistics)}
+            comparison[parameter] = {key: _rounded(value) for key, value in values.items()}
+        return comparison
+
+
+def _stored_days(queryset):
+    """(dates, arrays) of the queryset's WeatherData rows, or None if there are none"""
+    stored = list(queryset.order_by('date').values_list('date', *CLIMATOLOGY_FIELDS))
+    if not stored:
+        return None
+    columns = list(zip(*stored))
+    return list(columns[0]), {
+        field: np.array(columns[i + 1], dtype=float) for i, field in enumerate(CLIMATOLOGY_FIELDS)
+    }
+
+
+def refresh_climatology(months):
+    """Recompute normals for {location: calendar months whose daily data changed}"""
+    total = 0
+    for location, location_months in months.items():
+        total += ClimatologyService(location).refresh(location_months)
+    if total:
+        logger.info(f"Refreshed {total} climatology rows for {len(months)} locations")
+    return total
+
+
+def _rounded(value):
+    if isinstance(value, str) or value is None:
+        return value
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def _anomaly(observed, statistics):
+    if np.isnan(observed) or np.isnan(statistics['mean']):
+        return {'anomaly': np.nan, 'z_score': np.nan, 'band': None}
+    anomaly = observed - statistics['mean']
+    z_score = anomaly / statistics['std'] if statistics['std'] else np.nan
+    if observed < statistics['p10']:
+        band = 'well below normal'
+    elif observed > statistics['p90']:
+        band = 'well above normal'
+    else:
+        band = 'near normal'
+    return {'anomaly': anomaly, 'z_score': z_score, 'band': band}
@@ -0,0 +1,80 @@
+"""
+Chart-oriented downsampling of long daily series.
+
+Smooth series use Largest-Triangle-Three-Buckets, which keeps the points
+that shape the line as drawn. Spiky accumulated series such as rainfall
+use a min/max envelope instead, so that no storm peak disappears into a
+bucket. Both return indices into the input, so dates stay exact and the
+output never exceeds `max_points` however long the input range is.
+"""
+import numpy as np
+
+# Fields downsampled to a per-bucket min/max envelope instead of LTTB
+ENVELOPE_FIELDS = ['precipitation', 'max_hourly_precipitation']
+
+
+def _buckets(n, count):
+    """Bucket boundaries splitting range(n) into `count` near-equal buckets"""
+    return np.linspace(0, n, count + 1).astype(int)
+
+
+def lttb(x, y, max_points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps
+
+    The first and last points are always kept; the rest are chosen one per
+    bucket as the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges = _buckets(n - 2, max_points - 2) + 1
+    # Mean of each bucket, plus the last point as the bucket after the final one
+    sums_x = np.add.reduceat(x[1:-1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:-1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    next_x = np.append(sums_x[1:] / sizes[1:], x[-1])
+    next_y = np.append(sums_y[1:] / sizes[1:], y[-1])
+
+    kept = np.empty(max_points, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - next_x[bucket]) * (y[start:end] - py) - (px - x[start:end]) * (next_y[bucket] - py))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax_envelope(y, max_points):
+    """Indices of each bucket's minimum and maximum, in order, for at most `max_points` points"""
+    n = len(y)
+    if max_points >= n or max_points < 2:
+        return np.arange(n)
+
+    count = max_points // 2
+    size = -(-n // count)
+    padded = np.full(count * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(count, size)
+    offsets = np.arange(count) * size
+    lows = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+
+    kept = np.unique(np.concatenate([lows, highs]))
+    return kept[kept < n]
+
+
+def downsample(values, max_points, envelope=False):
+    """Indices of a daily series to plot with at most `max_points` points
+
+    Missing (NaN) days are dropped before downsampling.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.flatnonzero(~np.isnan(values))
+    if envelope:
+        return finite[minmax_envelope(values[finite], max_points)]
+    return finite[lttb(finite.astype(float), values[finite], max_points)]
@@ -0,0 +1,280 @@
+"""
+Live dashboard events pushed over Server-Sent Events.
+
+One Broadcaster per server process fans events out to every connected
+client, so dashboards stop polling current_conditions and the alert
+feed. Events come from a single watcher task that checks the database
+every few seconds for new or extended alerts, changes in the current
+month's conditions and completed syncs. Ingest usually runs in another
+process (cron, management commands), so the watcher finds its writes
+wherever they happened, and one query per process replaces one per tab.
+
+Each client has a bounded queue. A client that falls too far behind is
+disconnected instead of buffering without limit; the browser reconnects
+with Last-Event-ID and is replayed what it missed. Event ids follow the
+(updated_at, id) order of alerts, both live and replayed: an alert's id is
+its updated_at in microseconds and its primary key, and other events take
+the position of the latest alert plus a sequence number. Recent events
+come from a short in-process backlog, and alerts after the id's position
+are read back from the database, so a client resumes its alerts even when
+it reconnects to a different process or the watcher stopped while nobody
+was listening. Replay is at least once; an alert may arrive twice around
+a reconnect.
+Idle connections cost one suspended coroutine each, which is what lets a
+process hold thousands of them under ASGI.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Alert, Location, WeatherPrediction
+from .serializers import AlertSerializer
+
+logger = logging.getLogger(__name__)
+
+# Ends a client's stream after its queue overflowed
+DISCONNECT = None
+
+# Event id timestamps count microseconds from here
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class Client:
+    """One connected stream and its bounded queue of pending events"""
+
+    def __init__(self, queue_size, location_id=None):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.location_id = location_id
+
+    def wants(self, location_id):
+        return self.location_id is None or location_id is None or location_id == self.location_id
+
+
+class Broadcaster:
+    """Fan events out to every connected client of this process"""
+
+    def __init__(self, queue_size, backlog, poll_seconds):
+        self.queue_size = queue_size
+        self.poll_seconds = poll_seconds
+        self.clients = set()
+        self.backlog = deque(maxlen=backlog)
+        # (updated_at microseconds, alert id) of the latest alert published
+        self.position = (_event_id(timezone.now()), 0)
+        self.sequence = 0
+        self.watcher = None
+
+    def publish(self, event, data, location_id=None, position=None):
+        """Queue an event for every interested client; must run on the event loop
+
+        Alert events pass their alert's position, see alert_position.
+        """
+        if position is not None:
+            event_id = (*position, 0)
+            if position > self.position:
+                self.position, self.sequence = position, 0
+        else:
+            self.sequence += 1
+            event_id = (*self.position, self.sequence)
+        item = (event_id, event, json.dumps(data, default=str), location_id)
+        self.backlog.append(item)
+        for client in list(self.clients):
+            if client.wants(location_id):
+                self._deliver(client, item)
+
+    def _deliver(self, client, item):
+        try:
+            client.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            logger.info("Disconnecting an event stream client that fell behind")
+            self.clients.discard(client)
+            # Make room for the disconnect marker; the client resumes from its last id
+            client.queue.get_nowait()
+            client.queue.put_nowait(DISCONNECT)
+
+    async def subscribe(self, last_event_id=None, location_id=None):
+        """Register a client, replaying events newer than `last_event_id`"""
+        client = Client(self.queue_size, location_id)
+        watcher = None
+        if self.watcher is None or self.watcher.done():
+            # Created before the replay query, so alerts written meanwhile are published
+            watcher = DatabaseWatcher()
+        if last_event_id is not None:
+            stored = await sync_to_async(stored_alert_events)(last_event_id, location_id, self.queue_size)
+            backlog = [item for item in self.backlog if item[0] > last_event_id and client.wants(item[3])]
+            seen = {item[0] for item in backlog}
+            missed = sorted(backlog + [item for item in stored if item[0] not in seen], key=lambda item: item[0])
+            for item in missed[-self.queue_size:]:
+                client.queue.put_nowait(item)
+        self.clients.add(client)
+        if watcher is not None and (self.watcher is None or self.watcher.done()):
+            self.watcher = asyncio.get_running_loop().create_task(self._watch(watcher))
+        return client
+
+    def unsubscribe(self, client):
+        self.clients.discard(client)
+
+    async def _watch(self, watcher):
+        while self.clients:
+            try:
+                events = await sync_to_async(watcher.poll)()
+            except Exception as e:
+                logger.error(f"Error polling for live events: {e}")
+                events = []
+            for event, data, location_id, position in events:
+                self.publish(event, data, location_id, position)
+                # Let clients drain between events so a burst only drops slow ones
+                await asyncio.sleep(0)
+            await asyncio.sleep(self.poll_seconds)
+
+
+def stored_alert_events(last_event_id, location_id=None, limit=100):
+    """Events for alerts after the (updated_at, id) position of `last_event_id`, oldest first
+
+    Ids match the ones the watcher publishes, so resuming from either
+    continues after the same alert.
+    """
+    close_old_connections()
+    try:
+        alerts = Alert.objects.filter(_after(last_event_id[:2])).select_related('location')
+        if location_id is not None:
+            alerts = alerts.filter(location_id=location_id)
+        alerts = list(alerts.order_by('-updated_at', '-id')[:limit])
+    finally:
+        close_old_connections()
+    return [
+        ((*alert_position(alert), 0), 'alert', json.dumps(AlertSerializer(alert).data, default=str), alert.location_id)
+        for alert in reversed(alerts)
+    ]
+
+
+def _event_id(moment):
+    """Microseconds since EPOCH, the timestamp part of an event id"""
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def alert_position(alert):
+    """(updated_at microseconds, id) ordering an alert among event ids"""
+    return _event_id(alert.updated_at), alert.pk
+
+
+def _after(position):
+    """Alerts after an (updated_at microseconds, id) position"""
+    updated_at = EPOCH + timedelta(microseconds=position[0])
+    return Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=position[1])
+
+
+def format_event_id(event_id):
+    return '-'.join(str(part) for part in event_id)
+
+
+def parse_event_id(value):
+    """Event id tuple from a Last-Event-ID header; raises ValueError
+
+    A bare microsecond timestamp is accepted as the start of that moment.
+    """
+    parts = [int(part) for part in value.split('-')]
+    if not 1 <= len(parts) <= 3 or min(parts) < 0:
+        raise ValueError(f"Invalid event id '{value}'")
+    return tuple(parts + [0] * (3 - len(parts)))
+
+
+class DatabaseWatcher:
+    """Detect alerts, condition changes and syncs since the previous poll"""
+
+    def __init__(self):
+        self.alert_position = (_event_id(timezone.now()), 0)
+        self.conditions = None
+        self.synced = None
+
+    def poll(self):
+        """Events as (event, data, location_id, alert position or None)
+
+        Alerts are reported from the watcher's creation; the first call only
+        records the current conditions and syncs.
+        """
+        close_old_connections()
+        try:
+            return self._alerts() + self._conditions() + self._syncs()
+        finally:
+            close_old_connections()
+
+    def _alerts(self):
+        alerts = list(
+            Alert.objects.filter(_after(self.alert_position))
+            .select_related('location').order_by('updated_at', 'id')
+        )
+        if alerts:
+            self.alert_position = alert_position(alerts[-1])
+        return [
+            ('alert', AlertSerializer(alert).data, alert.location_id, alert_position(alert)) for alert in alerts
+        ]
+
+    def _conditions(self):
+        today = timezone.now().date()
+        current = {
+            prediction['location']: prediction
+            for prediction in WeatherPrediction.objects.filter(year=today.year, month=today.month).values(
+                'location', 'year', 'month', 'condition', 'severity', 'monthly_precipitation',
+                'avg_temperature',
+            )
+        }
+        previous, self.conditions = self.conditions, current
+        if previous is None:
+            return []
+        return [
+            ('conditions', prediction, location_id, None)
+            for location_id, prediction in current.items()
+            if location_id not in previous
+            or (previous[location_id]['condition'], previous[location_id]['severity'])
+            != (prediction['condition'], prediction['severity'])
+        ]
+
+    def _syncs(self):
+        current = dict(Location.objects.filter(is_active=True).values_list('id', 'last_synced_date'))
+        previous, self.synced = self.synced, current
+        if previous is None:
+            return []
+        return [
+            ('sync', {'location': location_id, 'last_synced_date': synced}, location_id, None)
+            for location_id, synced in current.items()
+            if synced is not None and synced != previous.get(location_id)
+        ]
+
+
+_broadcaster = None
+
+
+def broadcaster():
+    """The process-wide Broadcaster"""
+    global _broadcaster
+    if _broadcaster is None:
+        config = settings.EVENT_STREAM
+        _broadcaster = Broadcaster(config['queue_size'], config['backlog'], config['poll_seconds'])
+    return _broadcaster
+
+
+async def event_stream(client, heartbeat_seconds, retry_ms):
+    """SSE frames for one client until it disconnects or falls behind"""
+    try:
+        yield f'retry: {retry_ms}\n\n'
+        while True:
+            try:
+                item = await asyncio.wait_for(client.queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # A comment line keeps proxies from closing an idle connection
+                yield ': heartbeat\n\n'
+                continue
+            if item is DISCONNECT:
+                return
+            event_id, event, data, _ = item
+            yield f'id: {format_event_id(event_id)}\nevent: {event}\ndata: {data}\n\n'
+    finally:
+        broadcaster().unsubscribe(client)
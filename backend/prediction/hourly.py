@@ -0,0 +1,282 @@
+"""
+Hourly NASA POWER ingestion with rollups into the daily and monthly views.
+
+Each (location, day) is one HourlyWeatherDay row whose `values` blob packs
+float32 readings as [field][hour], so 40 years of hourly data costs ~15k
+rows and ~7 MB per location rather than 350k rows. Days are requested in
+local solar time so they line up with the daily series. Rollups rebuild
+only the days touched by a sync: new days get a full WeatherData row
+derived from the hourly readings, days already filled by the daily
+endpoint only gain their peak hourly intensity, and the months that
+changed are re-analyzed so the intensity feeds flash-flood classification.
+"""
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.db import transaction
+
+from .models import HourlyWeatherDay, Location
+from .quality import DEFAULT_FILL_VALUE
+from .services import (
+    PARAMETER_FIELDS, STREAM_CHUNK_SIZE, NASAPowerService, recompute_dirty_months,
+    write_weather_rows,
+)
+from .streaming import PowerStreamDecoder
+
+logger = logging.getLogger(__name__)
+
+# Field for each hourly POWER parameter; the order fixes the blob layout
+HOURLY_PARAMETERS = {
+    'PRECTOTCORR': 'precipitation',
+    'T2M': 'temperature',
+    'RH2M': 'relative_humidity',
+    'WS2M': 'wind_speed',
+    'ALLSKY_SFC_SW_DWN': 'solar_radiation',
+}
+HOURLY_FIELDS = list(HOURLY_PARAMETERS.values())
+HOURS = 24
+
+# Plausible hourly ranges; values outside are treated as missing
+HOURLY_BOUNDS = {
+    'precipitation': (0.0, 200.0),  # mm/hour
+    'temperature': (-5.0, 55.0),  # °C
+    'relative_humidity': (0.0, 100.0),  # %
+    'wind_speed': (0.0, 40.0),  # m/s
+    'solar_radiation': (0.0, 1400.0),  # Wh/m²
+}
+
+# Hours a field needs on a day before it is rolled up into a daily value
+MIN_VALID_HOURS = 20
+
+# Rainfall that counts an hour as wet (mm/hour)
+WET_HOUR_MM = 0.1
+
+# Hourly radiation sums are Wh/m²; the daily series is MJ/m²/day
+WH_TO_MJ = 0.0036
+
+# The hourly endpoint serves at most a year per request
+REQUEST_DAYS = 366
+
+
+def pack(day_matrix):
+    """Serialize one day's [field][hour] readings"""
+    return np.asarray(day_matrix, dtype=np.float32).tobytes()
+
+
+def unpack(blobs):
+    """Stack packed days into a (days, fields, hours) float array"""
+    if not blobs:
+        return np.empty((0, len(HOURLY_FIELDS), HOURS))
+    data = np.frombuffer(b''.join(bytes(blob) for blob in blobs), dtype=np.float32)
+    return data.reshape(-1, len(HOURLY_FIELDS), HOURS).astype(float)
+
+
+def clean_hourly(matrix, fill_value=DEFAULT_FILL_VALUE):
+    """Replace fill values and implausible readings with NaN in place"""
+    matrix[matrix == fill_value] = np.nan
+    for position, field in enumerate(HOURLY_FIELDS):
+        low, high = HOURLY_BOUNDS[field]
+        values = matrix[:, position]
+        with np.errstate(invalid='ignore'):
+            values[(values < low) | (values > high)] = np.nan
+    return matrix
+
+
+def _hour_counts(values):
+    valid = ~np.isnan(values)
+    return np.where(valid, values, 0.0), valid.sum(axis=1)
+
+
+def daily_sum(values):
+    """Sum (days, hours) readings, NaN for days with too few valid hours"""
+    filled, counts = _hour_counts(values)
+    return np.where(counts >= MIN_VALID_HOURS, filled.sum(axis=1), np.nan)
+
+
+def daily_mean(values):
+    """Average (days, hours) readings, NaN for days with too few valid hours"""
+    filled, counts = _hour_counts(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts >= MIN_VALID_HOURS, filled.sum(axis=1) / counts, np.nan)
+
+
+def daily_from_hourly(matrix):
+    """Daily per-field arrays, in WeatherData units, from a (days, fields, hours) matrix
+
+    Also returns 'max_intensity', the highest hourly rainfall of each day.
+    """
+    column = {field: matrix[:, position] for position, field in enumerate(HOURLY_FIELDS)}
+    temperature = daily_mean(column['temperature'])
+    covered = ~np.isnan(temperature)
+    return {
+        'precipitation': daily_sum(column['precipitation']),
+        'temperature': temperature,
+        'temperature_max': np.where(covered, np.fmax.reduce(column['temperature'], axis=1), np.nan),
+        'temperature_min': np.where(covered, np.fmin.reduce(column['temperature'], axis=1), np.nan),
+        'relative_humidity': daily_mean(column['relative_humidity']),
+        'wind_speed': daily_mean(column['wind_speed']),
+        'solar_radiation': daily_sum(column['solar_radiation']) * WH_TO_MJ,
+        'max_intensity': np.fmax.reduce(column['precipitation'], axis=1),
+    }
+
+
+def day_summaries(matrix):
+    """Per-day rainfall summary columns for HourlyWeatherDay"""
+    rain = matrix[:, HOURLY_FIELDS.index('precipitation')]
+    valid = ~np.isnan(rain)
+    with np.errstate(invalid='ignore'):
+        wet = (rain >= WET_HOUR_MM).sum(axis=1)
+    return {
+        'precipitation_total': daily_sum(rain),
+        'max_intensity': np.fmax.reduce(rain, axis=1),
+        'peak_hour': np.where(valid, rain, -np.inf).argmax(axis=1),
+        'wet_hours': wet,
+        'valid_hours': valid.sum(axis=1),
+    }
+
+
+def _nullable(value):
+    return None if np.isnan(value) else float(value)
+
+
+class HourlyWeatherService:
+    """Fetch, store and roll up hourly NASA POWER data for one location"""
+
+    def __init__(self, location=None, session=None):
+        self.location = location or Location.get_default()
+        self.base_url = settings.NASA_POWER_HOURLY_API_URL
+        self.http = session or requests
+
+    def _request_params(self, start_date, end_date):
+        return {
+            'parameters': ','.join(HOURLY_PARAMETERS),
+            'community': 'AG',
+            'longitude': self.location.longitude,
+            'latitude': self.location.latitude,
+            'start': start_date.strftime('%Y%m%d'),
+            'end': end_date.strftime('%Y%m%d'),
+            'time-standard': 'LST',
+            'format': 'JSON',
+        }
+
+    def fetch_hourly(self, start_date, end_date):
+        """Stream an hourly response into (dates, (days, fields, hours) matrix), or None on failure"""
+        decoder = PowerStreamDecoder(start_date, end_date, HOURLY_PARAMETERS, steps_per_day=HOURS)
+        params = self._request_params(start_date, end_date)
+        try:
+            with self.http.get(self.base_url, params=params, timeout=120, stream=True) as response:
+                response.raise_for_status()
+                dates, values = decoder.decode(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Error fetching hourly NASA POWER data for {self.location.name}: {e}")
+            return None
+
+        if not dates:
+            return [], np.empty((0, len(HOURLY_FIELDS), HOURS))
+        missing = np.full(len(dates) * HOURS, np.nan)
+        matrix = np.stack(
+            [values.get(parameter, missing).reshape(-1, HOURS) for parameter in HOURLY_PARAMETERS],
+            axis=1,
+        )
+        fill_value = DEFAULT_FILL_VALUE if decoder.fill_value is None else decoder.fill_value
+        return dates, clean_hourly(matrix, fill_value)
+
+    def store(self, dates, matrix):
+        """Upsert packed days; returns the number of days that did not exist before"""
+        if not dates:
+            return 0
+        summaries = day_summaries(matrix)
+        rows = []
+        for i, day in enumerate(dates):
+            rain_hours = int(summaries['valid_hours'][i])
+            rows.append(HourlyWeatherDay(
+                location=self.location,
+                date=day,
+                values=pack(matrix[i]),
+                precipitation_total=_nullable(summaries['precipitation_total'][i]),
+                max_intensity=_nullable(summaries['max_intensity'][i]),
+                peak_hour=int(summaries['peak_hour'][i]) if rain_hours else None,
+                wet_hours=int(summaries['wet_hours'][i]),
+                valid_hours=rain_hours,
+            ))
+
+        existing = set(HourlyWeatherDay.objects.filter(
+            location=self.location, date__range=(dates[0], dates[-1])
+        ).values_list('date', flat=True))
+        with transaction.atomic():
+            HourlyWeatherDay.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['location', 'date'],
+                update_fields=[
+                    'values', 'precipitation_total', 'max_intensity', 'peak_hour',
+                    'wet_hours', 'valid_hours', 'updated_at',
+                ],
+            )
+        return sum(1 for day in dates if day not in existing)
+
+    def load(self, start_date, end_date):
+        """Stored days in a range as (dates, (days, fields, hours) matrix)"""
+        days = list(HourlyWeatherDay.objects.filter(
+            location=self.location, date__range=(start_date, end_date)
+        ).order_by('date').values_list('date', 'values'))
+        return [day for day, _ in days], unpack([blob for _, blob in days])
+
+    def rollup(self, start_date, end_date):
+        """Rebuild daily and monthly records for a range from stored hourly data
+
+        Returns the number of daily rows written.
+        """
+        dates, matrix = self.load(start_date, end_date)
+        if not dates:
+            return 0
+
+        daily = daily_from_hourly(matrix)
+        arrays = {field: daily[field] for field in PARAMETER_FIELDS.values()}
+        rows = NASAPowerService(self.location).rows_from_arrays(dates, arrays)
+        intensity = dict(zip(dates, daily['max_intensity']))
+        for row in rows:
+            row.max_hourly_precipitation = _nullable(intensity.get(row.date, np.nan))
+
+        # Days already loaded from the daily endpoint keep their values and
+        # only gain the hourly intensity
+        write_weather_rows(rows, update_fields=['max_hourly_precipitation', 'updated_at'])
+
+        recompute_dirty_months([self.location])
+        logger.info(f"Rolled up {len(rows)} days of hourly data for {self.location.name}")
+        return len(rows)
+
+    def sync_range(self, start_date, end_date):
+        """Fetch, store and roll up a range in yearly requests
+
+        Returns (hourly days stored, new hourly days), or None if any request failed.
+        """
+        stored = created = 0
+        window_start = start_date
+        while window_start <= end_date:
+            window_end = min(window_start + timedelta(days=REQUEST_DAYS - 1), end_date)
+            fetched = self.fetch_hourly(window_start, window_end)
+            if fetched is None:
+                return None
+            dates, matrix = fetched
+            created += self.store(dates, matrix)
+            if dates:
+                self.rollup(dates[0], dates[-1])
+            stored += len(dates)
+            window_start = window_end + timedelta(days=1)
+        return stored, created
+
+
+def stale_range(location, today=None):
+    """Days to request for an incremental hourly sync of a location"""
+    today = today or date.today()
+    latest = HourlyWeatherDay.objects.filter(location=location).order_by('-date').values_list(
+        'date', flat=True
+    ).first()
+    if latest is None:
+        return today - timedelta(days=REQUEST_DAYS - 1), today
+    return min(latest - timedelta(days=settings.WEATHER_INGESTION['refetch_days']), today), today
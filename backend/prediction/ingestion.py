@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import numpy as np
+import requests
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Location
+from .regional import NASAPowerRegionalService
+from .services import NASAPowerService, recompute_dirty_months, write_weather_rows
+from .snapshot import refresh_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def grid_points(bbox, spacing):
+    """Cell-centre (lat, lon) pairs covering a (min_lon, min_lat, max_lon, max_lat) box"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lats = np.arange(min_lat + spacing / 2, max_lat, spacing)
+    lons = np.arange(min_lon + spacing / 2, max_lon, spacing)
+    return [(round(float(lat), 4), round(float(lon), 4)) for lat in lats for lon in lons]
+
+
+class IngestionReport:
+    def __init__(self):
+        self.locations = 0
+        self.requests = 0
+        self.synced = 0
+        self.failed = []
+        self.rows = 0
+        self.created = 0
+        self.writes = 0
+        self.recomputed = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    def to_dict(self):
+        return {
+            'locations': self.locations,
+            'requests': self.requests,
+            'synced': self.synced,
+            'failed': self.failed,
+            'rows': self.rows,
+            'created': self.created,
+            'writes': self.writes,
+            'recomputed_months': self.recomputed,
+            'elapsed_seconds': round(self.elapsed, 3),
+        }
+
+
+class WeatherIngestionEngine:
+    """Sync weather data for many locations concurrently
+
+    Fetching, quality control and derived columns run on a thread pool,
+    since the work is dominated by waiting on NASA POWER. Workers never
+    touch the database: the calling thread is the single writer and
+    coalesces rows from many locations into large upserts, so each point
+    costs one request plus a share of a few big transactions however large
+    the grid grows. Locations synced before only fetch their recent days.
+    Once written, only the months whose data changed are re-analyzed.
+    """
+
+    def __init__(self, workers=None, write_batch_rows=None, refetch_days=None, default_years=None):
+        config = settings.WEATHER_INGESTION
+        self.workers = workers or config['workers']
+        self.write_batch_rows = write_batch_rows or config['write_batch_rows']
+        self.refetch_days = config['refetch_days'] if refetch_days is None else refetch_days
+        self.default_years = default_years or config['default_years']
+        self._local = threading.local()
+
+    def _session(self):
+        # One keep-alive connection pool per worker thread
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def date_range(self, location, end_date, start_date=None):
+        if start_date is not None:
+            return start_date, end_date
+        if location.last_synced_date is not None:
+            start = location.last_synced_date - timedelta(days=self.refetch_days)
+        else:
+            start = end_date - relativedelta(years=self.default_years)
+        return min(start, end_date), end_date
+
+    def _fetch(self, location, start_date, end_date):
+        rows = NASAPowerService(location, session=self._session()).fetch_rows(start_date, end_date)
+        if rows is None:
+            raise RuntimeError('NASA POWER request failed')
+        return rows
+
+    def _flush(self, pending, report):
+        if pending:
+            report.created += write_weather_rows(pending)
+            report.writes += 1
+
+    def _fail_all(self, report, locations, error):
+        report.failed = [
+            {'location': location.pk, 'name': location.name, 'error': error}
+            for location in locations
+        ]
+        report.elapsed = time.monotonic() - report.started
+        return report
+
+    def run(self, locations, start_date=None, end_date=None):
+        """Fetch and store data for each location; returns an IngestionReport"""
+        report = IngestionReport()
+        end_date = end_date or timezone.now().date()
+        locations = list(locations)
+        report.locations = len(locations)
+        report.requests = len(locations)
+
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(self._fetch, location, *self.date_range(location, end_date, start_date)): location
+                for location in locations
+            }
+            for future in as_completed(futures):
+                location = futures[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logger.error(f"Error syncing weather data for {location.name}: {e}")
+                    report.failed.append({'location': location.pk, 'name': location.name, 'error': str(e)})
+                    continue
+
+                report.synced += 1
+                report.rows += len(rows)
+                pending.extend(rows)
+                if len(pending) >= self.write_batch_rows:
+                    self._flush(pending, report)
+                    pending = []
+
+        self._flush(pending, report)
+        if report.rows:
+            report.recomputed = recompute_dirty_months(locations)
+            refresh_snapshot()
+        report.elapsed = time.monotonic() - report.started
+        logger.info(
+            f"Synced {report.synced}/{report.locations} locations: "
+            f"{report.rows} rows in {report.writes} writes, {report.elapsed:.1f}s"
+        )
+        return report
+
+    def run_regional(self, locations, start_date=None, end_date=None, bbox=None):
+        """Cover every location from one regional request per parameter group
+
+        Returns an IngestionReport; locations with no POWER cell nearby are
+        reported as failed.
+        """
+        report = IngestionReport()
+        end_date = end_date or timezone.now().date()
+        locations = list(locations)
+        report.locations = len(locations)
+        if not locations:
+            return report
+
+        start = min(self.date_range(location, end_date, start_date)[0] for location in locations)
+        service = NASAPowerRegionalService()
+        region = service.bounding_box(locations, bbox)
+        groups = service.parameter_groups()
+        report.requests = len(groups)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def fetch(parameters):
+                return NASAPowerRegionalService(session=self._session()).fetch(
+                    parameters, region, start, end_date
+                )
+
+            try:
+                grid = service.decode(zip(groups, pool.map(fetch, groups)))
+            except Exception as e:
+                logger.error(f"Regional NASA POWER request failed: {e}")
+                return self._fail_all(report, locations, str(e))
+            if grid is None:
+                return self._fail_all(report, locations, 'No cells in response')
+
+            pending = []
+            built = pool.map(lambda location: service.rows_for_location(grid, location), locations)
+            for location, rows in zip(locations, built):
+                if rows is None:
+                    report.failed.append({
+                        'location': location.pk, 'name': location.name,
+                        'error': 'No POWER cell within range',
+                    })
+                    continue
+                report.synced += 1
+                report.rows += len(rows)
+                pending.extend(rows)
+                if len(pending) >= self.write_batch_rows:
+                    self._flush(pending, report)
+                    pending = []
+
+        self._flush(pending, report)
+        if report.rows:
+            report.recomputed = recompute_dirty_months(locations)
+            refresh_snapshot()
+        report.elapsed = time.monotonic() - report.started
+        logger.info(
+            f"Regional sync covered {report.synced}/{report.locations} locations from "
+            f"{grid.cell_count} cells in {report.requests} requests, {report.elapsed:.1f}s"
+        )
+        return report
+
+
+def active_locations():
+    """Locations included in scheduled syncs, creating the default if needed"""
+    Location.get_default()
+    return Location.objects.filter(is_active=True)
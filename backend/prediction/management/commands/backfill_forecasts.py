@@ -0,0 +1,68 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tqdm import tqdm
+
+from prediction.backfill import ForecastBackfill
+from prediction.ingestion import active_locations
+from prediction.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Regenerate monthly predictions and yearly forecasts for a range of years in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='from_year', type=int, default=1981, help='First year (default: 1981)')
+        parser.add_argument('--to', dest='to_year', type=int, default=None, help='Last year (default: current year)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Worker processes (default: CPU count)'
+        )
+        parser.add_argument(
+            '--location',
+            type=int,
+            action='append',
+            default=[],
+            help='Location id to backfill (repeatable, default: the default location)'
+        )
+        parser.add_argument(
+            '--all-locations',
+            action='store_true',
+            help='Backfill every active location'
+        )
+
+    def handle(self, *args, **options):
+        to_year = options['to_year'] or timezone.now().year
+        if options['from_year'] > to_year:
+            raise CommandError('--from must not be after --to')
+
+        if options['location']:
+            locations = list(Location.objects.filter(pk__in=options['location']))
+            missing = set(options['location']) - {location.pk for location in locations}
+            if missing:
+                raise CommandError(f'Unknown location ids: {sorted(missing)}')
+        elif options['all_locations']:
+            locations = list(active_locations())
+        else:
+            locations = [Location.get_default()]
+
+        years = range(options['from_year'], to_year + 1)
+        total = len(locations) * len(years)
+        self.stdout.write(
+            f'Backfilling {len(years)} years for {len(locations)} locations with {options["workers"]} workers...'
+        )
+        with tqdm(total=total, unit='year', disable=not total) as progress:
+            summary = ForecastBackfill(workers=options['workers']).run(
+                locations, years, on_result=progress.update
+            )
+
+        elapsed = summary['elapsed_seconds']
+        rate = summary['years'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Wrote {summary['forecasts']} yearly forecasts and {summary['predictions']} monthly "
+            f"predictions in {summary['writes']} batches"
+        ))
+        self.stdout.write(f'  {summary["years"]} location-years in {elapsed:.1f}s ({rate:.1f} years/s)')
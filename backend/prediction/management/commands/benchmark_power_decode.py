@@ -0,0 +1,132 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from prediction.services import PARAMETER_FIELDS
+from prediction.streaming import PowerStreamDecoder
+
+CHUNK_SIZE = 64 * 1024
+
+
+def write_payload(path, start, days):
+    """Write a synthetic POWER point response with every parameter for `days` days"""
+    rng = np.random.default_rng(0)
+    keys = [(start + timedelta(days=i)).strftime('%Y%m%d') for i in range(days)]
+    with open(path, 'w') as f:
+        f.write('{"type": "Feature", "geometry": {"type": "Point", "coordinates": [35.6, 3.12, 506.0]}, ')
+        f.write('"properties": {"parameter": {')
+        for n, parameter in enumerate(PARAMETER_FIELDS):
+            values = rng.normal(25, 5, days).round(2)
+            body = ', '.join(f'"{key}": {value}' for key, value in zip(keys, values))
+            f.write(f'{", " if n else ""}"{parameter}": {{{body}}}')
+        f.write('}}, "header": {"title": "NASA/POWER", "fill_value": -999.0}, "messages": []}')
+
+
+def decode_with_json(path, start, end):
+    """The json.load baseline: the whole body as dicts, then one array per parameter"""
+    with open(path, 'rb') as f:
+        parameters = json.load(f)['properties']['parameter']
+    keys = list(parameters['PRECTOTCORR'])
+    dates = [date(int(key[:4]), int(key[4:6]), int(key[6:])) for key in keys]
+    return dates, {
+        parameter: np.array([values.get(key, np.nan) for key in keys], dtype=float)
+        for parameter, values in parameters.items()
+    }
+
+
+def decode_streaming(path, start, end):
+    with open(path, 'rb') as f:
+        chunks = iter(lambda: f.read(CHUNK_SIZE), b'')
+        return PowerStreamDecoder(start, end, PARAMETER_FIELDS).decode(chunks)
+
+
+def _status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(name, path, start, end, trace, queue):
+    """Run one decoder in a fresh child so peak RSS is not shared between runs"""
+    decoder = decode_with_json if name == 'json' else decode_streaming
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')  # reset the RSS high-water mark
+    except OSError:
+        pass
+    rss_before = _status_kb('VmRSS:')
+
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    dates, arrays = decoder(path, start, end)
+    elapsed = time.perf_counter() - started
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    tracemalloc.stop()
+
+    queue.put({
+        'seconds': elapsed,
+        'rss_peak_mb': (_status_kb('VmHWM:') - rss_before) / 1024,
+        'python_peak_mb': traced_peak / 2 ** 20,
+        'days': len(dates),
+        'checksum': float(sum(np.nansum(values) for values in arrays.values())),
+    })
+
+
+def run_child(context, *args):
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(*args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Compare parse time and peak memory of json.load vs the streaming POWER decoder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=40)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        start = date(1985, 1, 1)
+        end = start + timedelta(days=int(options['years'] * 365.25) - 1)
+        days = (end - start).days + 1
+        context = multiprocessing.get_context('fork')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'power.json')
+            write_payload(path, start, days)
+            size_mb = os.path.getsize(path) / 2 ** 20
+            self.stdout.write(
+                f'Payload: {days} days x {len(PARAMETER_FIELDS)} parameters, {size_mb:.1f} MB'
+            )
+
+            results = {}
+            for name in ('json', 'streaming'):
+                runs = [run_child(context, name, path, start, end, False) for _ in range(options['repeat'])]
+                results[name] = min(runs, key=lambda run: run['seconds'])
+                # Allocation tracing slows decoding down, so it gets its own run
+                results[name]['python_peak_mb'] = run_child(
+                    context, name, path, start, end, True
+                )['python_peak_mb']
+
+        for name, run in results.items():
+            self.stdout.write(
+                f"{name:>9}: {run['seconds']:.3f}s, peak RSS +{run['rss_peak_mb']:.1f} MB, "
+                f"Python allocations peak {run['python_peak_mb']:.1f} MB"
+            )
+        if results['json']['checksum'] != results['streaming']['checksum']:
+            self.stdout.write(self.style.ERROR('Decoded values differ between decoders'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Decoded values match'))
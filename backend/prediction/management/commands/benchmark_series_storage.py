@@ -0,0 +1,128 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from prediction.models import Location, WeatherData, WeatherSeriesYear
+from prediction.series import SERIES_FIELDS, WeatherSeriesStore, refresh_series
+
+
+def table_bytes(model):
+    """On-disk size of a model's table and indexes, or None if the backend can't tell"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            return cursor.fetchone()[0]
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = %s OR name IN "
+                    "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                    [table, table],
+                )
+            except Exception:
+                return None  # SQLite built without the dbstat table
+            return cursor.fetchone()[0] or 0
+    return None
+
+
+def scan_rows(location, start, end):
+    """Full history from WeatherData, as the analysis code reads it today"""
+    stored = list(WeatherData.objects.filter(
+        location=location, date__range=(start, end)
+    ).order_by('date').values_list('date', *SERIES_FIELDS))
+    columns = list(zip(*stored))
+    return {field: np.array(columns[i + 1], dtype=float) for i, field in enumerate(SERIES_FIELDS)}
+
+
+def scan_series(location, start, end):
+    return WeatherSeriesStore(location).read(start, end)[1]
+
+
+def _mb(size):
+    return 'n/a' if size is None else f'{size / 2 ** 20:.1f} MB'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare table size and full-history scan time of WeatherData vs the packed series'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locations', type=int, default=5)
+        parser.add_argument('--years', type=int, default=40)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback  # leave no benchmark data behind
+        except Rollback:
+            pass
+
+    def run(self, options):
+        end = date(2024, 12, 31)
+        start = date(end.year - options['years'] + 1, 1, 1)
+        days = (end - start).days + 1
+        dates = [start + timedelta(days=i) for i in range(days)]
+        rng = np.random.default_rng(0)
+        sizes_before = {model: table_bytes(model) for model in (WeatherData, WeatherSeriesYear)}
+
+        locations = []
+        started = time.perf_counter()
+        for n in range(options['locations']):
+            location = Location.objects.create(
+                name=f'Series benchmark {n}', kind='custom', latitude=3.0 + n * 0.1, longitude=35.5,
+                is_active=False,
+            )
+            locations.append(location)
+            values = {field: rng.normal(20, 5, days).round(2) for field in SERIES_FIELDS}
+            WeatherData.objects.bulk_create([
+                WeatherData(
+                    location=location, date=day, latitude=location.latitude, longitude=location.longitude,
+                    **{field: float(values[field][i]) for field in SERIES_FIELDS}
+                )
+                for i, day in enumerate(dates)
+            ], batch_size=2000)
+        rows_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        refresh_series({location: (start, end) for location in locations})
+        series_seconds = time.perf_counter() - started
+
+        sizes = {
+            model: None if before is None else table_bytes(model) - before
+            for model, before in sizes_before.items()
+        }
+        self.stdout.write(
+            f'{len(locations)} locations x {days} days x {len(SERIES_FIELDS)} parameters'
+        )
+        self.stdout.write(
+            f'  WeatherData:       {days * len(locations)} rows, {_mb(sizes[WeatherData])}, '
+            f'written in {rows_seconds:.2f}s'
+        )
+        self.stdout.write(
+            f'  WeatherSeriesYear: {WeatherSeriesYear.objects.filter(location__in=locations).count()} rows, '
+            f'{_mb(sizes[WeatherSeriesYear])}, built in {series_seconds:.2f}s'
+        )
+
+        timings = {}
+        for name, scan in (('WeatherData', scan_rows), ('WeatherSeriesYear', scan_series)):
+            runs = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                results = [scan(location, start, end) for location in locations]
+                runs.append(time.perf_counter() - started)
+            timings[name] = min(runs)
+            checksum = sum(float(np.nansum(arrays[field])) for arrays in results for field in SERIES_FIELDS)
+            self.stdout.write(f'  full-history scan of {name}: {timings[name]:.3f}s (checksum {checksum:.1f})')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Series scan is {timings["WeatherData"] / timings["WeatherSeriesYear"]:.1f}x faster'
+        ))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.climatology import ClimatologyService
+from prediction.models import Location, WeatherData
+from prediction.snapshot import WeatherSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Build or rebuild the climatology normals from stored daily weather data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--location',
+            type=int,
+            action='append',
+            default=[],
+            help='Location id to build (repeatable, default: every location with data)'
+        )
+
+    def handle(self, *args, **options):
+        location_ids = set(WeatherData.objects.order_by().values_list('location_id', flat=True).distinct())
+        if options['location']:
+            missing = set(options['location']) - location_ids
+            if missing:
+                raise CommandError(f'No weather data for location ids: {sorted(missing)}')
+            location_ids = set(options['location'])
+
+        snapshot = WeatherSnapshot.current()
+        total = 0
+        for location in Location.objects.filter(pk__in=location_ids):
+            written = ClimatologyService(location, snapshot=snapshot).refresh()
+            total += written
+            self.stdout.write(f'  ✓ {location.name}: {written} climatology rows written')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Wrote {total} climatology rows for {len(location_ids)} locations'
+        ))
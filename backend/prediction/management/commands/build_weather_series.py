@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from prediction.models import Location, WeatherData
+from prediction.series import refresh_series
+
+
+class Command(BaseCommand):
+    help = 'Build or refresh the packed per-year series from stored daily weather data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--location',
+            type=int,
+            action='append',
+            default=[],
+            help='Location id to build (repeatable, default: every location with data)'
+        )
+
+    def handle(self, *args, **options):
+        spans = WeatherData.objects.values('location_id').annotate(first=Min('date'), last=Max('date'))
+        if options['location']:
+            spans = spans.filter(location_id__in=options['location'])
+        spans = {span['location_id']: (span['first'], span['last']) for span in spans}
+        missing = set(options['location']) - set(spans)
+        if missing:
+            raise CommandError(f'No weather data for location ids: {sorted(missing)}')
+
+        total = 0
+        for location in Location.objects.filter(pk__in=list(spans)):
+            written = refresh_series({location: spans[location.pk]})
+            total += written
+            self.stdout.write(f'  ✓ {location.name}: {written} series rows written')
+        self.stdout.write(self.style.SUCCESS(f'✓ Wrote {total} series rows for {len(spans)} locations'))
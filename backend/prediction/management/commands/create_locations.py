@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from climate.models import WaterSource
+from prediction.ingestion import grid_points
+from prediction.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Create weather locations on a regular grid and/or at water sources'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grid-spacing',
+            type=float,
+            default=None,
+            help='Grid spacing in degrees over the county bounding box (e.g. 0.5)'
+        )
+        parser.add_argument(
+            '--water-sources',
+            action='store_true',
+            help='Create a location for every water source'
+        )
+
+    def handle(self, *args, **options):
+        spacing = options['grid_spacing']
+        if spacing is None and not options['water_sources']:
+            raise CommandError('Give --grid-spacing and/or --water-sources')
+        if spacing is not None and spacing <= 0:
+            raise CommandError('--grid-spacing must be positive')
+
+        locations = []
+        if spacing is not None:
+            for lat, lon in grid_points(settings.TURKANA_BBOX, spacing):
+                locations.append(Location(
+                    name=f'Grid {lat:.4f},{lon:.4f}', kind='grid', latitude=lat, longitude=lon
+                ))
+
+        if options['water_sources']:
+            sources = WaterSource.objects.values_list('id', 'name', 'latitude', 'longitude')
+            for pk, name, lat, lon in sources.iterator(chunk_size=5000):
+                locations.append(Location(
+                    name=f'{name[:90]} #{pk}', kind='water_source',
+                    latitude=float(lat), longitude=float(lon)
+                ))
+
+        Location.get_default()
+        before = Location.objects.count()
+        Location.objects.bulk_create(locations, batch_size=1000, ignore_conflicts=True)
+        created = Location.objects.count() - before
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Created {created} locations ({len(locations) - created} already existed)'
+        ))
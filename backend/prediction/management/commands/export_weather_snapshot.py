@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from prediction.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export daily weather data to a new memory-mapped snapshot and publish it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default=None, help='Snapshot directory (default: settings)')
+
+    def handle(self, *args, **options):
+        snapshot = export_snapshot(options['directory'])
+        if snapshot is None:
+            self.stdout.write(self.style.WARNING('No weather data to export'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Published snapshot {snapshot.version} covering {len(snapshot.locations)} locations '
+            f'at {snapshot.path}'
+        ))
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.services import EvapotranspirationService
+
+
+class Command(BaseCommand):
+    help = 'Recompute PET and water balance for stored weather data in a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', default=None, help='Last day (YYYY-MM-DD, default: today)')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end']) if options['end'] else date.today()
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        count = EvapotranspirationService().recompute(start, end)
+        self.stdout.write(self.style.SUCCESS(f'✓ Recomputed evapotranspiration for {count} days'))
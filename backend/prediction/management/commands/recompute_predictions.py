@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.models import DirtyMonth, Location
+from prediction.services import recompute_dirty_months
+
+
+class Command(BaseCommand):
+    help = 'Refresh monthly predictions and yearly forecasts for months whose data changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--location',
+            type=int,
+            action='append',
+            default=[],
+            help='Location id to recompute (repeatable, default: all)'
+        )
+
+    def handle(self, *args, **options):
+        locations = None
+        if options['location']:
+            locations = list(Location.objects.filter(pk__in=options['location']))
+            missing = set(options['location']) - {location.pk for location in locations}
+            if missing:
+                raise CommandError(f'Unknown location ids: {sorted(missing)}')
+
+        pending = DirtyMonth.objects.count()
+        count = recompute_dirty_months(locations)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Recomputed {count} of {pending} dirty months'
+        ))
@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.hourly import HourlyWeatherService
+from prediction.models import HourlyWeatherDay, Location
+from prediction.snapshot import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily records and monthly predictions from stored hourly data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', default=None, help='Last day (YYYY-MM-DD, default: today)')
+        parser.add_argument(
+            '--location',
+            type=int,
+            action='append',
+            default=[],
+            help='Location id to roll up (repeatable, default: every location with hourly data)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end']) if options['end'] else date.today()
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        location_ids = options['location'] or HourlyWeatherDay.objects.filter(
+            date__range=(start, end)
+        ).order_by().values_list('location_id', flat=True).distinct()
+        total = 0
+        for location in Location.objects.filter(pk__in=list(location_ids)):
+            total += HourlyWeatherService(location).rollup(start, end)
+        if total:
+            refresh_snapshot()
+        self.stdout.write(self.style.SUCCESS(f'✓ Rolled up {total} days of hourly data'))
@@ -0,0 +1,82 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+def payload_names(path, query):
+    """Candidate file names for a request, most specific first"""
+    mode = path.rstrip('/').rsplit('/', 1)[-1] or 'point'
+    parameters = query.get('parameters', [''])[0].replace(',', '_')
+    names = []
+    if parameters:
+        names.append(f'{mode}_{parameters}.json')
+    names.append(f'{mode}.json')
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Serve recorded NASA POWER payloads locally. Set NASA_POWER_API_URL / '
+            'NASA_POWER_REGIONAL_API_URL to http://<host>:<port>/api/temporal/daily/point|regional')
+
+    def add_arguments(self, parser):
+        parser.add_argument('payloads', help='Directory of recorded JSON payloads')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--record',
+            action='store_true',
+            help='Fetch missing payloads from --upstream and save them'
+        )
+        parser.add_argument('--upstream', default='https://power.larc.nasa.gov')
+
+    def handle(self, *args, **options):
+        directory = Path(options['payloads'])
+        if not options['record'] and not directory.is_dir():
+            raise CommandError(f'{directory} is not a directory')
+        directory.mkdir(parents=True, exist_ok=True)
+        command = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                names = payload_names(url.path, parse_qs(url.query))
+                body = None
+                for name in names:
+                    if (directory / name).is_file():
+                        body = (directory / name).read_bytes()
+                        break
+
+                if body is None and options['record']:
+                    response = requests.get(options['upstream'] + self.path, timeout=300)
+                    if response.ok:
+                        body = response.content
+                        (directory / names[0]).write_bytes(body)
+                        command.stdout.write(f'recorded {names[0]}')
+
+                if body is None:
+                    self.send_response(404)
+                    body = json.dumps({'messages': [f'No recorded payload; tried {names}']}).encode()
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                command.stdout.write(format % args)
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(self.style.SUCCESS(
+            f'Serving {directory} on http://{options["host"]}:{options["port"]}/api/temporal/daily/'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
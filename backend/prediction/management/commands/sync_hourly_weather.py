@@ -0,0 +1,57 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prediction.hourly import HourlyWeatherService, stale_range
+from prediction.models import Location
+from prediction.snapshot import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Sync hourly NASA POWER data and roll it up into daily records and monthly predictions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--location',
+            type=int,
+            action='append',
+            default=[],
+            help='Location id to sync (repeatable, default: the default location)'
+        )
+        parser.add_argument('--start', default=None, help='First day (YYYY-MM-DD, default: since last sync)')
+        parser.add_argument('--end', default=None, help='Last day (YYYY-MM-DD, default: today)')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else date.today()
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+        if start is not None and start > end:
+            raise CommandError('--start must not be after --end')
+
+        if options['location']:
+            locations = list(Location.objects.filter(pk__in=options['location']))
+            missing = set(options['location']) - {location.pk for location in locations}
+            if missing:
+                raise CommandError(f'Unknown location ids: {sorted(missing)}')
+        else:
+            locations = [Location.get_default()]
+
+        synced = 0
+        for location in locations:
+            first = start or stale_range(location, end)[0]
+            self.stdout.write(f'Syncing hourly data for {location.name} from {first} to {end}...')
+            result = HourlyWeatherService(location).sync_range(first, end)
+            if result is None:
+                self.stdout.write(self.style.ERROR(f'  ✗ {location.name}: NASA POWER request failed'))
+                continue
+            stored, created = result
+            synced += stored
+            self.stdout.write(self.style.SUCCESS(
+                f'  ✓ {location.name}: {stored} days stored ({created} new) and rolled up'
+            ))
+
+        # One export for the whole run rather than one per location
+        if synced:
+            refresh_snapshot()
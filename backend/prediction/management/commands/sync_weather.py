@@ -1,7 +1,10 @@
-# weather/management/commands/sync_weather.py
-from django.core.management.base import BaseCommand
+# prediction/management/commands/sync_weather.py
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from weather.services import NASAPowerService, WeatherPredictionService
+from prediction.ingestion import WeatherIngestionEngine, active_locations
+from prediction.models import Location
+from prediction.services import NASAPowerService, WeatherPredictionService
+from prediction.snapshot import refresh_snapshot
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,8 +31,34 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip weather data sync, only generate predictions'
         )
+        parser.add_argument(
+            '--all-locations',
+            action='store_true',
+            help='Sync every active location instead of only the default one'
+        )
+        parser.add_argument(
+            '--location',
+            type=int,
+            action='append',
+            default=[],
+            help='Location id to sync (repeatable)'
+        )
+        parser.add_argument(
+            '--regional',
+            action='store_true',
+            help='Fetch multi-location data with regional bounding-box requests'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Concurrent NASA POWER requests for multi-location syncs'
+        )
 
     def handle(self, *args, **options):
+        if options['all_locations'] or options['location']:
+            return self.handle_locations(options)
+
         years = options['years']
         forecast_year = options['forecast_year'] or timezone.now().year
         skip_sync = options['skip_sync']
@@ -43,6 +72,7 @@ class Command(BaseCommand):
 
             try:
                 count = nasa_service.sync_historical_data(years=years)
+                refresh_snapshot()
                 self.stdout.write(
                     self.style.SUCCESS(f'✓ Successfully synced {count} weather records')
                 )
@@ -101,4 +131,46 @@ class Command(BaseCommand):
 
         self.stdout.write(
             self.style.SUCCESS('\n✓ Weather data sync and prediction completed successfully!')
-        )
\ No newline at end of file
+        )
+
+    def handle_locations(self, options):
+        """Concurrent sync and per-location predictions for many points"""
+        forecast_year = options['forecast_year'] or timezone.now().year
+
+        if options['location']:
+            locations = list(Location.objects.filter(pk__in=options['location']))
+            missing = set(options['location']) - {location.pk for location in locations}
+            if missing:
+                raise CommandError(f'Unknown location ids: {sorted(missing)}')
+        else:
+            locations = list(active_locations())
+
+        if not options['skip_sync']:
+            self.stdout.write(f'Syncing {len(locations)} locations from NASA POWER API...')
+            engine = WeatherIngestionEngine(workers=options['workers'], default_years=options['years'])
+            if options['regional']:
+                report = engine.run_regional(locations)
+            else:
+                report = engine.run(locations)
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Synced {report.synced}/{report.locations} locations with {report.requests} requests, '
+                f'{report.created} new of {report.rows} records in {report.elapsed:.1f}s, '
+                f'{report.recomputed} changed months re-analyzed'
+            ))
+            for failure in report.failed:
+                self.stdout.write(self.style.ERROR(f"  ✗ {failure['name']}: {failure['error']}"))
+            # Refresh last_synced_date written by the engine
+            locations = list(Location.objects.filter(pk__in=[location.pk for location in locations]))
+
+        self.stdout.write(f'Generating predictions for year {forecast_year}...')
+        for location in locations:
+            forecast = WeatherPredictionService(location).generate_yearly_forecast(forecast_year)
+            if forecast:
+                self.stdout.write(
+                    f'  ✓ {location.name}: {forecast.overall_risk_level.upper()} '
+                    f'({forecast.drought_months} drought, {forecast.flood_risk_months} flood months)'
+                )
+            else:
+                self.stdout.write(self.style.WARNING(f'  - {location.name}: no data for {forecast_year}'))
+
+        self.stdout.write(self.style.SUCCESS('\n✓ Multi-location sync completed'))
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, unique=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('precipitation', models.FloatField(help_text='Precipitation (mm/day)')),
+                ('temperature', models.FloatField(help_text='Temperature at 2m (°C)')),
+                ('temperature_max', models.FloatField(help_text='Maximum Temperature (°C)')),
+                ('temperature_min', models.FloatField(help_text='Minimum Temperature (°C)')),
+                ('relative_humidity', models.FloatField(help_text='Relative Humidity (%)')),
+                ('wind_speed', models.FloatField(help_text='Wind Speed at 2m (m/s)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Weather Data',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='YearlyForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True)),
+                ('total_precipitation', models.FloatField()),
+                ('avg_temperature', models.FloatField()),
+                ('drought_months', models.IntegerField(default=0)),
+                ('flood_risk_months', models.IntegerField(default=0)),
+                ('normal_months', models.IntegerField(default=0)),
+                ('overall_risk_level', models.CharField(max_length=20)),
+                ('summary', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-year'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeatherPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('month', models.IntegerField()),
+                ('year', models.IntegerField()),
+                ('condition', models.CharField(choices=[('normal', 'Normal'), ('mild_drought', 'Mild Drought'), ('moderate_drought', 'Moderate Drought'), ('severe_drought', 'Severe Drought'), ('moderate_flood', 'Moderate Flood Risk'), ('severe_flood', 'Severe Flood Risk'), ('extreme_flood', 'Extreme Flood Risk')], max_length=50)),
+                ('severity', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], max_length=20)),
+                ('monthly_precipitation', models.FloatField(help_text='Total monthly precipitation (mm)')),
+                ('avg_temperature', models.FloatField(help_text='Average monthly temperature (°C)')),
+                ('avg_humidity', models.FloatField(help_text='Average monthly humidity (%)')),
+                ('confidence_score', models.FloatField(help_text='Prediction confidence (0-100)')),
+                ('description', models.TextField()),
+                ('recommendations', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('year', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherdata',
+            name='pet_hargreaves',
+            field=models.FloatField(blank=True, help_text='Hargreaves reference evapotranspiration (mm/day)', null=True),
+        ),
+        migrations.AddField(
+            model_name='weatherdata',
+            name='pet_penman_monteith',
+            field=models.FloatField(blank=True, help_text='FAO-56 Penman-Monteith reference evapotranspiration (mm/day)', null=True),
+        ),
+        migrations.AddField(
+            model_name='weatherdata',
+            name='solar_radiation',
+            field=models.FloatField(blank=True, help_text='All-sky surface shortwave radiation (MJ/m²/day)', null=True),
+        ),
+        migrations.AddField(
+            model_name='weatherdata',
+            name='water_balance',
+            field=models.FloatField(blank=True, help_text='Climatic water balance P − PET (mm/day)', null=True),
+        ),
+        migrations.AddField(
+            model_name='weatherprediction',
+            name='monthly_pet',
+            field=models.FloatField(blank=True, help_text='Total monthly reference evapotranspiration (mm)', null=True),
+        ),
+        migrations.AddField(
+            model_name='weatherprediction',
+            name='monthly_water_balance',
+            field=models.FloatField(blank=True, help_text='Monthly climatic water balance P − PET (mm)', null=True),
+        ),
+    ]
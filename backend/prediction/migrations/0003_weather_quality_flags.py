@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0002_evapotranspiration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherdata',
+            name='quality_flags',
+            field=models.PositiveIntegerField(default=0, help_text='Per-parameter quality control bitmask (see prediction.quality)'),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='precipitation',
+            field=models.FloatField(blank=True, help_text='Precipitation (mm/day)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='relative_humidity',
+            field=models.FloatField(blank=True, help_text='Relative Humidity (%)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='temperature',
+            field=models.FloatField(blank=True, help_text='Temperature at 2m (°C)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='temperature_max',
+            field=models.FloatField(blank=True, help_text='Maximum Temperature (°C)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='temperature_min',
+            field=models.FloatField(blank=True, help_text='Minimum Temperature (°C)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='wind_speed',
+            field=models.FloatField(blank=True, help_text='Wind Speed at 2m (m/s)', null=True),
+        ),
+    ]
@@ -0,0 +1,105 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def assign_default_location(apps, schema_editor):
+    """Attach rows stored before locations existed to the county default point"""
+    Location = apps.get_model('prediction', 'Location')
+    models_with_location = [
+        apps.get_model('prediction', name)
+        for name in ('WeatherData', 'WeatherPrediction', 'YearlyForecast')
+    ]
+    if not any(model.objects.exists() for model in models_with_location):
+        return
+
+    location, _ = Location.objects.get_or_create(
+        name=settings.DEFAULT_LOCATION_NAME,
+        defaults={
+            'kind': 'default',
+            'latitude': settings.TURKANA_LATITUDE,
+            'longitude': settings.TURKANA_LONGITUDE,
+        },
+    )
+    for model in models_with_location:
+        model.objects.filter(location__isnull=True).update(location=location)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0003_weather_quality_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('kind', models.CharField(choices=[('default', 'County Default'), ('grid', 'Grid Point'), ('water_source', 'Water Source'), ('custom', 'Custom')], default='custom', max_length=20)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('elevation', models.FloatField(blank=True, help_text='Elevation (m)', null=True)),
+                ('is_active', models.BooleanField(default=True, help_text='Included in scheduled syncs')),
+                ('last_synced_date', models.DateField(blank=True, help_text='Last day with stored data', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='weatherdata',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='weather_data', to='prediction.location'),
+        ),
+        migrations.AddField(
+            model_name='weatherprediction',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='predictions', to='prediction.location'),
+        ),
+        migrations.AddField(
+            model_name='yearlyforecast',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='yearly_forecasts', to='prediction.location'),
+        ),
+        migrations.RunPython(assign_default_location, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weather_data', to='prediction.location'),
+        ),
+        migrations.AlterField(
+            model_name='weatherprediction',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predictions', to='prediction.location'),
+        ),
+        migrations.AlterField(
+            model_name='yearlyforecast',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='yearly_forecasts', to='prediction.location'),
+        ),
+        migrations.AlterField(
+            model_name='weatherdata',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='yearlyforecast',
+            name='year',
+            field=models.IntegerField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='weatherdata',
+            unique_together={('location', 'date')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='weatherprediction',
+            unique_together={('location', 'year', 'month')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='yearlyforecast',
+            unique_together={('location', 'year')},
+        ),
+    ]
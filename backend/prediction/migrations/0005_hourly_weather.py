@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0004_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weatherdata',
+            name='max_hourly_precipitation',
+            field=models.FloatField(blank=True, help_text='Highest hourly rainfall intensity (mm/hour)', null=True),
+        ),
+        migrations.AddField(
+            model_name='weatherprediction',
+            name='max_hourly_precipitation',
+            field=models.FloatField(blank=True, help_text='Highest hourly rainfall intensity in the month (mm/hour)', null=True),
+        ),
+        migrations.CreateModel(
+            name='HourlyWeatherDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('values', models.BinaryField()),
+                ('precipitation_total', models.FloatField(blank=True, help_text='Rainfall (mm/day)', null=True)),
+                ('max_intensity', models.FloatField(blank=True, help_text='Highest hourly rainfall (mm/hour)', null=True)),
+                ('peak_hour', models.PositiveSmallIntegerField(blank=True, help_text='Local solar hour of peak rainfall', null=True)),
+                ('wet_hours', models.PositiveSmallIntegerField(default=0, help_text='Hours with measurable rainfall')),
+                ('valid_hours', models.PositiveSmallIntegerField(default=0, help_text='Hours with a rainfall reading')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_days', to='prediction.location')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('location', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0005_hourly_weather'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherSeriesYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('parameter', models.CharField(help_text='WeatherData field name', max_length=32)),
+                ('values', models.BinaryField()),
+                ('valid', models.BinaryField()),
+                ('valid_days', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_years', to='prediction.location')),
+            ],
+            options={
+                'ordering': ['location', 'parameter', 'year'],
+                'unique_together': {('location', 'year', 'parameter')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0006_weather_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('marked_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_months', to='prediction.location')),
+            ],
+            options={
+                'ordering': ['location', 'year', 'month'],
+                'unique_together': {('location', 'year', 'month')},
+            },
+        ),
+    ]
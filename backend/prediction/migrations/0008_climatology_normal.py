@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0007_dirty_month'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClimatologyNormal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parameter', models.CharField(help_text='WeatherData field name', max_length=32)),
+                ('period', models.CharField(choices=[('day', 'Day of year'), ('month', 'Month')], max_length=8)),
+                ('values', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='climatology', to='prediction.location')),
+            ],
+            options={
+                'ordering': ['location', 'parameter', 'period'],
+                'unique_together': {('location', 'parameter', 'period')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prediction', '0008_climatology_normal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Alert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule', models.CharField(help_text='Name of the rule in settings.ALERT_RULES', max_length=50)),
+                ('severity', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], max_length=20)),
+                ('start_date', models.DateField(help_text='First day of the episode')),
+                ('end_date', models.DateField(help_text='Latest day the rule held')),
+                ('value', models.FloatField(help_text="Peak value of the rule's measure during the episode")),
+                ('threshold', models.FloatField()),
+                ('message', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='prediction.location')),
+            ],
+            options={
+                'ordering': ['-updated_at', '-id'],
+                'indexes': [models.Index(fields=['updated_at', 'id'], name='alert_updated_id_idx'), models.Index(fields=['location', 'updated_at'], name='alert_location_updated_idx')],
+                'unique_together': {('location', 'rule', 'start_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AlertRuleState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule', models.CharField(max_length=50)),
+                ('last_date', models.DateField(help_text='Latest day evaluated')),
+                ('state', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_states', to='prediction.location')),
+            ],
+            options={
+                'ordering': ['location', 'rule'],
+                'unique_together': {('location', 'rule')},
+            },
+        ),
+    ]
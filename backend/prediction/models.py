@@ -1,20 +1,87 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 
+class Location(models.Model):
+    """A point weather data is fetched and analyzed for"""
+    KIND_CHOICES = [
+        ('default', 'County Default'),
+        ('grid', 'Grid Point'),
+        ('water_source', 'Water Source'),
+        ('custom', 'Custom'),
+    ]
+
+    name = models.CharField(max_length=100, unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='custom')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    elevation = models.FloatField(null=True, blank=True, help_text="Elevation (m)")
+    is_active = models.BooleanField(default=True, help_text="Included in scheduled syncs")
+    last_synced_date = models.DateField(null=True, blank=True, help_text="Last day with stored data")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.latitude:.3f}, {self.longitude:.3f})"
+
+    @classmethod
+    def get_default(cls):
+        """The county-wide point used when no location is given"""
+        location = cls.objects.filter(kind='default').first()
+        if location is None:
+            location, _ = cls.objects.get_or_create(
+                name=settings.DEFAULT_LOCATION_NAME,
+                defaults={
+                    'kind': 'default',
+                    'latitude': settings.TURKANA_LATITUDE,
+                    'longitude': settings.TURKANA_LONGITUDE,
+                },
+            )
+        return location
+
+
 class WeatherData(models.Model):
     """Store daily weather data from NASA POWER API"""
-    date = models.DateField(unique=True, db_index=True)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='weather_data')
+    date = models.DateField(db_index=True)
     latitude = models.FloatField()
     longitude = models.FloatField()
 
     # Weather parameters
-    precipitation = models.FloatField(help_text="Precipitation (mm/day)")
-    temperature = models.FloatField(help_text="Temperature at 2m (°C)")
-    temperature_max = models.FloatField(help_text="Maximum Temperature (°C)")
-    temperature_min = models.FloatField(help_text="Minimum Temperature (°C)")
-    relative_humidity = models.FloatField(help_text="Relative Humidity (%)")
-    wind_speed = models.FloatField(help_text="Wind Speed at 2m (m/s)")
+    # Null when the value was missing or rejected by quality control
+    precipitation = models.FloatField(null=True, blank=True, help_text="Precipitation (mm/day)")
+    temperature = models.FloatField(null=True, blank=True, help_text="Temperature at 2m (°C)")
+    temperature_max = models.FloatField(null=True, blank=True, help_text="Maximum Temperature (°C)")
+    temperature_min = models.FloatField(null=True, blank=True, help_text="Minimum Temperature (°C)")
+    relative_humidity = models.FloatField(null=True, blank=True, help_text="Relative Humidity (%)")
+    wind_speed = models.FloatField(null=True, blank=True, help_text="Wind Speed at 2m (m/s)")
+    solar_radiation = models.FloatField(
+        null=True, blank=True, help_text="All-sky surface shortwave radiation (MJ/m²/day)"
+    )
+
+    # Derived during ingest
+    pet_hargreaves = models.FloatField(
+        null=True, blank=True, help_text="Hargreaves reference evapotranspiration (mm/day)"
+    )
+    pet_penman_monteith = models.FloatField(
+        null=True, blank=True, help_text="FAO-56 Penman-Monteith reference evapotranspiration (mm/day)"
+    )
+    water_balance = models.FloatField(
+        null=True, blank=True, help_text="Climatic water balance P − PET (mm/day)"
+    )
+
+    quality_flags = models.PositiveIntegerField(
+        default=0, help_text="Per-parameter quality control bitmask (see prediction.quality)"
+    )
+
+    # Rolled up from HourlyWeatherDay when hourly data has been ingested
+    max_hourly_precipitation = models.FloatField(
+        null=True, blank=True, help_text="Highest hourly rainfall intensity (mm/hour)"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -22,11 +89,91 @@ class WeatherData(models.Model):
     class Meta:
         ordering = ['-date']
         verbose_name_plural = "Weather Data"
+        unique_together = ['location', 'date']
 
     def __str__(self):
         return f"Weather data for {self.date}"
 
 
+class WeatherSeriesYear(models.Model):
+    """One year of one daily parameter for a location, packed into a row
+
+    `values` holds a float32 per day of the year (365 or 366) and `valid` a
+    bitmap with one bit per day, so a year costs ~1.5 KB instead of 365
+    WeatherData rows. Read and written through prediction.series.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='series_years')
+    year = models.PositiveSmallIntegerField()
+    parameter = models.CharField(max_length=32, help_text="WeatherData field name")
+    values = models.BinaryField()
+    valid = models.BinaryField()
+    valid_days = models.PositiveSmallIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['location', 'parameter', 'year']
+        unique_together = ['location', 'year', 'parameter']
+
+    def __str__(self):
+        return f"{self.parameter} series for {self.year}"
+
+
+class ClimatologyNormal(models.Model):
+    """Long-term normals of one daily parameter for a location
+
+    `values` packs float32 statistics as [statistic][slot] in the order of
+    prediction.climatology.STATISTICS, with 366 day-of-year slots for the
+    'day' period and 12 for 'month'. Written by prediction.climatology.
+    """
+    PERIOD_CHOICES = [
+        ('day', 'Day of year'),
+        ('month', 'Month'),
+    ]
+
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='climatology')
+    parameter = models.CharField(max_length=32, help_text="WeatherData field name")
+    period = models.CharField(max_length=8, choices=PERIOD_CHOICES)
+    values = models.BinaryField()
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['location', 'parameter', 'period']
+        unique_together = ['location', 'parameter', 'period']
+
+    def __str__(self):
+        return f"{self.parameter} {self.period} normals"
+
+
+class HourlyWeatherDay(models.Model):
+    """One day of hourly NASA POWER data packed into a single row
+
+    `values` holds float32 readings laid out as [parameter][hour] in the
+    order of prediction.hourly.HOURLY_FIELDS, NaN where missing, so 40
+    years of hourly data is ~15k rows per location instead of ~350k.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='hourly_days')
+    date = models.DateField()
+    values = models.BinaryField()
+
+    # Summaries kept as columns so rollups and flood checks never unpack blobs
+    precipitation_total = models.FloatField(null=True, blank=True, help_text="Rainfall (mm/day)")
+    max_intensity = models.FloatField(null=True, blank=True, help_text="Highest hourly rainfall (mm/hour)")
+    peak_hour = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Local solar hour of peak rainfall")
+    wet_hours = models.PositiveSmallIntegerField(default=0, help_text="Hours with measurable rainfall")
+    valid_hours = models.PositiveSmallIntegerField(default=0, help_text="Hours with a rainfall reading")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['location', 'date']
+
+    def __str__(self):
+        return f"Hourly weather for {self.date}"
+
+
 class WeatherPrediction(models.Model):
     """Store weather predictions and alerts"""
     CONDITION_CHOICES = [
@@ -46,6 +193,7 @@ class WeatherPrediction(models.Model):
         ('critical', 'Critical'),
     ]
 
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='predictions')
     date = models.DateField()
     month = models.IntegerField()
     year = models.IntegerField()
@@ -57,6 +205,15 @@ class WeatherPrediction(models.Model):
     monthly_precipitation = models.FloatField(help_text="Total monthly precipitation (mm)")
     avg_temperature = models.FloatField(help_text="Average monthly temperature (°C)")
     avg_humidity = models.FloatField(help_text="Average monthly humidity (%)")
+    monthly_pet = models.FloatField(
+        null=True, blank=True, help_text="Total monthly reference evapotranspiration (mm)"
+    )
+    monthly_water_balance = models.FloatField(
+        null=True, blank=True, help_text="Monthly climatic water balance P − PET (mm)"
+    )
+    max_hourly_precipitation = models.FloatField(
+        null=True, blank=True, help_text="Highest hourly rainfall intensity in the month (mm/hour)"
+    )
 
     # Prediction details
     confidence_score = models.FloatField(help_text="Prediction confidence (0-100)")
@@ -64,10 +221,11 @@ class WeatherPrediction(models.Model):
     recommendations = models.TextField(blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date']
-        unique_together = ['year', 'month']
+        unique_together = ['location', 'year', 'month']
 
     def __str__(self):
         return f"{self.get_condition_display()} - {self.year}/{self.month}"
@@ -75,7 +233,8 @@ class WeatherPrediction(models.Model):
 
 class YearlyForecast(models.Model):
     """Store yearly weather forecasts"""
-    year = models.IntegerField(unique=True)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='yearly_forecasts')
+    year = models.IntegerField()
 
     total_precipitation = models.FloatField()
     avg_temperature = models.FloatField()
@@ -92,6 +251,78 @@ class YearlyForecast(models.Model):
 
     class Meta:
         ordering = ['-year']
+        unique_together = ['location', 'year']
+
+    def __str__(self):
+        return f"Yearly Forecast - {self.year}"
+
+class DirtyMonth(models.Model):
+    """A (location, year, month) whose daily data changed since it was analyzed
+
+    Written by the ingest path and drained by
+    prediction.services.recompute_dirty_months.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='dirty_months')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    marked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['location', 'year', 'month']
+        unique_together = ['location', 'year', 'month']
+
+    def __str__(self):
+        return f"Dirty month {self.year}-{self.month:02d}"
+
+
+class Alert(models.Model):
+    """A threshold alert raised while ingesting daily data
+
+    One row per episode: consecutive days on which a rule holds extend the
+    same alert rather than raising a new one. Written by prediction.alerts.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='alerts')
+    rule = models.CharField(max_length=50, help_text="Name of the rule in settings.ALERT_RULES")
+    severity = models.CharField(max_length=20, choices=WeatherPrediction.SEVERITY_CHOICES)
+    start_date = models.DateField(help_text="First day of the episode")
+    end_date = models.DateField(help_text="Latest day the rule held")
+    value = models.FloatField(help_text="Peak value of the rule's measure during the episode")
+    threshold = models.FloatField()
+    message = models.TextField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at', '-id']
+        unique_together = ['location', 'rule', 'start_date']
+        indexes = [
+            # Backs the keyset-paginated alert feed
+            models.Index(fields=['updated_at', 'id'], name='alert_updated_id_idx'),
+            models.Index(fields=['location', 'updated_at'], name='alert_location_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rule} alert for {self.location} from {self.start_date}"
+
+
+class AlertRuleState(models.Model):
+    """Rolling state of one alert rule for a location
+
+    Holds only what the rule needs to evaluate the next day (a few days of
+    values, the open episode), so each ingest batch is evaluated without
+    rescanning history.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='alert_states')
+    rule = models.CharField(max_length=50)
+    last_date = models.DateField(help_text="Latest day evaluated")
+    state = models.JSONField(default=dict)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['location', 'rule']
+        unique_together = ['location', 'rule']
 
     def __str__(self):
-        return f"Yearly Forecast - {self.year}"
\ No newline at end of file
+        return f"{self.rule} state for {self.location}"
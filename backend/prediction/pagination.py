@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AlertFeedPagination(CursorPagination):
+    """Keyset pagination over (updated_at, id), most recently raised or extended first
+
+    Pages are fetched with a range condition on the (updated_at, id) index
+    instead of OFFSET, so deep pages cost the same as the first one.
+    """
+    ordering = ('-updated_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
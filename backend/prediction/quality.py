@@ -0,0 +1,157 @@
+"""
+Batch quality control for daily NASA POWER series.
+
+Checks run as array operations over a whole fetched batch before it is
+written. Every row gets a `quality_flags` bitmask with a group of bits per
+parameter, so a stored value can always be traced back to whether it was
+observed, interpolated or rejected.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+
+# POWER marks missing values with this unless the response says otherwise
+DEFAULT_FILL_VALUE = -999.0
+
+# Order fixes each field's bit group in quality_flags
+QC_FIELDS = [
+    'precipitation', 'temperature', 'temperature_max', 'temperature_min',
+    'relative_humidity', 'wind_speed', 'solar_radiation',
+]
+
+MISSING = 1  # fill value or day absent from the response
+INTERPOLATED = 2  # short gap filled from neighbouring days
+OUTLIER = 4  # physically implausible value, rejected
+SUSPECT = 8  # plausible but far from the rest of the batch, kept
+
+FLAG_NAMES = {MISSING: 'missing', INTERPOLATED: 'interpolated', OUTLIER: 'outlier', SUSPECT: 'suspect'}
+BITS_PER_FIELD = 4
+
+# Plausible ranges for Turkana; values outside are rejected
+PHYSICAL_BOUNDS = {
+    'precipitation': (0.0, 400.0),
+    'temperature': (0.0, 50.0),
+    'temperature_max': (0.0, 55.0),
+    'temperature_min': (-5.0, 45.0),
+    'relative_humidity': (0.0, 100.0),
+    'wind_speed': (0.0, 40.0),
+    'solar_radiation': (0.0, 40.0),
+}
+
+# Rainfall is too intermittent to interpolate or to judge by spread
+INTERPOLATED_FIELDS = [f for f in QC_FIELDS if f != 'precipitation']
+SPREAD_CHECKED_FIELDS = INTERPOLATED_FIELDS
+
+# Longest run of missing days filled by interpolation
+MAX_GAP_DAYS = 3
+
+# Robust z-score above which a value is flagged as suspect
+SUSPECT_Z = 5.0
+
+
+def field_flag(field, flag):
+    return flag << (QC_FIELDS.index(field) * BITS_PER_FIELD)
+
+
+def describe_flags(value):
+    """Decode a quality_flags bitmask into {field: [flag names]}"""
+    described = {}
+    for position, field in enumerate(QC_FIELDS):
+        bits = (value >> (position * BITS_PER_FIELD)) & ((1 << BITS_PER_FIELD) - 1)
+        names = [name for flag, name in FLAG_NAMES.items() if bits & flag]
+        if names:
+            described[field] = names
+    return described
+
+
+def complete_index(dates, arrays):
+    """Reindex a batch onto every calendar day between its first and last date"""
+    start = min(dates)
+    length = (max(dates) - start).days + 1
+    positions = np.array([(d - start).days for d in dates], dtype=np.intp)
+
+    full_dates = [start + timedelta(days=i) for i in range(length)]
+    full_arrays = {}
+    for field, values in arrays.items():
+        column = np.full(length, np.nan)
+        column[positions] = values
+        full_arrays[field] = column
+    return full_dates, full_arrays
+
+
+def _short_gaps(missing, max_gap):
+    """Mask of missing positions inside runs no longer than max_gap with data on both sides"""
+    padded = np.concatenate(([False], missing, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+
+    fillable = np.zeros_like(missing)
+    for start, end in zip(starts, ends):
+        if end - start <= max_gap and start > 0 and end < len(missing):
+            fillable[start:end] = True
+    return fillable
+
+
+def _robust_z(values):
+    median = np.nanmedian(values)
+    mad = np.nanmedian(np.abs(values - median)) * 1.4826
+    if not mad:
+        return np.zeros_like(values)
+    return np.abs(values - median) / mad
+
+
+def run_quality_checks(dates, arrays, fill_value=DEFAULT_FILL_VALUE, max_gap=MAX_GAP_DAYS):
+    """Clean a decoded batch before it is stored
+
+    Returns (dates, arrays, flags) where dates covers every day in the
+    batch's span, rejected and missing values are NaN unless a short gap
+    was interpolated, and flags is an int64 array of quality bitmasks.
+    """
+    if not dates:
+        return dates, arrays, np.zeros(0, dtype=np.int64)
+
+    dates, arrays = complete_index(dates, arrays)
+    flags = np.zeros(len(dates), dtype=np.int64)
+    x = np.arange(len(dates), dtype=float)
+
+    for field in QC_FIELDS:
+        values = arrays.get(field)
+        if values is None:
+            values = arrays[field] = np.full(len(dates), np.nan)
+
+        missing = np.isnan(values) | np.isclose(values, fill_value)
+        values[missing] = np.nan
+        flags[missing] |= field_flag(field, MISSING)
+
+        low, high = PHYSICAL_BOUNDS[field]
+        with np.errstate(invalid='ignore'):
+            outlier = (values < low) | (values > high)
+        values[outlier] = np.nan
+        flags[outlier] |= field_flag(field, OUTLIER)
+
+        if field in SPREAD_CHECKED_FIELDS and np.count_nonzero(~np.isnan(values)) > 2:
+            with np.errstate(invalid='ignore'):
+                suspect = _robust_z(values) > SUSPECT_Z
+            flags[suspect] |= field_flag(field, SUSPECT)
+
+        if field in INTERPOLATED_FIELDS:
+            gaps = np.isnan(values)
+            fillable = _short_gaps(gaps, max_gap)
+            if fillable.any():
+                known = ~gaps
+                values[fillable] = np.interp(x[fillable], x[known], values[known])
+                flags[fillable] |= field_flag(field, INTERPOLATED)
+
+    return dates, arrays, flags
+
+
+def summarize(flags):
+    """Count rows carrying each flag per field, for logging"""
+    summary = {}
+    for field in QC_FIELDS:
+        for flag, name in FLAG_NAMES.items():
+            count = int(np.count_nonzero(flags & field_flag(field, flag)))
+            if count:
+                summary.setdefault(field, {})[name] = count
+    return summary
@@ -0,0 +1,154 @@
+"""
+Regional NASA POWER requests.
+
+One regional request returns every grid cell in a bounding box, so a
+county-wide sync costs a handful of upstream calls (one per parameter
+group) instead of one per location. Cells are decoded into per-parameter
+(cells × days) arrays and each Location takes the values of its nearest
+cell for every parameter, since POWER serves meteorology and solar
+parameters on different grids.
+"""
+import logging
+import math
+from datetime import datetime
+
+import numpy as np
+import requests
+from django.conf import settings
+
+from .quality import DEFAULT_FILL_VALUE
+from .services import PARAMETER_FIELDS, NASAPowerService
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.195
+
+
+class RegionalGrid:
+    """Per-parameter cell coordinates and values decoded from regional responses"""
+
+    def __init__(self, date_keys, fill_value=DEFAULT_FILL_VALUE):
+        self.date_keys = date_keys
+        self.dates = [datetime.strptime(key, '%Y%m%d').date() for key in date_keys]
+        self.fill_value = fill_value
+        self.cells = {}  # parameter -> (coords (n, 2) lat/lon, elevations (n,), values (n, days))
+
+    def add_parameter(self, parameter, features):
+        coords, elevations, values = [], [], []
+        for feature in features:
+            coordinates = feature['geometry']['coordinates']
+            series = feature['properties']['parameter'].get(parameter, {})
+            coords.append((coordinates[1], coordinates[0]))
+            elevations.append(coordinates[2] if len(coordinates) >= 3 else np.nan)
+            values.append(np.fromiter(
+                (series.get(key, np.nan) for key in self.date_keys), dtype=float, count=len(self.date_keys)
+            ))
+        if coords:
+            self.cells[parameter] = (
+                np.array(coords, dtype=float),
+                np.array(elevations, dtype=float),
+                np.vstack(values),
+            )
+
+    @property
+    def cell_count(self):
+        return max((len(coords) for coords, _, _ in self.cells.values()), default=0)
+
+    def nearest(self, parameter, latitude, longitude):
+        """(cell index, distance_km) of the closest cell for a parameter, or None"""
+        if parameter not in self.cells:
+            return None
+        coords = self.cells[parameter][0]
+        dlat = coords[:, 0] - latitude
+        dlon = (coords[:, 1] - longitude) * math.cos(math.radians(latitude))
+        distances = np.hypot(dlat, dlon) * KM_PER_DEGREE
+        index = int(np.argmin(distances))
+        return index, float(distances[index])
+
+    def arrays_for(self, latitude, longitude, max_distance_km):
+        """Per-field arrays and cell elevation for a point, or None if no cell is close enough"""
+        reference = self.nearest('PRECTOTCORR', latitude, longitude)
+        if reference is None or reference[1] > max_distance_km:
+            return None
+
+        arrays = {}
+        for parameter, field in PARAMETER_FIELDS.items():
+            match = self.nearest(parameter, latitude, longitude)
+            if match is None or match[1] > max_distance_km:
+                arrays[field] = np.full(len(self.dates), np.nan)
+            else:
+                arrays[field] = self.cells[parameter][2][match[0]].copy()
+
+        elevation = self.cells['PRECTOTCORR'][1][reference[0]]
+        return arrays, None if np.isnan(elevation) else float(elevation)
+
+
+class NASAPowerRegionalService:
+    """Fetch a bounding box from the POWER regional endpoint and map it onto locations"""
+
+    def __init__(self, session=None):
+        config = settings.NASA_POWER_REGIONAL
+        self.base_url = config['url']
+        self.parameters_per_request = config['parameters_per_request']
+        self.padding = config['padding_degrees']
+        self.max_cell_distance_km = config['max_cell_distance_km']
+        self.parameters = settings.NASA_POWER_PARAMETERS
+        self.http = session or requests
+
+    def bounding_box(self, locations, bbox=None):
+        """Padded (min_lon, min_lat, max_lon, max_lat) covering the county and the locations"""
+        min_lon, min_lat, max_lon, max_lat = bbox or settings.TURKANA_BBOX
+        for location in locations:
+            min_lat, max_lat = min(min_lat, location.latitude), max(max_lat, location.latitude)
+            min_lon, max_lon = min(min_lon, location.longitude), max(max_lon, location.longitude)
+        return (min_lon - self.padding, min_lat - self.padding,
+                max_lon + self.padding, max_lat + self.padding)
+
+    def parameter_groups(self):
+        size = self.parameters_per_request
+        return [self.parameters[i:i + size] for i in range(0, len(self.parameters), size)]
+
+    def fetch(self, parameters, bbox, start_date, end_date):
+        """One regional request; raises on HTTP or network errors"""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        params = {
+            'parameters': ','.join(parameters),
+            'community': 'AG',
+            'latitude-min': round(min_lat, 4),
+            'latitude-max': round(max_lat, 4),
+            'longitude-min': round(min_lon, 4),
+            'longitude-max': round(max_lon, 4),
+            'start': start_date.strftime('%Y%m%d'),
+            'end': end_date.strftime('%Y%m%d'),
+            'format': 'JSON',
+        }
+        response = self.http.get(self.base_url, params=params, timeout=120)
+        response.raise_for_status()
+        return response.json()
+
+    def decode(self, payloads):
+        """Combine the responses for every parameter group into one RegionalGrid"""
+        grid = None
+        for parameters, payload in payloads:
+            features = payload.get('features') or []
+            if not features:
+                logger.warning(f"Regional response for {parameters} has no cells")
+                continue
+            if grid is None:
+                first = features[0]['properties']['parameter']
+                date_keys = list(next(iter(first.values()), {}).keys())
+                fill_value = payload.get('header', {}).get('fill_value', DEFAULT_FILL_VALUE)
+                grid = RegionalGrid(date_keys, fill_value=fill_value)
+            for parameter in parameters:
+                grid.add_parameter(parameter, features)
+        return grid
+
+    def rows_for_location(self, grid, location):
+        """Unsaved WeatherData rows for one location from its nearest cells"""
+        match = grid.arrays_for(location.latitude, location.longitude, self.max_cell_distance_km)
+        if match is None:
+            return None
+        arrays, elevation = match
+        return NASAPowerService(location).rows_from_arrays(
+            grid.dates, arrays, fill_value=grid.fill_value, elevation=elevation
+        )
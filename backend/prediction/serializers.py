@@ -1,20 +1,40 @@
 from rest_framework import serializers
-from .models import WeatherData, WeatherPrediction, YearlyForecast
+from .models import Alert, Location, WeatherData, WeatherPrediction, YearlyForecast
+from .quality import describe_flags
+
+
+class LocationSerializer(serializers.ModelSerializer):
+    """Serializer for weather locations"""
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+
+    class Meta:
+        model = Location
+        fields = [
+            'id', 'name', 'kind', 'kind_display', 'latitude', 'longitude',
+            'elevation', 'is_active', 'last_synced_date', 'created_at'
+        ]
+        read_only_fields = ['id', 'last_synced_date', 'created_at']
 
 
 class WeatherDataSerializer(serializers.ModelSerializer):
     """Serializer for daily weather data"""
+    quality = serializers.SerializerMethodField()
 
     class Meta:
         model = WeatherData
         fields = [
-            'id', 'date', 'latitude', 'longitude',
+            'id', 'location', 'date', 'latitude', 'longitude',
             'precipitation', 'temperature', 'temperature_max',
             'temperature_min', 'relative_humidity', 'wind_speed',
+            'solar_radiation', 'pet_hargreaves', 'pet_penman_monteith',
+            'water_balance', 'max_hourly_precipitation', 'quality_flags', 'quality',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def get_quality(self, obj):
+        return describe_flags(obj.quality_flags)
+
 
 class WeatherPredictionSerializer(serializers.ModelSerializer):
     """Serializer for monthly weather predictions"""
@@ -24,10 +44,11 @@ class WeatherPredictionSerializer(serializers.ModelSerializer):
     class Meta:
         model = WeatherPrediction
         fields = [
-            'id', 'date', 'month', 'year',
+            'id', 'location', 'date', 'month', 'year',
             'condition', 'condition_display',
             'severity', 'severity_display',
             'monthly_precipitation', 'avg_temperature', 'avg_humidity',
+            'monthly_pet', 'monthly_water_balance', 'max_hourly_precipitation',
             'confidence_score', 'description', 'recommendations',
             'created_at'
         ]
@@ -41,7 +62,7 @@ class YearlyForecastSerializer(serializers.ModelSerializer):
     class Meta:
         model = YearlyForecast
         fields = [
-            'id', 'year', 'total_precipitation', 'avg_temperature',
+            'id', 'location', 'year', 'total_precipitation', 'avg_temperature',
             'drought_months', 'flood_risk_months', 'normal_months',
             'overall_risk_level', 'summary',
             'monthly_predictions', 'created_at', 'updated_at'
@@ -50,21 +71,89 @@ class YearlyForecastSerializer(serializers.ModelSerializer):
 
     def get_monthly_predictions(self, obj):
         """Include monthly predictions in yearly forecast"""
-        predictions = WeatherPrediction.objects.filter(year=obj.year)
+        # Views listing many years preload predictions as {(location_id, year): [...]}
+        preloaded = self.context.get('monthly_predictions')
+        if preloaded is not None:
+            predictions = preloaded.get((obj.location_id, obj.year), [])
+        else:
+            predictions = WeatherPrediction.objects.filter(location_id=obj.location_id, year=obj.year)
         return WeatherPredictionSerializer(predictions, many=True).data
 
 
+class AlertSerializer(serializers.ModelSerializer):
+    """Serializer for threshold alerts"""
+    location_name = serializers.CharField(source='location.name', read_only=True)
+    severity_display = serializers.CharField(source='get_severity_display', read_only=True)
+
+    class Meta:
+        model = Alert
+        fields = [
+            'id', 'location', 'location_name', 'rule',
+            'severity', 'severity_display',
+            'start_date', 'end_date', 'value', 'threshold', 'message',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class WeatherSyncSerializer(serializers.Serializer):
     """Serializer for weather data sync operations"""
     years = serializers.IntegerField(default=5, min_value=1, max_value=10)
     start_date = serializers.DateField(required=False)
     end_date = serializers.DateField(required=False)
+    location = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all(), required=False)
 
 
 class MonthlyAnalysisSerializer(serializers.Serializer):
     """Serializer for monthly analysis requests"""
     year = serializers.IntegerField(min_value=1981, max_value=2050)
     month = serializers.IntegerField(min_value=1, max_value=12)
+    location = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all(), required=False)
+
+
+class MonthSerializer(serializers.Serializer):
+    """A single (year, month) pair"""
+    year = serializers.IntegerField(min_value=1981, max_value=2050)
+    month = serializers.IntegerField(min_value=1, max_value=12)
+
+
+class BatchAnalysisSerializer(serializers.Serializer):
+    """Serializer for multi-month analysis requests
+
+    Takes either a list of months or a start_date/end_date range; the
+    validated `pairs` are the distinct (year, month) tuples in order.
+    """
+    MAX_MONTHS = 600
+
+    months = MonthSerializer(many=True, required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    location = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all(), required=False)
+
+    def validate(self, data):
+        has_range = 'start_date' in data or 'end_date' in data
+        if 'months' in data and has_range:
+            raise serializers.ValidationError('Give either months or start_date/end_date, not both')
+        if 'months' in data:
+            pairs = {(item['year'], item['month']) for item in data['months']}
+        elif 'start_date' in data and 'end_date' in data:
+            start, end = data['start_date'], data['end_date']
+            if start > end:
+                raise serializers.ValidationError('start_date must not be after end_date')
+            first, last = start.year * 12 + start.month - 1, end.year * 12 + end.month - 1
+            if last - first >= self.MAX_MONTHS:
+                raise serializers.ValidationError(f'At most {self.MAX_MONTHS} months per request')
+            pairs = {divmod(index, 12) for index in range(first, last + 1)}
+            pairs = {(year, month + 1) for year, month in pairs}
+        else:
+            raise serializers.ValidationError('Give months or both start_date and end_date')
+
+        if not pairs:
+            raise serializers.ValidationError('No months requested')
+        if len(pairs) > self.MAX_MONTHS:
+            raise serializers.ValidationError(f'At most {self.MAX_MONTHS} months per request')
+        data['pairs'] = sorted(pairs)
+        return data
 
 
 class CurrentConditionsSerializer(serializers.Serializer):
@@ -0,0 +1,182 @@
+"""
+Packed per-year storage for daily weather series.
+
+A WeatherData row spends most of its bytes on coordinates, timestamps and
+row overhead. WeatherSeriesYear instead keeps one row per (location, year,
+parameter) with a float32 per day of the year and a validity bitmap, so a
+40-year history of one location is a few hundred rows. The reader returns
+the (dates, {field: ndarray}) shape the quality, evapotranspiration and
+prediction code already consume; the writer only rewrites the year rows
+whose day slots actually changed. With WEATHER_SERIES_STORAGE on, the
+prediction and climatology services read their daily arrays from here
+when no snapshot covers a location, falling back to WeatherData.
+"""
+import calendar
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+
+from .models import WeatherData, WeatherSeriesYear
+
+# WeatherData columns mirrored into the series table
+SERIES_FIELDS = [
+    'precipitation', 'temperature', 'temperature_max', 'temperature_min',
+    'relative_humidity', 'wind_speed', 'solar_radiation',
+    'pet_hargreaves', 'pet_penman_monteith', 'water_balance',
+]
+
+# Also mirrored: the monthly analysis needs the hourly intensity
+STORED_FIELDS = SERIES_FIELDS + ['max_hourly_precipitation']
+
+
+def year_length(year):
+    return 366 if calendar.isleap(year) else 365
+
+
+def encode(values):
+    """Pack one year of float values (NaN = missing) into (values, valid, valid_days)"""
+    valid = ~np.isnan(values)
+    return (
+        np.asarray(values, dtype=np.float32).tobytes(),
+        np.packbits(valid, bitorder='little').tobytes(),
+        int(valid.sum()),
+    )
+
+
+def decode(values, valid, year):
+    """Unpack a stored year into a float array with NaN for invalid days"""
+    length = year_length(year)
+    array = np.frombuffer(bytes(values), dtype=np.float32, count=length).astype(float)
+    bits = np.unpackbits(np.frombuffer(bytes(valid), dtype=np.uint8), count=length, bitorder='little')
+    array[bits == 0] = np.nan
+    return array
+
+
+class WeatherSeriesStore:
+    """Read and patch the packed daily series of one location"""
+
+    def __init__(self, location):
+        self.location = location
+
+    def read(self, start_date, end_date, fields=None):
+        """Daily arrays for [start_date, end_date] as (dates, {field: ndarray})
+
+        Days with no stored value are NaN.
+        """
+        fields = list(fields or STORED_FIELDS)
+        length = (end_date - start_date).days + 1
+        dates = [start_date + timedelta(days=i) for i in range(length)]
+        arrays = {field: np.full(length, np.nan) for field in fields}
+
+        stored = WeatherSeriesYear.objects.filter(
+            location=self.location,
+            parameter__in=fields,
+            year__range=(start_date.year, end_date.year),
+        ).values_list('parameter', 'year', 'values', 'valid')
+        for parameter, year, values, valid in stored:
+            year_values = decode(values, valid, year)
+            offset = (date(year, 1, 1) - start_date).days
+            first, last = max(offset, 0), min(offset + len(year_values), length)
+            arrays[parameter][first:last] = year_values[first - offset:last - offset]
+        return dates, arrays
+
+    def span(self):
+        """(first_date, last_date) of the stored years, or None if nothing is stored"""
+        years = WeatherSeriesYear.objects.filter(location=self.location).aggregate(
+            first=Min('year'), last=Max('year')
+        )
+        if years['first'] is None:
+            return None
+        return date(years['first'], 1, 1), date(years['last'], 12, 31)
+
+    def write(self, dates, arrays):
+        """Patch the given days into the stored years
+
+        `arrays` maps fields to values aligned with `dates` (NaN = missing).
+        Only year rows whose contents change are written; returns their count.
+        """
+        if not dates:
+            return 0
+        fields = [field for field in STORED_FIELDS if field in arrays]
+        years = np.array([day.year for day in dates])
+        slots = np.array([day.timetuple().tm_yday - 1 for day in dates])
+
+        existing = {
+            (parameter, year): (bytes(values), bytes(valid))
+            for parameter, year, values, valid in WeatherSeriesYear.objects.filter(
+                location=self.location, parameter__in=fields, year__in=set(years.tolist())
+            ).values_list('parameter', 'year', 'values', 'valid')
+        }
+
+        changed = []
+        for year in sorted(set(years.tolist())):
+            in_year = years == year
+            for field in fields:
+                stored = existing.get((field, year))
+                if stored is None:
+                    current = np.full(year_length(year), np.nan)
+                else:
+                    current = decode(*stored, year)
+                current[slots[in_year]] = np.asarray(arrays[field], dtype=float)[in_year]
+                values, valid, valid_days = encode(current)
+                if stored == (values, valid):
+                    continue
+                changed.append(WeatherSeriesYear(
+                    location=self.location, year=year, parameter=field,
+                    values=values, valid=valid, valid_days=valid_days,
+                ))
+
+        if changed:
+            WeatherSeriesYear.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=['location', 'year', 'parameter'],
+                update_fields=['values', 'valid', 'valid_days', 'updated_at'],
+            )
+        return len(changed)
+
+    def refresh(self, start_date, end_date):
+        """Copy stored WeatherData days in a range into the series; returns rows written"""
+        stored = list(WeatherData.objects.filter(
+            location=self.location, date__range=(start_date, end_date)
+        ).order_by('date').values_list('date', *STORED_FIELDS))
+        if not stored:
+            return 0
+        columns = list(zip(*stored))
+        arrays = {
+            field: np.array(columns[i + 1], dtype=float)  # None becomes NaN
+            for i, field in enumerate(STORED_FIELDS)
+        }
+        return self.write(list(columns[0]), arrays)
+
+
+def read_series(location, start_date=None, end_date=None, fields=None):
+    """(dates, arrays) from the series for analysis, or None to read WeatherData instead
+
+    None unless WEATHER_SERIES_STORAGE is on and some day of the range is
+    stored. Without dates the whole stored span is read.
+    """
+    if not settings.WEATHER_SERIES_STORAGE:
+        return None
+    store = WeatherSeriesStore(location)
+    if start_date is None or end_date is None:
+        span = store.span()
+        if span is None:
+            return None
+        start_date, end_date = start_date or span[0], end_date or span[1]
+    dates, arrays = store.read(start_date, end_date, fields)
+    if not any(np.isfinite(values).any() for values in arrays.values()):
+        return None
+    return dates, arrays
+
+
+def refresh_series(spans):
+    """Mirror WeatherData into the series for {location: (first_date, last_date)}"""
+    with transaction.atomic():
+        return sum(
+            WeatherSeriesStore(location).refresh(first, last)
+            for location, (first, last) in spans.items()
+        )
@@ -1,26 +1,219 @@
 import requests
+import numpy as np
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
-from django.db.models import Avg, Sum
-from .models import WeatherData, WeatherPrediction, YearlyForecast
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.utils import timezone
+from .models import DirtyMonth, Location, WeatherData, WeatherPrediction, YearlyForecast
+from .evapotranspiration import compute_batch
+from .quality import DEFAULT_FILL_VALUE, run_quality_checks, summarize
+from .alerts import evaluate_alerts
+from .climatology import refresh_climatology
+from .series import STORED_FIELDS, WeatherSeriesStore, read_series, refresh_series
+from .snapshot import refresh_snapshot
+from .streaming import PowerStreamDecoder
+import calendar
 import logging
+from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# WeatherData field for each NASA POWER parameter
+PARAMETER_FIELDS = {
+    'PRECTOTCORR': 'precipitation',
+    'T2M': 'temperature',
+    'T2M_MAX': 'temperature_max',
+    'T2M_MIN': 'temperature_min',
+    'RH2M': 'relative_humidity',
+    'WS2M': 'wind_speed',
+    'ALLSKY_SFC_SW_DWN': 'solar_radiation',
+}
+
+# Bytes read from the POWER response per step when streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+DERIVED_FIELDS = ['pet_hargreaves', 'pet_penman_monteith', 'water_balance']
+
+WEATHER_UPDATE_FIELDS = (
+    ['latitude', 'longitude'] + list(PARAMETER_FIELDS.values())
+    + DERIVED_FIELDS + ['quality_flags', 'updated_at']
+)
+
+
+# Daily fields monthly predictions are computed from; a change marks the month dirty
+ANALYSIS_FIELDS = [
+    'precipitation', 'temperature', 'relative_humidity',
+    'pet_penman_monteith', 'pet_hargreaves', 'water_balance', 'max_hourly_precipitation',
+]
+
+
+FLOOD_RANK = {'moderate_flood': 1, 'severe_flood': 2, 'extreme_flood': 3}
+FLOOD_SEVERITY = {'moderate_flood': 'medium', 'severe_flood': 'high', 'extreme_flood': 'critical'}
+
+
+def _nullable(value):
+    return None if np.isnan(value) else float(value)
+
+
+def monthly_aggregates():
+    """The monthly aggregates of analyze_monthly_conditions as ORM expressions"""
+    return {
+        'total_precipitation': Sum('precipitation'),
+        'avg_temperature': Avg('temperature'),
+        'avg_humidity': Avg('relative_humidity'),
+        'total_pet': Sum(Coalesce('pet_penman_monteith', 'pet_hargreaves')),
+        'water_balance': Sum('water_balance'),
+        'valid_days': Count('precipitation'),
+        'max_hourly_precipitation': Max('max_hourly_precipitation'),
+    }
+
+
+def monthly_stats_from_arrays(arrays):
+    """The monthly aggregates of analyze_monthly_conditions, from daily arrays"""
+    def total(values):
+        return float(np.nansum(values)) if np.isfinite(values).any() else None
+
+    def mean(values):
+        return float(np.nanmean(values)) if np.isfinite(values).any() else None
+
+    pet = np.where(
+        np.isnan(arrays['pet_penman_monteith']), arrays['pet_hargreaves'], arrays['pet_penman_monteith']
+    )
+    intensity = arrays['max_hourly_precipitation']
+    return {
+        'total_precipitation': total(arrays['precipitation']),
+        'avg_temperature': mean(arrays['temperature']),
+        'avg_humidity': mean(arrays['relative_humidity']),
+        'total_pet': total(pet),
+        'water_balance': total(arrays['water_balance']),
+        'valid_days': int(np.isfinite(arrays['precipitation']).sum()),
+        'max_hourly_precipitation': float(np.nanmax(intensity)) if np.isfinite(intensity).any() else None,
+    }
+
+
+def write_weather_rows(rows, update_fields=WEATHER_UPDATE_FIELDS):
+    """Upsert unsaved WeatherData rows for any mix of locations
+
+    Returns the number of rows that did not exist before. Each location's
+    last_synced_date is advanced to its latest day with valid rainfall,
+    months with new or changed analysis fields are marked dirty and the
+    alert rules are stepped through the new days: rules on the updated
+    fields through every row, the others through rows created here.
+    """
+    if not rows:
+        return 0
+
+    spans = {}
+    latest_valid = {}
+    locations = {}
+    for row in rows:
+        locations[row.location_id] = row.location
+        first, last = spans.get(row.location_id, (row.date, row.date))
+        spans[row.location_id] = (min(first, row.date), max(last, row.date))
+        if row.precipitation is not None and row.date > latest_valid.get(row.location_id, row.date.min):
+            latest_valid[row.location_id] = row.date
+
+    span_filter = Q()
+    for location_id, span in spans.items():
+        span_filter |= Q(location_id=location_id, date__range=span)
+    compared = [field for field in ANALYSIS_FIELDS if field in update_fields]
+    existing = {
+        (location_id, day): tuple(values)
+        for location_id, day, *values in WeatherData.objects.filter(span_filter).values_list(
+            'location_id', 'date', *compared
+        )
+    }
+    new_rows = []
+    dirty = set()
+    for row in rows:
+        stored = existing.get((row.location_id, row.date))
+        if stored is None:
+            new_rows.append(row)
+        elif stored == tuple(getattr(row, field) for field in compared):
+            continue
+        dirty.add((row.location_id, row.date.year, row.date.month))
+
+    with transaction.atomic():
+        WeatherData.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['location', 'date'],
+            update_fields=update_fields,
+        )
+        for location_id, day in latest_valid.items():
+            Location.objects.filter(
+                Q(last_synced_date__isnull=True) | Q(last_synced_date__lt=day), pk=location_id
+            ).update(last_synced_date=day)
+        mark_dirty_months(dirty)
+        if settings.WEATHER_SERIES_STORAGE:
+            refresh_series({locations[location_id]: span for location_id, span in spans.items()})
+        evaluate_alerts(rows, fields=update_fields)
+        # New days carry every field, so rules on fields not being updated see them too
+        evaluate_alerts(new_rows, fields=[
+            field.name for field in WeatherData._meta.concrete_fields if field.name not in update_fields
+        ])
+
+    return len(new_rows)
+
+
+def mark_dirty_months(months):
+    """Queue (location_id, year, month) buckets for prediction recomputation"""
+    if months:
+        DirtyMonth.objects.bulk_create(
+            [DirtyMonth(location_id=location_id, year=year, month=month) for location_id, year, month in months],
+            update_conflicts=True,
+            unique_fields=['location', 'year', 'month'],
+            update_fields=['marked_at'],
+        )
+
+
+def recompute_dirty_months(locations=None):
+    """Refresh predictions and climatology for every dirty month and their yearly forecasts
+
+    Limited to the given locations if any. Returns the number of months
+    recomputed; work is proportional to what changed since the last run.
+    """
+    # Taken before the marks are read, so months marked meanwhile stay queued
+    claimed = timezone.now()
+    marks = DirtyMonth.objects.select_related('location').order_by('location_id', 'year', 'month')
+    if locations is not None:
+        marks = marks.filter(location__in=list(locations))
+
+    by_location = defaultdict(list)
+    for mark in marks:
+        by_location[mark.location].append(mark)
+
+    total = 0
+    with transaction.atomic():
+        for location, location_marks in by_location.items():
+            service = WeatherPredictionService(location)
+            for year in service.refresh_months(location_marks, claimed):
+                service.build_yearly_forecast(year)
+            total += len(location_marks)
+    if total:
+        logger.info(f"Recomputed {total} dirty months for {len(by_location)} locations")
+        refresh_climatology({
+            location: {mark.month for mark in location_marks} for location, location_marks in by_location.items()
+        })
+    return total
+
 
 class NASAPowerService:
     """Service to fetch and process NASA POWER API data"""
 
-    def __init__(self):
+    def __init__(self, location=None, session=None):
+        self.location = location or Location.get_default()
         self.base_url = settings.NASA_POWER_API_URL
-        self.latitude = settings.TURKANA_LATITUDE
-        self.longitude = settings.TURKANA_LONGITUDE
+        self.latitude = self.location.latitude
+        self.longitude = self.location.longitude
         self.parameters = settings.NASA_POWER_PARAMETERS
+        self.http = session or requests
 
-    def fetch_weather_data(self, start_date, end_date):
-        """Fetch weather data from NASA POWER API"""
-        params = {
+    def _request_params(self, start_date, end_date):
+        return {
             'parameters': ','.join(self.parameters),
             'community': 'AG',  # Agriculture community
             'longitude': self.longitude,
@@ -30,52 +223,80 @@ class NASAPowerService:
             'format': 'JSON'
         }
 
+    def fetch_weather_arrays(self, start_date, end_date):
+        """Stream a POWER response straight into per-field arrays
+
+        Returns (dates, arrays, fill_value, elevation), or None on failure.
+        """
+        params = self._request_params(start_date, end_date)
+        decoder = PowerStreamDecoder(start_date, end_date, PARAMETER_FIELDS)
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching NASA POWER data: {e}")
+            with self.http.get(self.base_url, params=params, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                dates, values = decoder.decode(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Error fetching NASA POWER data for {self.location.name}: {e}")
             return None
 
-    def store_weather_data(self, data):
-        """Store fetched weather data in database"""
-        if not data or 'properties' not in data:
-            logger.error("Invalid data format from NASA POWER API")
-            return 0
+        missing = np.full(len(dates), np.nan)
+        arrays = {field: values.get(parameter, missing.copy()) for parameter, field in PARAMETER_FIELDS.items()}
+        fill_value = DEFAULT_FILL_VALUE if decoder.fill_value is None else decoder.fill_value
+        return dates, arrays, fill_value, decoder.elevation
 
-        parameters = data['properties']['parameter']
-        stored_count = 0
-
-        dates = list(parameters.get('PRECTOTCORR', {}).keys())
-
-        for date_str in dates:
-            try:
-                date_obj = datetime.strptime(date_str, '%Y%m%d').date()
-
-                weather_data, created = WeatherData.objects.update_or_create(
-                    date=date_obj,
-                    defaults={
-                        'latitude': self.latitude,
-                        'longitude': self.longitude,
-                        'precipitation': parameters['PRECTOTCORR'].get(date_str, 0),
-                        'temperature': parameters['T2M'].get(date_str, 0),
-                        'temperature_max': parameters['T2M_MAX'].get(date_str, 0),
-                        'temperature_min': parameters['T2M_MIN'].get(date_str, 0),
-                        'relative_humidity': parameters['RH2M'].get(date_str, 0),
-                        'wind_speed': parameters['WS2M'].get(date_str, 0),
-                    }
-                )
-
-                if created:
-                    stored_count += 1
-            except Exception as e:
-                logger.error(f"Error storing weather data for {date_str}: {e}")
-                continue
+    def fetch_rows(self, start_date, end_date):
+        """Unsaved WeatherData rows for a date range, or None if the fetch failed"""
+        fetched = self.fetch_weather_arrays(start_date, end_date)
+        if fetched is None:
+            return None
+        dates, arrays, fill_value, elevation = fetched
+        return self.rows_from_arrays(dates, arrays, fill_value=fill_value, elevation=elevation)
 
-        logger.info(f"Stored {stored_count} new weather records")
+    def sync_range(self, start_date, end_date):
+        """Fetch and store a date range; returns the number of new records"""
+        rows = self.fetch_rows(start_date, end_date)
+        if not rows:
+            return 0
+        stored_count = write_weather_rows(rows)
+        logger.info(f"Stored {stored_count} new weather records for {self.location.name}")
+        recompute_dirty_months([self.location])
         return stored_count
 
+    def _elevation(self, reported=None):
+        if reported is not None:
+            return reported
+        if self.location.elevation is not None:
+            return self.location.elevation
+        return settings.TURKANA_ELEVATION
+
+    def rows_from_arrays(self, dates, arrays, fill_value=DEFAULT_FILL_VALUE, elevation=None):
+        """Quality-check decoded per-field arrays into unsaved WeatherData rows"""
+        if not dates:
+            return []
+
+        dates, arrays, flags = run_quality_checks(dates, arrays, fill_value=fill_value)
+        issues = summarize(flags)
+        if issues:
+            logger.warning(
+                f"Quality control flags for {self.location.name} {dates[0]} to {dates[-1]}: {issues}"
+            )
+
+        # Derived columns are computed for the whole batch at once
+        derived = compute_batch(dates, arrays, self.latitude, self._elevation(elevation))
+
+        rows = []
+        for i, date_obj in enumerate(dates):
+            values = {
+                'latitude': self.latitude,
+                'longitude': self.longitude,
+                'quality_flags': int(flags[i]),
+            }
+            for field in PARAMETER_FIELDS.values():
+                values[field] = _nullable(arrays[field][i])
+            for field in DERIVED_FIELDS:
+                values[field] = _nullable(derived[field][i])
+            rows.append(WeatherData(location=self.location, date=date_obj, **values))
+        return rows
+
     def sync_historical_data(self, years=5):
         """Sync historical weather data for analysis"""
         end_date = datetime.now().date()
@@ -83,72 +304,283 @@ class NASAPowerService:
 
         logger.info(f"Syncing weather data from {start_date} to {end_date}")
 
-        data = self.fetch_weather_data(start_date, end_date)
-        if data:
-            return self.store_weather_data(data)
-        return 0
+        return self.sync_range(start_date, end_date)
+
+
+class EvapotranspirationService:
+    """Recompute derived evapotranspiration columns for stored weather data"""
+
+    def recompute(self, start_date, end_date, location=None):
+        """Recompute PET and water balance for days in [start_date, end_date]
+
+        Covers every location unless one is given.
+        """
+        queryset = WeatherData.objects.filter(date__range=(start_date, end_date))
+        if location is not None:
+            queryset = queryset.filter(location=location)
+
+        total = 0
+        for location_id in queryset.order_by().values_list('location_id', flat=True).distinct():
+            total += self._recompute_location(queryset.filter(location_id=location_id))
+        logger.info(f"Recomputed evapotranspiration for {total} days")
+        if total:
+            recompute_dirty_months()
+            refresh_snapshot()
+        return total
+
+    def _recompute_location(self, queryset):
+        rows = list(queryset.select_related('location').order_by('date'))
+        if not rows:
+            return 0
+        location = rows[0].location
+        elevation = location.elevation if location.elevation is not None else settings.TURKANA_ELEVATION
+
+        arrays = {
+            field: np.array(
+                [np.nan if getattr(row, field) is None else getattr(row, field) for row in rows],
+                dtype=float
+            )
+            for field in PARAMETER_FIELDS.values()
+        }
+        derived = compute_batch([row.date for row in rows], arrays, location.latitude, elevation)
+
+        dirty = set()
+        for i, row in enumerate(rows):
+            before = tuple(getattr(row, field) for field in DERIVED_FIELDS)
+            for field in DERIVED_FIELDS:
+                setattr(row, field, _nullable(derived[field][i]))
+            if before != tuple(getattr(row, field) for field in DERIVED_FIELDS):
+                dirty.add((location.pk, row.date.year, row.date.month))
+
+        with transaction.atomic():
+            WeatherData.objects.bulk_update(rows, DERIVED_FIELDS, batch_size=500)
+            mark_dirty_months(dirty)
+            if settings.WEATHER_SERIES_STORAGE:
+                WeatherSeriesStore(location).refresh(rows[0].date, rows[-1].date)
+        return len(rows)
 
 
 class WeatherPredictionService:
     """Service to analyze weather data and make predictions"""
 
-    def __init__(self):
+    def __init__(self, location=None, snapshot=None):
+        self.location = location or Location.get_default()
+        # Optional WeatherSnapshot to read daily data from instead of the database
+        self.snapshot = snapshot
         self.drought_thresholds = settings.DROUGHT_THRESHOLDS
         self.flood_thresholds = settings.FLOOD_THRESHOLDS
+        self.flash_flood_thresholds = settings.FLASH_FLOOD_THRESHOLDS
 
     def analyze_monthly_conditions(self, year, month):
         """Analyze weather conditions for a specific month"""
-        weather_data = WeatherData.objects.filter(
-            date__year=year,
-            date__month=month
-        )
+        stats = self._monthly_stats(year, month)
+        if stats is None:
+            return None
 
-        if not weather_data.exists():
+        values = self.prediction_values(year, month, stats)
+        if values is None:
             return None
 
-        stats = weather_data.aggregate(
-            total_precipitation=Sum('precipitation'),
-            avg_temperature=Avg('temperature'),
-            avg_humidity=Avg('relative_humidity'),
+        prediction, created = WeatherPrediction.objects.update_or_create(
+            location=self.location,
+            year=year,
+            month=month,
+            defaults=values
         )
 
+        return prediction
+
+    def prediction_values(self, year, month, stats):
+        """WeatherPrediction field values for a month's aggregates, or None without valid data"""
         monthly_precip = stats['total_precipitation']
         avg_temp = stats['avg_temperature']
         avg_humidity = stats['avg_humidity']
 
+        if monthly_precip is None or avg_temp is None or avg_humidity is None:
+            logger.warning(f"No valid weather data for {self.location.name} {year}-{month:02d}")
+            return None
+
         # Determine condition and severity
-        condition, severity = self._classify_condition(monthly_precip, avg_temp, avg_humidity)
+        condition, severity = self._classify_condition(
+            monthly_precip, avg_temp, avg_humidity, stats['max_hourly_precipitation']
+        )
 
-        # Calculate confidence score based on data completeness
-        expected_days = 30
-        actual_days = weather_data.count()
-        confidence = (actual_days / expected_days) * 100
+        # Calculate confidence score from days with valid rainfall
+        expected_days = calendar.monthrange(year, month)[1]
+        confidence = (stats['valid_days'] / expected_days) * 100
 
         description = self._generate_description(
             condition, monthly_precip, avg_temp, avg_humidity
         )
+        if stats['water_balance'] is not None:
+            description += (f" Evapotranspiration of {stats['total_pet']:.1f}mm gives a "
+                            f"water balance of {stats['water_balance']:.1f}mm.")
+        if stats['max_hourly_precipitation'] is not None:
+            description += (f" Peak rainfall intensity reached "
+                            f"{stats['max_hourly_precipitation']:.1f}mm in one hour.")
         recommendations = self._generate_recommendations(condition, severity)
 
-        prediction, created = WeatherPrediction.objects.update_or_create(
-            year=year,
-            month=month,
-            defaults={
-                'date': datetime(year, month, 1).date(),
-                'condition': condition,
-                'severity': severity,
-                'monthly_precipitation': monthly_precip,
-                'avg_temperature': avg_temp,
-                'avg_humidity': avg_humidity,
-                'confidence_score': confidence,
-                'description': description,
-                'recommendations': recommendations,
-            }
+        return {
+            'date': datetime(year, month, 1).date(),
+            'condition': condition,
+            'severity': severity,
+            'monthly_precipitation': monthly_precip,
+            'avg_temperature': avg_temp,
+            'avg_humidity': avg_humidity,
+            'monthly_pet': stats['total_pet'],
+            'monthly_water_balance': stats['water_balance'],
+            'max_hourly_precipitation': stats['max_hourly_precipitation'],
+            'confidence_score': confidence,
+            'description': description,
+            'recommendations': recommendations,
+        }
+
+    def _snapshot_month_stats(self, year, month):
+        """Aggregates for a month from the snapshot, or None if it does not cover the month"""
+        if self.snapshot is None:
+            return None
+        series = self.snapshot.series(
+            self.location,
+            datetime(year, month, 1).date(),
+            datetime(year, month, calendar.monthrange(year, month)[1]).date(),
+        )
+        if series is None or not series[0]:
+            return None
+        return monthly_stats_from_arrays(series[1])
+
+    def _series_month_stats(self, months):
+        """{(year, month): aggregates} from the packed series for the sorted months it holds"""
+        if not months:
+            return {}
+        last_year, last_month = months[-1]
+        series = read_series(
+            self.location,
+            datetime(months[0][0], months[0][1], 1).date(),
+            datetime(last_year, last_month, calendar.monthrange(last_year, last_month)[1]).date(),
+            STORED_FIELDS,
         )
+        if series is None:
+            return {}
+        dates, arrays = series
+        month_index = np.array([day.year * 12 + day.month for day in dates])
+        stats = {}
+        for year, month in months:
+            in_month = month_index == year * 12 + month
+            days = {field: values[in_month] for field, values in arrays.items()}
+            if any(np.isfinite(values).any() for values in days.values()):
+                stats[(year, month)] = monthly_stats_from_arrays(days)
+        return stats
+
+    def _monthly_stats(self, year, month):
+        """Aggregate one month of daily data, or None if there is none"""
+        stats = self._snapshot_month_stats(year, month)
+        if stats is not None:
+            return stats
+        stats = self._series_month_stats([(year, month)]).get((year, month))
+        if stats is not None:
+            return stats
 
-        return prediction
+        weather_data = WeatherData.objects.filter(
+            location=self.location,
+            date__year=year,
+            date__month=month
+        )
 
-    def _classify_condition(self, precipitation, temperature, humidity):
+        if not weather_data.exists():
+            return None
+
+        return weather_data.aggregate(**monthly_aggregates())
+
+    def analyze_months(self, months):
+        """Analyze many (year, month) pairs with one grouped aggregate and one bulk upsert
+
+        Returns (predictions, errors): the saved predictions in month order
+        and {(year, month): message} for months that could not be analyzed.
+        """
+        months = sorted(set(months))
+        stats = self._grouped_monthly_stats(months)
+
+        rows = []
+        errors = {}
+        for year, month in months:
+            if (year, month) not in stats:
+                errors[(year, month)] = 'No weather data available for this month'
+                continue
+            values = self.prediction_values(year, month, stats[(year, month)])
+            if values is None:
+                errors[(year, month)] = 'No valid weather data available for this month'
+                continue
+            update_fields = list(values) + ['updated_at']
+            rows.append(WeatherPrediction(location=self.location, year=year, month=month, **values))
+
+        if not rows:
+            return [], errors
+        WeatherPrediction.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['location', 'year', 'month'],
+            update_fields=update_fields,
+        )
+        # Read back so existing rows report their stored ids and created_at
+        predictions = WeatherPrediction.objects.filter(
+            location=self.location, date__in=[row.date for row in rows]
+        ).order_by('date')
+        return list(predictions), errors
+
+    def _grouped_monthly_stats(self, months):
+        """{(year, month): aggregates} for the months that have data, in one query"""
+        stats = {}
+        remaining = []
+        for year, month in months:
+            stored = self._snapshot_month_stats(year, month)
+            if stored is None:
+                remaining.append((year, month))
+            else:
+                stats[(year, month)] = stored
+        series_stats = self._series_month_stats(remaining)
+        stats.update(series_stats)
+        remaining = [key for key in remaining if key not in series_stats]
+        if not remaining:
+            return stats
+
+        # Consecutive months share one date range condition
+        ranges = Q()
+        run_start = previous = None
+        for year, month in remaining + [(None, None)]:
+            index = None if year is None else year * 12 + month - 1
+            if previous is not None and index == previous + 1:
+                previous = index
+                continue
+            if run_start is not None:
+                last_year, last_month = divmod(previous, 12)
+                ranges |= Q(date__range=(
+                    datetime(run_start // 12, run_start % 12 + 1, 1).date(),
+                    datetime(last_year, last_month + 1, calendar.monthrange(last_year, last_month + 1)[1]).date(),
+                ))
+            run_start = previous = index
+
+        grouped = WeatherData.objects.filter(ranges, location=self.location).annotate(
+            year=ExtractYear('date'), month=ExtractMonth('date')
+        ).order_by().values('year', 'month').annotate(**monthly_aggregates())
+        stats.update({(row.pop('year'), row.pop('month')): row for row in grouped})
+        return stats
+
+    def _classify_condition(self, precipitation, temperature, humidity, max_hourly_precipitation=None):
         """Classify weather condition based on metrics"""
+        condition, severity = self._classify_totals(precipitation, temperature, humidity)
+        if max_hourly_precipitation is None:
+            return condition, severity
+
+        # Intense hourly bursts cause flash floods even in months with little total rain
+        for flash_condition, threshold in self.flash_flood_thresholds.items():
+            if max_hourly_precipitation >= threshold:
+                if FLOOD_RANK[flash_condition] > FLOOD_RANK.get(condition, 0):
+                    return flash_condition, FLOOD_SEVERITY[flash_condition]
+                break
+        return condition, severity
+
+    def _classify_totals(self, precipitation, temperature, humidity):
+        """Classify weather condition from monthly totals"""
         # Check for drought conditions
         if precipitation < self.drought_thresholds['severe_drought']:
             return 'severe_drought', 'critical'
@@ -219,34 +651,73 @@ class WeatherPredictionService:
 
         return recommendations.get(condition, "Continue monitoring weather conditions.")
 
+    def refresh_months(self, marks, claimed=None):
+        """Re-analyze the months of DirtyMonth marks in one batch and clear them
+
+        Returns the years touched. A month left without valid data loses its
+        stale prediction. Marks set again after `claimed` (default: before
+        `marks` is read) stay queued.
+        """
+        claimed = claimed or timezone.now()
+        marks = list(marks)
+        if not marks:
+            return set()
+        _, errors = self.analyze_months([(mark.year, mark.month) for mark in marks])
+        if errors:
+            stale = Q()
+            for year, month in errors:
+                stale |= Q(year=year, month=month)
+            WeatherPrediction.objects.filter(stale, location=self.location).delete()
+        DirtyMonth.objects.filter(pk__in=[mark.pk for mark in marks], marked_at__lte=claimed).delete()
+        return {mark.year for mark in marks}
+
     def generate_yearly_forecast(self, year):
         """Generate comprehensive yearly forecast"""
-        predictions = WeatherPrediction.objects.filter(year=year)
-
-        if not predictions.exists():
+        if WeatherPrediction.objects.filter(location=self.location, year=year).exists():
+            # Bring months whose data changed since they were analyzed up to date
+            self.refresh_months(DirtyMonth.objects.filter(location=self.location, year=year))
+        else:
             # Generate predictions for each month
             for month in range(1, 13):
                 self.analyze_monthly_conditions(year, month)
-            predictions = WeatherPrediction.objects.filter(year=year)
+            DirtyMonth.objects.filter(location=self.location, year=year).delete()
+
+        return self.build_yearly_forecast(year)
+
+    def build_yearly_forecast(self, year):
+        """Summarize the stored monthly predictions of a year into its YearlyForecast"""
+        predictions = WeatherPrediction.objects.filter(location=self.location, year=year)
 
         if not predictions.exists():
+            YearlyForecast.objects.filter(location=self.location, year=year).delete()
             return None
 
-        stats = predictions.aggregate(
-            total_precipitation=Sum('monthly_precipitation'),
-            avg_temperature=Avg('avg_temperature'),
+        values = self.yearly_values(
+            year, predictions.values('condition', 'monthly_precipitation', 'avg_temperature')
         )
 
-        # Count different condition types
-        drought_months = predictions.filter(
-            condition__in=['severe_drought', 'moderate_drought', 'mild_drought']
-        ).count()
+        forecast, created = YearlyForecast.objects.update_or_create(
+            location=self.location,
+            year=year,
+            defaults=values
+        )
 
-        flood_months = predictions.filter(
-            condition__in=['extreme_flood', 'severe_flood', 'moderate_flood']
-        ).count()
+        return forecast
 
-        normal_months = predictions.filter(condition='normal').count()
+    def yearly_values(self, year, months):
+        """YearlyForecast field values from a year's monthly prediction values"""
+        months = list(months)
+        conditions = [month['condition'] for month in months]
+        total_precipitation = sum(month['monthly_precipitation'] for month in months)
+
+        # Count different condition types
+        drought_months = sum(
+            condition in ('severe_drought', 'moderate_drought', 'mild_drought') for condition in conditions
+        )
+        flood_months = sum(
+            condition in ('extreme_flood', 'severe_flood', 'moderate_flood') for condition in conditions
+        )
+        normal_months = conditions.count('normal')
 
         # Determine overall risk level
         if drought_months >= 6 or flood_months >= 3:
@@ -260,28 +731,23 @@ class WeatherPredictionService:
 
         summary = self._generate_yearly_summary(
             year, drought_months, flood_months, normal_months,
-            stats['total_precipitation'], risk_level
-        )
-
-        forecast, created = YearlyForecast.objects.update_or_create(
-            year=year,
-            defaults={
-                'total_precipitation': stats['total_precipitation'],
-                'avg_temperature': stats['avg_temperature'],
-                'drought_months': drought_months,
-                'flood_risk_months': flood_months,
-                'normal_months': normal_months,
-                'overall_risk_level': risk_level,
-                'summary': summary,
-            }
+            total_precipitation, risk_level
         )
 
-        return forecast
+        return {
+            'total_precipitation': total_precipitation,
+            'avg_temperature': sum(month['avg_temperature'] for month in months) / len(months),
+            'drought_months': drought_months,
+            'flood_risk_months': flood_months,
+            'normal_months': normal_months,
+            'overall_risk_level': risk_level,
+            'summary': summary,
+        }
 
     def _generate_yearly_summary(self, year, drought_months, flood_months,
                                  normal_months, total_precip, risk_level):
         """Generate yearly summary"""
-        summary = f"Weather Forecast Summary for Turkana County - {year}\n\n"
+        summary = f"Weather Forecast Summary for {self.location.name} - {year}\n\n"
         summary += f"Overall Risk Level: {risk_level.upper()}\n\n"
         summary += f"Annual Precipitation: {total_precip:.1f}mm\n"
         summary += f"Drought-affected months: {drought_months}\n"
@@ -0,0 +1,257 @@
+"""
+Memory-mapped columnar snapshot of the daily weather history.
+
+After each ingest the whole WeatherData table is exported to one `.npy`
+column per field, with each location's days stored contiguously on a
+complete calendar. Every worker process maps the same files with
+`numpy.memmap`, so the pages are shared through the OS cache and a series
+slice is a zero-copy view instead of a query.
+
+Each export goes to a fresh version directory, which is only published by
+atomically replacing the CURRENT pointer file, so readers never see a
+partly written snapshot. Readers notice a new version on their next call.
+Older versions are kept briefly for processes still mapping them.
+
+Ingest commands export once per run. A sync requested through the API
+only marks its location stale in the current version instead: readers use
+the database for that location, and the snapshot for every other one,
+until the next run publishes a fresh version without marks.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Min
+
+from .models import WeatherData
+from .series import SERIES_FIELDS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = SERIES_FIELDS + ['max_hourly_precipitation']
+
+POINTER = 'CURRENT'
+META = 'meta.json'
+STALE = 'stale'  # per-version directory with one empty file per stale location id
+EXPORT_CHUNK_ROWS = 10000
+
+_current = {'key': None, 'snapshot': None}
+
+
+def snapshot_directory():
+    return Path(settings.WEATHER_SNAPSHOT['directory'])
+
+
+class WeatherSnapshot:
+    """One published snapshot version, mapped read-only"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / META) as f:
+            meta = json.load(f)
+        self.version = meta['version']
+        self.created = meta['created']
+        self.fields = meta['fields']
+        self.locations = {
+            int(location_id): (span['offset'], date.fromisoformat(span['start']), span['days'])
+            for location_id, span in meta['locations'].items()
+        }
+        self.columns = {
+            field: np.load(self.path / f'{field}.npy', mmap_mode='r') for field in self.fields
+        }
+
+    @classmethod
+    def current(cls):
+        """The latest published snapshot, or None if there is none or it is disabled"""
+        if not settings.WEATHER_SNAPSHOT['enabled']:
+            return None
+        pointer = snapshot_directory() / POINTER
+        try:
+            stat = pointer.stat()
+        except FileNotFoundError:
+            # Nothing published yet
+            return None
+        try:
+            key = (stat.st_mtime_ns, stat.st_ino)
+            if key != _current['key']:
+                version = pointer.read_text().strip()
+                _current['snapshot'] = cls(snapshot_directory() / version)
+                _current['key'] = key
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Weather snapshot unavailable: {e}")
+            return None
+        return _current['snapshot']
+
+    def stale_locations(self):
+        """Ids of locations synced since this version was exported"""
+        # Listed on every read, as marks come from other processes
+        try:
+            return {int(name) for name in os.listdir(self.path / STALE)}
+        except FileNotFoundError:
+            return set()
+
+    def _stored(self, location):
+        location_id = getattr(location, 'pk', location)
+        if location_id in self.stale_locations():
+            return None
+        return self.locations.get(location_id)
+
+    def span(self, location):
+        """(first date, last date) stored for a location, or None"""
+        stored = self._stored(location)
+        if stored is None:
+            return None
+        _, start, days = stored
+        return start, start + timedelta(days=days - 1)
+
+    def series(self, location, start_date=None, end_date=None, fields=None):
+        """Read-only daily views for a location as (dates, {field: ndarray})
+
+        The range is clipped to the stored span; returns None if the
+        location is not in the snapshot or is stale. Days without data are NaN.
+        """
+        stored = self._stored(location)
+        if stored is None:
+            return None
+        offset, start, days = stored
+        first = 0 if start_date is None else max((start_date - start).days, 0)
+        last = days if end_date is None else min((end_date - start).days + 1, days)
+        last = max(last, first)
+
+        dates = [start + timedelta(days=i) for i in range(first, last)]
+        arrays = {
+            field: self.columns[field][offset + first:offset + last]
+            for field in (fields or self.fields)
+        }
+        return dates, arrays
+
+
+def export_snapshot(directory=None):
+    """Write the full WeatherData history as a new snapshot version and publish it
+
+    Returns the published WeatherSnapshot, or None if there is no data.
+    """
+    directory = Path(directory or snapshot_directory())
+    directory.mkdir(parents=True, exist_ok=True)
+    started = time.monotonic()
+
+    spans = WeatherData.objects.values('location_id').annotate(first=Min('date'), last=Max('date'))
+    layout = {}
+    bases = {}  # position of a day is bases[location_id] + day.toordinal()
+    total = 0
+    for span in spans.order_by('location_id'):
+        days = (span['last'] - span['first']).days + 1
+        layout[span['location_id']] = {'offset': total, 'start': span['first'].isoformat(), 'days': days}
+        bases[span['location_id']] = total - span['first'].toordinal()
+        total += days
+    if not total:
+        logger.info("No weather data to export to a snapshot")
+        return None
+
+    version = f'v{time.time_ns()}'
+    staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=directory))
+    try:
+        columns = {
+            field: np.lib.format.open_memmap(staging / f'{field}.npy', mode='w+', dtype=float, shape=(total,))
+            for field in SNAPSHOT_FIELDS
+        }
+        for column in columns.values():
+            column[:] = np.nan
+
+        # Stream rows into the mapped columns so memory stays bounded
+        rows = WeatherData.objects.order_by().values_list('location_id', 'date', *SNAPSHOT_FIELDS)
+        for chunk in _chunks(rows.iterator(chunk_size=EXPORT_CHUNK_ROWS), EXPORT_CHUNK_ROWS):
+            values = list(zip(*chunk))
+            positions = np.array([
+                bases[location_id] + day.toordinal() for location_id, day in zip(values[0], values[1])
+            ], dtype=np.intp)
+            for i, field in enumerate(SNAPSHOT_FIELDS):
+                columns[field][positions] = np.array(values[i + 2], dtype=float)
+
+        for column in columns.values():
+            column.flush()
+        del columns
+
+        with open(staging / META, 'w') as f:
+            json.dump({
+                'version': version,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'fields': SNAPSHOT_FIELDS,
+                'rows': total,
+                'locations': {str(location_id): span for location_id, span in layout.items()},
+            }, f)
+        os.rename(staging, directory / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _publish(directory, version)
+    _prune(directory, version)
+    logger.info(f"Exported weather snapshot {version}: {total} days for {len(layout)} locations "
+                f"in {time.monotonic() - started:.1f}s")
+    return WeatherSnapshot(directory / version)
+
+
+def refresh_snapshot():
+    """Export a new snapshot after an ingest, if snapshots are enabled"""
+    if not settings.WEATHER_SNAPSHOT['enabled']:
+        return None
+    try:
+        return export_snapshot()
+    except Exception as e:
+        # Readers fall back to the database, so a failed export is not fatal
+        logger.error(f"Error exporting weather snapshot: {e}")
+        return None
+
+
+def mark_stale(location):
+    """Have readers use the database for one location until the next export
+
+    For ad-hoc syncs, where re-exporting every location's history to pick
+    up one location's new days would cost more than the sync itself. The
+    mark lives in the current version, so a new export starts without it.
+    """
+    snapshot = WeatherSnapshot.current()
+    if snapshot is None:
+        return
+    stale = snapshot.path / STALE
+    stale.mkdir(exist_ok=True)
+    (stale / str(getattr(location, 'pk', location))).touch()
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _publish(directory, version):
+    fd, temporary = tempfile.mkstemp(prefix='.pointer-', dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, directory / POINTER)
+
+
+def _prune(directory, current):
+    versions = sorted(
+        (path for path in directory.iterdir() if path.is_dir() and path.name.startswith('v')),
+        key=lambda path: int(path.name[1:]),
+    )
+    # Processes that still map a removed version keep their open pages
+    for path in versions[:-settings.WEATHER_SNAPSHOT['keep']]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,220 @@
+"""
+Incremental decoder for NASA POWER point responses.
+
+`response.json()` turns a multi-decade daily pull into a nested dict of
+date-string keys and boxed floats before anything is stored. This decoder
+reads the body chunk by chunk and writes each value straight into a
+preallocated `array('d')` per parameter, indexed by day offset from the
+requested start date, so memory stays close to 8 bytes per value plus one
+chunk of text. Small sections (geometry, header) are decoded normally.
+Hourly responses ("YYYYMMDDHH" keys) use the same path with 24 slots a day.
+"""
+import codecs
+import json
+import math
+import re
+from array import array
+from datetime import date, timedelta
+
+import numpy as np
+
+
+# Longest "YYYYMMDD": value pair; a shorter remainder may just be cut off
+LOOKAHEAD = 64
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DAY_VALUE = re.compile(
+    r'[ \t\n\r]*"(\d{6})(\d{2})(\d{2})?"[ \t\n\r]*:[ \t\n\r]*'
+    r'(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)[ \t\n\r]*([,}])'
+)
+
+
+class _Reader:
+    """Sliding text buffer over an iterable of byte or text chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            chunk = self._decoder.decode(b'', final=True)
+        elif isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def ensure(self, count):
+        while len(self.text) - self.pos < count and self.fill():
+            pass
+
+    def peek(self):
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.fill():
+                break
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in NASA POWER response at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value with the standard decoder"""
+        self.peek()
+        decoder = json.JSONDecoder()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number may continue into the next chunk
+            if end == len(self.text) and not self.eof and isinstance(value, (int, float)):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def members(self):
+        """Yield the keys of the object at the cursor, leaving it on each value"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Malformed object in NASA POWER response at offset {self.pos}")
+
+
+class PowerStreamDecoder:
+    """Decode a POWER point response into per-parameter float arrays
+
+    Arrays cover start_date..end_date and hold NaN for days the response
+    does not contain; `decode` trims them to the days actually present.
+    With steps_per_day=24 each day has one slot per hour.
+    """
+
+    def __init__(self, start_date, end_date, parameters, steps_per_day=1):
+        self.start = start_date
+        self.steps = steps_per_day
+        self.days = (end_date - start_date).days + 1
+        self.slots = self.days * steps_per_day
+        self.parameters = list(parameters)
+        self.arrays = {name: array('d', [math.nan]) * self.slots for name in self.parameters}
+        self.first = self.slots
+        self.last = -1
+        self.fill_value = None
+        self.elevation = None
+        self._start_ordinal = start_date.toordinal()
+        self._month_offsets = {}  # 'YYYYMM' -> offset of the month's first day
+
+    def _offset(self, year_month, day, hour=None):
+        base = self._month_offsets.get(year_month)
+        if base is None:
+            first = date(int(year_month[:4]), int(year_month[4:]), 1)
+            base = self._month_offsets[year_month] = first.toordinal() - self._start_ordinal
+        offset = base + int(day) - 1
+        return offset * self.steps + int(hour) if hour else offset * self.steps
+
+    def _read_series(self, reader, target):
+        reader.expect('{')
+        if reader.peek() == '}':
+            reader.pos += 1
+            return
+
+        offsets = self._month_offsets
+        steps = self.steps
+        slots = self.slots
+        first, last = self.first, self.last
+        closing = None
+        while closing != '}':
+            # Consume as many consecutive pairs as the buffer holds; a pair
+            # only matches once its terminating ',' or '}' has arrived
+            match = None
+            for match in iter(DAY_VALUE.scanner(reader.text, reader.pos).match, None):
+                year_month, day, hour, value, closing = match.groups()
+                base = offsets.get(year_month)
+                if base is None or hour:
+                    offset = self._offset(year_month, day, hour)
+                else:
+                    offset = (base + int(day) - 1) * steps
+                if target is not None and 0 <= offset < slots:
+                    target[offset] = float(value)
+                    if offset < first:
+                        first = offset
+                    if offset > last:
+                        last = offset
+                if closing == '}':
+                    break
+            if match is not None:
+                reader.pos = match.end()
+                continue
+
+            if len(reader.text) - reader.pos < LOOKAHEAD and reader.fill():
+                continue
+
+            # Unusual entry (e.g. null); fall back to the generic decoder
+            key = reader.value()
+            reader.expect(':')
+            value = reader.value()
+            offset = self._offset(key[:6], key[6:8], key[8:10])
+            closing = reader.peek()
+            reader.pos += 1
+            if target is not None and 0 <= offset < slots:
+                target[offset] = math.nan if value is None else float(value)
+                first, last = min(first, offset), max(last, offset)
+        self.first, self.last = first, last
+
+    def _read_parameters(self, reader):
+        for name in reader.members():
+            self._read_series(reader, self.arrays.get(name))
+
+    def _read_properties(self, reader):
+        for key in reader.members():
+            if key == 'parameter':
+                self._read_parameters(reader)
+            else:
+                reader.value()
+
+    def decode(self, chunks):
+        """Consume the body and return (dates, {parameter: ndarray}) trimmed to the data present"""
+        reader = _Reader(chunks)
+        for key in reader.members():
+            if key == 'properties':
+                self._read_properties(reader)
+            elif key == 'geometry':
+                coordinates = (reader.value() or {}).get('coordinates') or []
+                if len(coordinates) >= 3:
+                    self.elevation = coordinates[2]
+            elif key == 'header':
+                self.fill_value = (reader.value() or {}).get('fill_value')
+            else:
+                reader.value()
+
+        if self.last < 0:
+            return [], {}
+        first_day, last_day = self.first // self.steps, self.last // self.steps
+        dates = [self.start + timedelta(days=i) for i in range(first_day, last_day + 1)]
+        arrays = {
+            name: np.frombuffer(values, dtype=float)[first_day * self.steps:(last_day + 1) * self.steps]
+            for name, values in self.arrays.items()
+        }
+        return dates, arrays
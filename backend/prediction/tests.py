@@ -1,3 +1,754 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .alerts import evaluate_alerts
+from .backfill import ForecastBackfill, _update_fields
+from .climatology import ClimatologyService
+from .downsampling import downsample, lttb, minmax_envelope
+from .events import (
+    Broadcaster, DatabaseWatcher, _event_id, alert_position, format_event_id, parse_event_id, stored_alert_events,
+)
+from .evapotranspiration import compute_batch, extraterrestrial_radiation, penman_monteith, saturation_vapour_pressure
+from .hourly import HOURLY_FIELDS, MIN_VALID_HOURS, HourlyWeatherService, daily_from_hourly
+from .ingestion import WeatherIngestionEngine
+from .models import (
+    Alert, ClimatologyNormal, DirtyMonth, Location, WeatherData, WeatherPrediction, WeatherSeriesYear, YearlyForecast,
+)
+from .quality import DEFAULT_FILL_VALUE, describe_flags, run_quality_checks
+from .regional import NASAPowerRegionalService
+from .serializers import AlertSerializer
+from .series import WeatherSeriesStore, refresh_series
+from .services import (
+    PARAMETER_FIELDS, NASAPowerService, WeatherPredictionService, recompute_dirty_months, write_weather_rows,
+)
+from .snapshot import WeatherSnapshot, export_snapshot
+from .streaming import PowerStreamDecoder
+from .trends import location_trends, mann_kendall, ols_slopes, sens_slopes
+
+
+def make_location(name='Lodwar', **fields):
+    return Location.objects.create(name=name, latitude=3.12, longitude=35.6, **fields)
+
+
+def weather_arrays(start, days, seed=0):
+    """Plausible daily POWER values as (dates, {field: ndarray})"""
+    rng = np.random.default_rng(seed)
+    day_of_year = np.array([(start + timedelta(days=i)).timetuple().tm_yday for i in range(days)])
+    season = np.sin(2 * np.pi * day_of_year / 365)
+    temperature = 29 + 2 * season + rng.normal(0, 0.8, days)
+    arrays = {
+        'precipitation': rng.gamma(0.4, 6, days) * (season > 0),
+        'temperature': temperature,
+        'temperature_max': temperature + 6,
+        'temperature_min': temperature - 6,
+        'relative_humidity': 45 + 10 * season + rng.normal(0, 3, days),
+        'wind_speed': rng.uniform(2, 5, days),
+        'solar_radiation': rng.uniform(18, 25, days),
+    }
+    assert set(arrays) == set(PARAMETER_FIELDS.values())
+    return [start + timedelta(days=i) for i in range(days)], arrays
+
+
+def weather_rows(location, start, days, seed=0):
+    """Unsaved, quality-checked WeatherData rows with derived columns"""
+    return NASAPowerService(location).rows_from_arrays(*weather_arrays(start, days, seed))
+
+
+def store_weather(location, start, days, seed=0):
+    rows = weather_rows(location, start, days, seed)
+    WeatherData.objects.bulk_create(rows)
+    return rows
+
+
+def power_parameters(dates, arrays):
+    """The 'parameter' section of a POWER response for per-field arrays"""
+    return {
+        parameter: {
+            day.strftime('%Y%m%d'): DEFAULT_FILL_VALUE if np.isnan(value) else round(float(value), 2)
+            for day, value in zip(dates, arrays[field])
+        }
+        for parameter, field in PARAMETER_FIELDS.items()
+    }
+
+
+class SnapshotTestCase(TestCase):
+    """Points WEATHER_SNAPSHOT at a temporary directory"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(WEATHER_SNAPSHOT={'enabled': True, 'directory': directory, 'keep': 2})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class WeatherSeriesStoreTests(TestCase):
+    def test_round_trip_across_a_year_boundary(self):
+        store = WeatherSeriesStore(make_location())
+        dates = [date(2023, 12, 30) + timedelta(days=i) for i in range(5)]
+        precipitation = np.array([1.5, np.nan, 0.0, 12.25, 3.0])
+        self.assertEqual(store.write(dates, {'precipitation': precipitation}), 2)
+
+        read_dates, arrays = store.read(date(2023, 12, 29), date(2024, 1, 4), fields=['precipitation'])
+        self.assertEqual(read_dates[0], date(2023, 12, 29))
+        np.testing.assert_array_equal(arrays['precipitation'], [np.nan, 1.5, np.nan, 0.0, 12.25, 3.0, np.nan])
+
+    def test_unchanged_years_are_not_rewritten(self):
+        store = WeatherSeriesStore(make_location())
+        dates = [date(2024, 3, 1), date(2024, 3, 2)]
+        store.write(dates, {'temperature': np.array([28.0, 29.5])})
+        self.assertEqual(store.write(dates, {'temperature': np.array([28.0, 29.5])}), 0)
+        self.assertEqual(store.write(dates[:1], {'temperature': np.array([27.0])}), 1)
+        self.assertEqual(WeatherSeriesYear.objects.get(parameter='temperature').valid_days, 2)
+
+    @override_settings(WEATHER_SERIES_STORAGE=True)
+    def test_analysis_reads_the_series_when_it_is_kept(self):
+        location = make_location()
+        store_weather(location, date(2021, 1, 1), 3 * 365)
+        months = [(2022, month) for month in range(1, 13)]
+        fields = ['monthly_precipitation', 'avg_temperature', 'monthly_pet', 'monthly_water_balance', 'confidence_score']
+
+        # Nothing mirrored yet, so both services read WeatherData
+        service = WeatherPredictionService(location)
+        from_database = [[getattr(p, field) for field in fields] for p in service.analyze_months(months)[0]]
+        climatology = ClimatologyService(location)
+        climatology.refresh()
+        normals_from_database = {key: values.copy() for key, values in climatology.normals().items()}
+        observed_from_database = climatology.month_vs_normal(2022, 4)['precipitation']['observed']
+
+        refresh_series({location: (date(2021, 1, 1), date(2023, 12, 31))})
+        WeatherData.objects.all().delete()
+        ClimatologyNormal.objects.all().delete()
+
+        from_series = [[getattr(p, field) for field in fields] for p in service.analyze_months(months)[0]]
+        np.testing.assert_allclose(from_series, from_database, rtol=1e-5)
+        self.assertGreater(climatology.refresh(), 0)
+        normals_from_series = climatology.normals()
+        self.assertEqual(set(normals_from_series), set(normals_from_database))
+        for key, values in normals_from_database.items():
+            np.testing.assert_allclose(normals_from_series[key], values, rtol=1e-4, atol=1e-4)
+        self.assertAlmostEqual(
+            climatology.month_vs_normal(2022, 4)['precipitation']['observed'], observed_from_database, places=2
+        )
+
+
+class SnapshotIngestTests(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.location = make_location()
+
+    def test_single_location_sync_does_not_export(self):
+        rows = weather_rows(self.location, date(2024, 1, 1), 31)
+        with mock.patch.object(NASAPowerService, 'fetch_rows', return_value=rows):
+            self.assertEqual(NASAPowerService(self.location).sync_range(date(2024, 1, 1), date(2024, 1, 31)), 31)
+        self.assertIsNone(WeatherSnapshot.current())
+
+    def test_api_sync_marks_only_its_location_stale(self):
+        other = make_location('Lokichoggio')
+        store_weather(self.location, date(2023, 1, 1), 365)
+        store_weather(other, date(2023, 1, 1), 365)
+        export_snapshot()
+        self.assertIsNotNone(WeatherSnapshot.current())
+
+        rows = weather_rows(self.location, date(2024, 1, 1), 31)
+        with mock.patch.object(NASAPowerService, 'fetch_rows', return_value=rows):
+            response = APIClient().post('/prediction/weather-data/sync/', {
+                'location': self.location.pk, 'start_date': '2024-01-01', 'end_date': '2024-01-31',
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        # The synced location is read from the database rather than the old export
+        snapshot = WeatherSnapshot.current()
+        self.assertIsNone(snapshot.series(self.location))
+        series = APIClient().get('/prediction/weather-data/series/', {'location': self.location.pk}).json()
+        self.assertEqual(series['data']['source'], 'database')
+        self.assertEqual(series['data']['dates'][-1], '2024-01-31')
+        series = APIClient().get('/prediction/weather-data/series/', {'location': other.pk}).json()
+        self.assertEqual(series['data']['source'], 'snapshot')
+
+        # A new export starts without the mark
+        self.assertIsNotNone(export_snapshot().series(self.location))
+
+
+class ClimatologySnapshotTests(SnapshotTestCase):
+    def test_snapshot_and_database_reads_agree(self):
+        location = make_location()
+        store_weather(location, date(2019, 1, 1), 5 * 365)
+        snapshot = export_snapshot()
+
+        ClimatologyService(location, snapshot=snapshot).refresh()
+        from_snapshot = {(n.parameter, n.period): bytes(n.values) for n in ClimatologyNormal.objects.all()}
+        ClimatologyNormal.objects.all().delete()
+        ClimatologyService(location).refresh()
+        from_database = {(n.parameter, n.period): bytes(n.values) for n in ClimatologyNormal.objects.all()}
+        self.assertEqual(from_snapshot, from_database)
+
+        self.assertEqual(
+            ClimatologyService(location, snapshot=snapshot).month_vs_normal(2022, 3),
+            ClimatologyService(location).month_vs_normal(2022, 3),
+        )
+
+
+class DirtyMonthTests(TestCase):
+    def setUp(self):
+        self.location = make_location()
+
+    def predictions(self):
+        return {
+            (p.year, p.month): (p.condition, round(p.monthly_precipitation, 6))
+            for p in WeatherPrediction.objects.filter(location=self.location)
+        }
+
+    def test_ingest_marks_and_recompute_clears(self):
+        write_weather_rows(weather_rows(self.location, date(2024, 1, 1), 90))
+        self.assertEqual(
+            set(DirtyMonth.objects.values_list('year', 'month')), {(2024, 1), (2024, 2), (2024, 3)}
+        )
+        self.assertEqual(recompute_dirty_months([self.location]), 3)
+        self.assertFalse(DirtyMonth.objects.exists())
+        batched = self.predictions()
+
+        # Same results as analyzing each month on its own
+        WeatherPrediction.objects.all().delete()
+        service = WeatherPredictionService(self.location)
+        for month in (1, 2, 3):
+            service.analyze_monthly_conditions(2024, month)
+        self.assertEqual(self.predictions(), batched)
+
+    def test_unchanged_rows_do_not_mark_months(self):
+        rows = weather_rows(self.location, date(2024, 1, 1), 31)
+        write_weather_rows(rows)
+        recompute_dirty_months()
+        write_weather_rows(weather_rows(self.location, date(2024, 1, 1), 31))
+        self.assertFalse(DirtyMonth.objects.exists())
+
+    def test_month_without_valid_data_loses_its_prediction(self):
+        write_weather_rows(weather_rows(self.location, date(2024, 1, 1), 60))
+        recompute_dirty_months()
+        WeatherData.objects.filter(date__month=2).update(precipitation=None)
+        DirtyMonth.objects.create(location=self.location, year=2024, month=2)
+        recompute_dirty_months()
+        self.assertEqual(set(self.predictions()), {(2024, 1)})
+
+    def test_marks_set_after_the_claim_stay_queued(self):
+        write_weather_rows(weather_rows(self.location, date(2024, 1, 1), 31))
+        claimed = timezone.now() - timedelta(seconds=1)
+        WeatherPredictionService(self.location).refresh_months(DirtyMonth.objects.all(), claimed)
+        self.assertTrue(WeatherPrediction.objects.filter(year=2024, month=1).exists())
+        self.assertTrue(DirtyMonth.objects.filter(year=2024, month=1).exists())
+
+
+class EvapotranspirationTests(TestCase):
+    """Checked against the worked examples of FAO Irrigation and Drainage Paper 56"""
+
+    def test_extraterrestrial_radiation(self):
+        # Example 8: 3 September at 20°S; Example 17: 6 July at Uccle (50°48'N)
+        ra = extraterrestrial_radiation(np.array([-20.0, 50.8]), np.array([246.0, 187.0]))
+        np.testing.assert_allclose(ra, [32.2, 41.09], atol=0.05)
+
+    def test_penman_monteith_uccle(self):
+        # Example 18: Tmax 21.5, Tmin 12.3, ea 1.409 kPa, u2 2.078 m/s, Rs 22.07 MJ, 100 m -> 3.9 mm/day
+        es = (saturation_vapour_pressure(21.5) + saturation_vapour_pressure(12.3)) / 2
+        pet = penman_monteith(
+            np.array([21.5]), np.array([12.3]), np.array([16.9]), np.array([1.409 / es * 100]),
+            np.array([2.078]), np.array([22.07]), np.array([41.09]), 100,
+        )
+        self.assertAlmostEqual(float(pet[0]), 3.9, delta=0.05)
+
+    def test_water_balance_falls_back_to_hargreaves(self):
+        dates = [date(2024, 7, 6), date(2024, 7, 7)]
+        arrays = {
+            'precipitation': np.array([5.0, 5.0]),
+            'temperature': np.array([16.9, 16.9]),
+            'temperature_max': np.array([21.5, 21.5]),
+            'temperature_min': np.array([12.3, 12.3]),
+            'relative_humidity': np.array([70.0, np.nan]),
+            'wind_speed': np.array([2.0, 2.0]),
+            'solar_radiation': np.array([22.0, 22.0]),
+        }
+        derived = compute_batch(dates, arrays, latitude=50.8, elevation=100)
+        self.assertTrue(np.isnan(derived['pet_penman_monteith'][1]))
+        np.testing.assert_allclose(
+            derived['water_balance'],
+            5.0 - np.array([derived['pet_penman_monteith'][0], derived['pet_hargreaves'][1]]),
+        )
+
+
+class QualityControlTests(TestCase):
+    def check(self, days=20, **overrides):
+        dates, arrays = weather_arrays(date(2024, 3, 1), days)
+        for field, changes in overrides.items():
+            for i, value in changes.items():
+                arrays[field][i] = value
+        return run_quality_checks(dates, arrays)
+
+    def test_fill_values_are_missing_and_short_gaps_interpolated(self):
+        dates, arrays, flags = self.check(
+            temperature={5: DEFAULT_FILL_VALUE, 6: DEFAULT_FILL_VALUE},
+            precipitation={3: DEFAULT_FILL_VALUE},
+        )
+        self.assertEqual(describe_flags(int(flags[5])), {'temperature': ['missing', 'interpolated']})
+        temperature = arrays['temperature']
+        self.assertAlmostEqual(temperature[5], temperature[4] + (temperature[7] - temperature[4]) / 3)
+        # Rainfall gaps are never filled in
+        self.assertTrue(np.isnan(arrays['precipitation'][3]))
+        self.assertEqual(describe_flags(int(flags[3])), {'precipitation': ['missing']})
+
+    def test_long_gaps_stay_missing(self):
+        _, arrays, flags = self.check(wind_speed={i: np.nan for i in range(5, 10)})
+        self.assertTrue(np.isnan(arrays['wind_speed'][5:10]).all())
+        self.assertEqual(describe_flags(int(flags[7])), {'wind_speed': ['missing']})
+
+    def test_out_of_range_values_are_rejected(self):
+        _, arrays, flags = self.check(relative_humidity={8: 130.0}, precipitation={9: -4.0})
+        self.assertIn('outlier', describe_flags(int(flags[8]))['relative_humidity'])
+        self.assertTrue(np.isnan(arrays['precipitation'][9]))
+        self.assertEqual(describe_flags(int(flags[9])), {'precipitation': ['outlier']})
+
+    def test_far_but_plausible_values_are_kept_as_suspect(self):
+        _, arrays, flags = self.check(temperature={10: 49.0})
+        self.assertEqual(arrays['temperature'][10], 49.0)
+        self.assertEqual(describe_flags(int(flags[10])), {'temperature': ['suspect']})
+
+    def test_absent_days_are_added_as_missing(self):
+        dates, arrays = weather_arrays(date(2024, 3, 1), 10)
+        del dates[4]
+        arrays = {field: np.delete(values, 4) for field, values in arrays.items()}
+        dates, arrays, flags = run_quality_checks(dates, arrays)
+        self.assertEqual(len(dates), 10)
+        self.assertIn('missing', describe_flags(int(flags[4]))['precipitation'])
+
+
+class IngestionTests(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.locations = [make_location(f'Point {i}') for i in range(3)]
+
+    def fetch(self, failing=()):
+        def fetch_rows(service, start_date, end_date):
+            if service.location.name in failing:
+                return None
+            days = (end_date - start_date).days + 1
+            return weather_rows(service.location, start_date, days, seed=service.location.pk)
+        return mock.patch.object(NASAPowerService, 'fetch_rows', autospec=True, side_effect=fetch_rows)
+
+    def test_upserts_are_idempotent(self):
+        engine = WeatherIngestionEngine(workers=2, write_batch_rows=40)
+        with self.fetch():
+            first = engine.run(self.locations, date(2024, 1, 1), date(2024, 1, 31))
+            second = engine.run(self.locations, date(2024, 1, 1), date(2024, 1, 31))
+        # Two locations' rows fill one batch; the third is flushed at the end
+        self.assertEqual((first.rows, first.created, first.writes), (93, 93, 2))
+        self.assertEqual((second.created, second.recomputed), (0, 0))
+        self.assertEqual(WeatherData.objects.count(), 93)
+        self.assertEqual(WeatherPrediction.objects.count(), 3)
+        self.assertIsNotNone(WeatherSnapshot.current())
+
+    def test_failed_locations_are_reported(self):
+        with self.fetch(failing={'Point 1'}):
+            report = WeatherIngestionEngine(workers=2).run(self.locations, date(2024, 1, 1), date(2024, 1, 10))
+        self.assertEqual(report.synced, 2)
+        self.assertEqual([failure['name'] for failure in report.failed], ['Point 1'])
+
+    def test_synced_locations_only_refetch_recent_days(self):
+        engine = WeatherIngestionEngine(refetch_days=5)
+        location = self.locations[0]
+        location.last_synced_date = date(2024, 6, 30)
+        self.assertEqual(engine.date_range(location, date(2024, 7, 10)), (date(2024, 6, 25), date(2024, 7, 10)))
+
+
+class RegionalGridTests(TestCase):
+    def payload(self, parameters, cells, dates):
+        features = []
+        for lat, lon, seed in cells:
+            _, arrays = weather_arrays(dates[0], len(dates), seed)
+            section = power_parameters(dates, arrays)
+            features.append({
+                'geometry': {'coordinates': [lon, lat, 500 + seed]},
+                'properties': {'parameter': {parameter: section[parameter] for parameter in parameters}},
+            })
+        return {'header': {'fill_value': DEFAULT_FILL_VALUE}, 'features': features}
+
+    def test_locations_take_their_nearest_cell(self):
+        dates = [date(2024, 1, 1) + timedelta(days=i) for i in range(10)]
+        cells = [(3.0, 35.5, 1), (3.5, 35.5, 2), (3.0, 36.0, 3)]
+        service = NASAPowerRegionalService()
+        groups = [list(PARAMETER_FIELDS)[:4], list(PARAMETER_FIELDS)[4:]]
+        grid = service.decode((group, self.payload(group, cells, dates)) for group in groups)
+        self.assertEqual(grid.cell_count, 3)
+
+        arrays, elevation = grid.arrays_for(3.45, 35.55, max_distance_km=50)
+        _, expected = weather_arrays(dates[0], len(dates), 2)
+        np.testing.assert_allclose(arrays['precipitation'], np.round(expected['precipitation'], 2))
+        self.assertEqual(elevation, 502)
+        self.assertIsNone(grid.arrays_for(5.0, 38.0, max_distance_km=50))
+
+
+class PowerStreamDecoderTests(TestCase):
+    def test_matches_the_json_decoder_for_any_chunking(self):
+        dates, arrays = weather_arrays(date(2024, 1, 30), 40)
+        parameters = power_parameters(dates, arrays)
+        parameters['T2M']['20240205'] = None
+        body = json.dumps({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [35.6, 3.12, 506.0]},
+            'properties': {'parameter': parameters},
+            'header': {'fill_value': DEFAULT_FILL_VALUE},
+        }).encode()
+        expected = {field: np.round(values, 2) for field, values in arrays.items()}
+        expected['temperature'][6] = np.nan
+
+        for chunk_size in (1, 7, 64, len(body)):
+            with self.subTest(chunk_size=chunk_size):
+                decoder = PowerStreamDecoder(date(2024, 1, 25), date(2024, 3, 31), list(PARAMETER_FIELDS))
+                chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+                decoded_dates, decoded = decoder.decode(chunks)
+                self.assertEqual(decoded_dates, dates)
+                for parameter, field in PARAMETER_FIELDS.items():
+                    np.testing.assert_array_equal(decoded[parameter], expected[field])
+                self.assertEqual((decoder.fill_value, decoder.elevation), (DEFAULT_FILL_VALUE, 506.0))
+
+
+class HourlyRollupTests(TestCase):
+    def matrix(self, days=2):
+        hours = np.arange(24)
+        day = np.stack([
+            np.where(hours == 15, 12.0, 0.0),  # one 12 mm burst at 15:00
+            24 + 6 * np.sin((hours - 9) / 24 * 2 * np.pi),
+            np.full(24, 50.0),
+            np.full(24, 3.0),
+            np.clip(np.sin((hours - 6) / 12 * np.pi), 0, None) * 800,
+        ])
+        return np.repeat(day[None], days, axis=0)
+
+    def test_daily_values_from_hourly(self):
+        matrix = self.matrix()
+        daily = daily_from_hourly(matrix)
+        self.assertEqual(daily['precipitation'][0], 12.0)
+        self.assertEqual(daily['max_intensity'][0], 12.0)
+        self.assertAlmostEqual(daily['temperature'][0], 24.0)
+        self.assertAlmostEqual(daily['temperature_max'][0], 30.0)
+        # Wh/m² per hour summed into MJ/m² per day
+        radiation = matrix[0, HOURLY_FIELDS.index('solar_radiation')]
+        self.assertAlmostEqual(daily['solar_radiation'][0], radiation.sum() * 0.0036)
+
+    def test_days_with_too_few_hours_are_missing(self):
+        matrix = self.matrix()
+        matrix[1, HOURLY_FIELDS.index('precipitation'), MIN_VALID_HOURS - 24:] = np.nan
+        matrix[1, HOURLY_FIELDS.index('precipitation'), 0] = np.nan
+        self.assertTrue(np.isnan(daily_from_hourly(matrix)['precipitation'][1]))
+
+    def test_rollup_keeps_daily_values_and_adds_intensity(self):
+        location = make_location()
+        stored = store_weather(location, date(2024, 4, 1), 2)
+        service = HourlyWeatherService(location)
+        service.store([date(2024, 4, 1), date(2024, 4, 2), date(2024, 4, 3)], self.matrix(3))
+        self.assertEqual(service.rollup(date(2024, 4, 1), date(2024, 4, 3)), 3)
+
+        rows = {row.date: row for row in WeatherData.objects.filter(location=location)}
+        self.assertEqual(rows[date(2024, 4, 1)].precipitation, stored[0].precipitation)
+        self.assertEqual(rows[date(2024, 4, 1)].max_hourly_precipitation, 12.0)
+        # A day only the hourly endpoint covered gets its daily values from the rollup
+        self.assertEqual(rows[date(2024, 4, 3)].precipitation, 12.0)
+
+    def test_rollup_checks_alerts_on_days_it_creates(self):
+        location = make_location()
+        start = timezone.now().date() - timedelta(days=5)
+        matrix = self.matrix(3)
+        matrix[:, HOURLY_FIELDS.index('precipitation'), 15] = 20.0
+        service = HourlyWeatherService(location)
+        service.store([start + timedelta(days=i) for i in range(3)], matrix)
+        service.rollup(start, start + timedelta(days=2))
+
+        # 60 mm over three days, known only from the hourly endpoint
+        self.assertTrue(Alert.objects.filter(location=location, rule='heavy_rain_3day').exists())
+
+
+class BackfillTests(TestCase):
+    def stored(self, model, *keys):
+        return {
+            values[:len(keys)]: [round(v, 6) if isinstance(v, float) else v for v in values[len(keys):]]
+            for values in model.objects.values_list(*keys, *_update_fields(model))
+        }
+
+    def test_matches_analyzing_month_by_month(self):
+        location = make_location()
+        store_weather(location, date(2023, 1, 1), 365)
+        WeatherData.objects.filter(date__month=7).update(precipitation=None)
+
+        summary = ForecastBackfill().run([location], [2023])
+        self.assertEqual((summary['predictions'], summary['forecasts']), (11, 1))
+        backfilled = self.stored(WeatherPrediction, 'year', 'month'), self.stored(YearlyForecast, 'year')
+
+        WeatherPrediction.objects.all().delete()
+        YearlyForecast.objects.all().delete()
+        service = WeatherPredictionService(location)
+        for month in range(1, 13):
+            service.analyze_monthly_conditions(2023, month)
+        service.build_yearly_forecast(2023)
+        self.assertEqual(
+            (self.stored(WeatherPrediction, 'year', 'month'), self.stored(YearlyForecast, 'year')), backfilled
+        )
+
+
+class BatchAnalysisTests(TestCase):
+    def setUp(self):
+        self.location = make_location()
+        store_weather(self.location, date(2024, 1, 1), 60)
+        WeatherData.objects.filter(date__month=2).update(precipitation=None)
+
+    def test_each_month_reports_its_own_error(self):
+        response = APIClient().post('/prediction/predictions/analyze_months/', {
+            'location': self.location.pk, 'start_date': '2024-01-01', 'end_date': '2024-03-31',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([(p['year'], p['month']) for p in body['data']], [(2024, 1)])
+        self.assertEqual(body['errors'], [
+            {'year': 2024, 'month': 2, 'message': 'No valid weather data available for this month'},
+            {'year': 2024, 'month': 3, 'message': 'No weather data available for this month'},
+        ])
+
+    def test_no_analyzable_month_is_not_found(self):
+        response = APIClient().post('/prediction/predictions/analyze_months/', {
+            'location': self.location.pk, 'months': [{'year': 2024, 'month': 2}, {'year': 2024, 'month': 3}],
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(response.json()['errors']), 2)
+        self.assertFalse(WeatherPrediction.objects.exists())
+
+    def test_matches_single_month_analysis(self):
+        batched, _ = WeatherPredictionService(self.location).analyze_months([(2024, 1)])
+        single = WeatherPredictionService(self.location).analyze_monthly_conditions(2024, 1)
+        self.assertEqual((batched[0].condition, batched[0].description), (single.condition, single.description))
+        self.assertAlmostEqual(batched[0].monthly_precipitation, single.monthly_precipitation)
+
+
+class TrendStatisticsTests(TestCase):
+    def test_mann_kendall_without_ties(self):
+        s, z, p = mann_kendall(np.array([[1.0, 2.0, 3.0, 4.0, 5.0], [5.0, 4.0, 3.0, 2.0, 1.0]]))
+        # S = 10, Var(S) = 5 * 4 * 15 / 18, Z = (S - 1) / sqrt(Var)
+        np.testing.assert_array_equal(s, [10, -10])
+        np.testing.assert_allclose(z, [2.2045, -2.2045], atol=1e-4)
+        np.testing.assert_allclose(p, [0.0275, 0.0275], atol=1e-4)
+
+    def test_mann_kendall_corrects_for_ties(self):
+        s, z, p = mann_kendall(np.array([[1.0, 1.0, 2.0, 3.0], [2.0, 2.0, 2.0, 2.0]]))
+        # One pair of ties: Var(S) = (4 * 3 * 13 - 2 * 1 * 9) / 18
+        np.testing.assert_array_equal(s, [5, 0])
+        np.testing.assert_allclose(z, [1.4446, 0.0], atol=1e-4)
+        np.testing.assert_allclose(p, [0.1486, 1.0], atol=1e-4)
+
+    def test_sens_and_ols_slopes(self):
+        x = np.array([0.0, 1.0, 2.0, 3.0])
+        values = np.array([[2.0, 4.0, 3.0, 8.0]])
+        # Pairwise slopes -1, 0.5, 2, 2, 2, 5
+        self.assertEqual(sens_slopes(x, values)[0], 2.0)
+        self.assertAlmostEqual(ols_slopes(x, values)[0], 1.7)
+
+    def test_cached_trends_follow_database_writes(self):
+        location = make_location()
+        for year in range(2018, 2024):
+            WeatherPrediction.objects.create(
+                location=location, year=year, month=1, date=date(year, 1, 1), condition='normal',
+                severity='low', monthly_precipitation=10.0 * (year - 2017), avg_temperature=28.0,
+                avg_humidity=40.0, confidence_score=100, description='',
+            )
+        self.assertEqual(location_trends(location)['precipitation_trend'], 'increasing')
+
+        # A plain queryset write, as another process would do it, still moves the version
+        WeatherPrediction.objects.filter(location=location).update(
+            monthly_precipitation=F('monthly_precipitation') * -1 + 100, updated_at=timezone.now()
+        )
+        self.assertEqual(location_trends(location)['precipitation_trend'], 'decreasing')
+        WeatherPrediction.objects.filter(year__gt=2019).delete()
+        self.assertEqual(location_trends(location)['years_analyzed'], 2)
+
+
+class ClimatologyRefreshTests(TestCase):
+    def normals(self):
+        return {(n.parameter, n.period): bytes(n.values) for n in ClimatologyNormal.objects.all()}
+
+    def test_incremental_refresh_matches_a_full_rebuild(self):
+        location = make_location()
+        store_weather(location, date(2019, 1, 1), 5 * 365)
+        service = ClimatologyService(location)
+        service.refresh()
+        before = service.month_vs_normal(2022, 3)['precipitation']
+
+        WeatherData.objects.filter(date__month=3).update(precipitation=F('precipitation') + 5)
+        self.assertGreater(service.refresh([3]), 0)
+        incremental = self.normals()
+        # Readers reload without any cache involved
+        self.assertNotEqual(service.month_vs_normal(2022, 3)['precipitation']['mean'], before['mean'])
+
+        ClimatologyNormal.objects.all().delete()
+        service.refresh()
+        self.assertEqual(self.normals(), incremental)
+
+
+def reference_lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets as published by Steinarsson, one point at a time"""
+    n = len(points)
+    every = (n - 2) / (threshold - 2)
+    kept, a = [0], 0
+    for i in range(threshold - 2):
+        avg_start, avg_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x for x, _ in points[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y for _, y in points[avg_start:avg_end]) / (avg_end - avg_start)
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((points[a][0] - avg_x) * (points[j][1] - points[a][1])
+                       - (points[a][0] - points[j][0]) * (avg_y - points[a][1])) * 0.5
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    return kept + [n - 1]
+
+
+class DownsamplingTests(TestCase):
+    def test_lttb_matches_the_reference(self):
+        rng = np.random.default_rng(7)
+        for n, threshold in [(10, 3), (100, 17), (1000, 50), (3653, 400), (367, 366)]:
+            with self.subTest(n=n, threshold=threshold):
+                x = np.arange(n, dtype=float)
+                y = np.cumsum(rng.normal(0, 1, n))
+                self.assertEqual(lttb(x, y, threshold).tolist(), reference_lttb(list(zip(x, y)), threshold))
+
+    def test_envelope_keeps_every_peak(self):
+        rng = np.random.default_rng(3)
+        rain = rng.gamma(0.3, 5, 3650)
+        rain[[17, 1200, 3649]] = [180.0, 150.0, 120.0]
+        kept = minmax_envelope(rain, 200)
+        self.assertLessEqual(len(kept), 200)
+        self.assertTrue({17, 1200, 3649} <= set(kept.tolist()))
+        self.assertEqual(kept.tolist(), sorted(set(kept.tolist())))
+
+    def test_missing_days_are_dropped(self):
+        values = np.arange(1000, dtype=float)
+        values[::7] = np.nan
+        for envelope in (False, True):
+            with self.subTest(envelope=envelope):
+                kept = downsample(values, 100, envelope=envelope)
+                self.assertLessEqual(len(kept), 100)
+                self.assertFalse(np.isnan(values[kept]).any())
+                self.assertEqual((kept[0], kept[-1]), (1, 999))
+
+
+class AlertEpisodeTests(TestCase):
+    def setUp(self):
+        self.location = make_location()
+        self.today = timezone.now().date()
+
+    def batch(self, rainfall):
+        """Unsaved rows for {days ago: mm}"""
+        return [
+            WeatherData(location=self.location, date=self.today - timedelta(days=ago), precipitation=mm)
+            for ago, mm in rainfall.items()
+        ]
+
+    def episodes(self, rule):
+        return list(Alert.objects.filter(rule=rule).order_by('start_date').values_list(
+            'start_date', 'end_date', 'value'
+        ))
+
+    def test_an_episode_spanning_batches_extends_one_alert(self):
+        evaluate_alerts(self.batch({10: 0.0, 9: 0.0, 8: 0.0, 7: 30.0, 6: 30.0}))
+        six_days_ago = self.today - timedelta(days=6)
+        self.assertEqual(self.episodes('heavy_rain_3day'), [(six_days_ago, six_days_ago, 60.0)])
+
+        evaluate_alerts(self.batch({5: 30.0, 4: 0.0, 3: 0.0}))
+        self.assertEqual(self.episodes('heavy_rain_3day'), [
+            (six_days_ago, self.today - timedelta(days=4), 90.0),
+        ])
+        self.assertEqual(len(self.episodes('heavy_rain_7day')), 1)
+
+        # Revised days update the window without raising again
+        self.assertEqual(evaluate_alerts(self.batch({5: 45.0})), 0)
+        self.assertEqual(Alert.objects.filter(rule='heavy_rain_3day').count(), 1)
+
+        evaluate_alerts(self.batch({2: 0.0, 1: 60.0}))
+        self.assertEqual([start for start, _, _ in self.episodes('heavy_rain_3day')],
+                         [six_days_ago, self.today - timedelta(days=1)])
+
+    def test_old_days_only_warm_up_state(self):
+        self.assertEqual(evaluate_alerts(self.batch({ago: 40.0 for ago in range(60, 50, -1)})), 0)
+        self.assertFalse(Alert.objects.exists())
+
+
+class EventResumeTests(TestCase):
+    def setUp(self):
+        self.location = make_location()
+        self.other = make_location('Kakuma')
+        self.before = (_event_id(timezone.now()), 0, 0)
+        self.alerts = [
+            Alert.objects.create(location=location, rule='heavy_rain_3day', severity='high',
+                                 start_date=date(2024, 4, 1), end_date=date(2024, 4, 2), value=60.0,
+                                 threshold=50.0, message='')
+            for location in (self.location, self.other)
+        ]
+
+    async def replayed(self, broadcaster, last_event_id, location_id=None):
+        client = await broadcaster.subscribe(last_event_id, location_id)
+        broadcaster.unsubscribe(client)
+        broadcaster.watcher.cancel()
+        items = []
+        while not client.queue.empty():
+            items.append(client.queue.get_nowait())
+        return items
+
+    async def test_alerts_written_while_nobody_listened_are_replayed(self):
+        # A fresh process: no backlog and no watcher running
+        items = await self.replayed(Broadcaster(10, 10, 60), self.before)
+        self.assertEqual([json.loads(data)['id'] for _, event, data, _ in items], [a.pk for a in self.alerts])
+        self.assertEqual({event for _, event, _, _ in items}, {'alert'})
+
+        # Resuming from the last id replays nothing more
+        self.assertEqual(await self.replayed(Broadcaster(10, 10, 60), items[-1][0]), [])
+
+    async def test_replay_honours_the_location_and_the_backlog(self):
+        broadcaster = Broadcaster(10, 10, 60)
+        broadcaster.publish('sync', {'location': self.location.pk}, self.location.pk)
+        broadcaster.publish('sync', {'location': self.other.pk}, self.other.pk)
+        items = await self.replayed(broadcaster, self.before, self.location.pk)
+        self.assertEqual([(event, location_id) for _, event, _, location_id in items],
+                         [('alert', self.location.pk), ('sync', self.location.pk)])
+
+    async def test_alerts_already_in_the_backlog_are_not_sent_twice(self):
+        broadcaster = Broadcaster(10, 10, 60)
+        alert = await sync_to_async(Alert.objects.select_related('location').get)(pk=self.alerts[0].pk)
+        broadcaster.publish('alert', AlertSerializer(alert).data, alert.location_id, alert_position(alert))
+        items = await self.replayed(broadcaster, self.before, self.location.pk)
+        self.assertEqual(len(items), 1)
+
+    def test_live_and_replayed_alerts_share_one_ordering(self):
+        # Both alerts written in the same microsecond
+        Alert.objects.update(updated_at=timezone.now())
+        watcher = DatabaseWatcher()
+        watcher.alert_position = self.before[:2]
+        live = [(*position, 0) for event, _, _, position in watcher.poll() if event == 'alert']
+        self.assertEqual(live, [item[0] for item in stored_alert_events(self.before)])
+        self.assertEqual([event_id[1] for event_id in live], [alert.pk for alert in self.alerts])
+
+        # Resuming from the first alert's id continues with the second rather than skipping the tie
+        self.assertEqual([item[0] for item in stored_alert_events(live[0])], live[1:])
+        watcher.alert_position = live[0][:2]
+        self.assertEqual([position for _, _, _, position in watcher.poll()], [live[1][:2]])
+
+    def test_event_ids_round_trip_through_the_header(self):
+        self.assertEqual(parse_event_id(format_event_id((1717171717000000, 12, 3))), (1717171717000000, 12, 3))
+        self.assertEqual(parse_event_id('1717171717000000'), (1717171717000000, 0, 0))
+        for value in ('', 'abc', '1-2-3-4', '-5'):
+            with self.assertRaises(ValueError):
+                parse_event_id(value)
@@ -0,0 +1,164 @@
+"""
+Multi-year trend statistics over monthly predictions.
+
+A location's monthly predictions for the requested years are loaded in one
+query and folded into yearly series (rainfall total, mean temperature,
+drought and flood month counts). Each series gets an ordinary least-squares
+slope, a Mann-Kendall test and Sen's slope, computed for all series at once
+on pairwise difference matrices. Results are cached per location under a
+data version read from the database (row counts and latest updated_at of
+its predictions and forecasts), so writes from any process, including
+backfills and cron syncs, move the version and cached results never go
+stale.
+"""
+import hashlib
+import math
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import WeatherPrediction, YearlyForecast
+
+DROUGHT_CONDITIONS = ('severe_drought', 'moderate_drought', 'mild_drought')
+FLOOD_CONDITIONS = ('extreme_flood', 'severe_flood', 'moderate_flood')
+
+TREND_SERIES = ['precipitation', 'temperature', 'drought_months', 'flood_months']
+
+# Two-sided Mann-Kendall significance level for calling a trend
+SIGNIFICANCE = 0.05
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def data_version(location_id):
+    """Fingerprint of a location's predictions and forecasts, read from the database"""
+    parts = []
+    for model in (WeatherPrediction, YearlyForecast):
+        state = model.objects.filter(location_id=location_id).aggregate(count=Count('id'), latest=Max('updated_at'))
+        latest = state['latest'].timestamp() if state['latest'] else 0
+        parts.append(f"{state['count']}-{latest:.6f}")
+    return ':'.join(parts)
+
+
+def yearly_series(location, years=None):
+    """Yearly series from monthly predictions as (years, {series: ndarray})
+
+    Only years with at least one prediction are included.
+    """
+    predictions = WeatherPrediction.objects.filter(location=location)
+    if years is not None:
+        predictions = predictions.filter(year__in=list(years))
+    rows = list(predictions.order_by('year').values_list(
+        'year', 'monthly_precipitation', 'avg_temperature', 'condition'
+    ))
+    if not rows:
+        return np.array([], dtype=int), {name: np.array([]) for name in TREND_SERIES}
+
+    year, precipitation, temperature, condition = (np.array(column) for column in zip(*rows))
+    found, index, counts = np.unique(year, return_inverse=True, return_counts=True)
+    totals = np.bincount(index, weights=precipitation.astype(float))
+    return found, {
+        'precipitation': totals,
+        'temperature': np.bincount(index, weights=temperature.astype(float)) / counts,
+        'drought_months': np.bincount(index, weights=np.isin(condition, DROUGHT_CONDITIONS)),
+        'flood_months': np.bincount(index, weights=np.isin(condition, FLOOD_CONDITIONS)),
+    }
+
+
+def ols_slopes(x, values):
+    """Least-squares slope of each row of `values` against x"""
+    dx = x - x.mean()
+    return (values - values.mean(axis=1, keepdims=True)) @ dx / (dx @ dx)
+
+
+def mann_kendall(values):
+    """Mann-Kendall S, Z and two-sided p-value for each row of `values`"""
+    n = values.shape[1]
+    i, j = np.triu_indices(n, k=1)
+    s = np.sign(values[:, j] - values[:, i]).sum(axis=1)
+
+    variance = np.full(len(values), n * (n - 1) * (2 * n + 5), dtype=float)
+    for row, series in enumerate(values):
+        _, ties = np.unique(series, return_counts=True)
+        ties = ties[ties > 1]
+        variance[row] -= (ties * (ties - 1) * (2 * ties + 5)).sum()
+    variance /= 18
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spread = np.sqrt(variance)
+        z = np.where(s > 0, (s - 1) / spread, np.where(s < 0, (s + 1) / spread, 0.0))
+    z = np.nan_to_num(z)
+    p = np.array([math.erfc(abs(value) / math.sqrt(2)) for value in z])
+    return s, z, p
+
+
+def sens_slopes(x, values):
+    """Median of pairwise slopes for each row of `values`"""
+    i, j = np.triu_indices(len(x), k=1)
+    return np.median((values[:, j] - values[:, i]) / (x[j] - x[i]), axis=1)
+
+
+def _label(p_value, slope):
+    if p_value >= SIGNIFICANCE or slope == 0:
+        return 'no significant trend'
+    return 'increasing' if slope > 0 else 'decreasing'
+
+
+def compute_trends(years, series):
+    """Trend statistics for yearly series; {} with fewer than two years"""
+    if len(years) < 2:
+        return {}
+    x = years.astype(float)
+    values = np.vstack([series[name] for name in TREND_SERIES])
+    ols = ols_slopes(x, values)
+    s, z, p = mann_kendall(values)
+    sen = sens_slopes(x, values)
+
+    statistics = {
+        name: {
+            'ols_slope_per_year': round(float(ols[row]), 4),
+            'sens_slope_per_year': round(float(sen[row]), 4),
+            'mann_kendall_s': int(s[row]),
+            'mann_kendall_z': round(float(z[row]), 4),
+            'p_value': round(float(p[row]), 4),
+            'trend': _label(p[row], sen[row] if sen[row] else ols[row]),
+        }
+        for row, name in enumerate(TREND_SERIES)
+    }
+
+    first, last = values[:, 0], values[:, -1]
+    precipitation_change = None
+    if first[0]:
+        precipitation_change = round(float((last[0] - first[0]) / first[0] * 100), 2)
+    return {
+        'first_year': int(years[0]),
+        'last_year': int(years[-1]),
+        'years_analyzed': len(years),
+        'precipitation_change_percent': precipitation_change,
+        'temperature_change_celsius': round(float(last[1] - first[1]), 2),
+        'precipitation_trend': statistics['precipitation']['trend'],
+        'temperature_trend': statistics['temperature']['trend'],
+        'drought_trend': statistics['drought_months']['trend'],
+        'flood_trend': statistics['flood_months']['trend'],
+        'statistics': statistics,
+    }
+
+
+def cached_for_location(name, location, years, compute):
+    """compute(), cached under the location's current data version and the years"""
+    selection = 'all' if years is None else hashlib.sha1(','.join(map(str, years)).encode()).hexdigest()
+    key = f'prediction:{name}:{location.pk}:{data_version(location.pk)}:{selection}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout=CACHE_TIMEOUT)
+    return value
+
+
+def location_trends(location, years=None):
+    """Cached trend statistics for a location over the given years (default: all)"""
+    years = None if years is None else sorted(set(years))
+    return cached_for_location(
+        'trends', location, years, lambda: compute_trends(*yearly_series(location, years))
+    )
@@ -1,13 +1,20 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WeatherDataViewSet, WeatherPredictionViewSet, YearlyForecastViewSet
+from .views import (
+    AlertViewSet, ClimatologyViewSet, LocationViewSet, WeatherDataViewSet, WeatherPredictionViewSet,
+    YearlyForecastViewSet, live_events,
+)
 
 router = DefaultRouter()
+router.register(r'locations', LocationViewSet, basename='locations')
 router.register(r'weather-data', WeatherDataViewSet, basename='weather-data')
 router.register(r'predictions', WeatherPredictionViewSet, basename='predictions')
 router.register(r'yearly-forecast', YearlyForecastViewSet, basename='yearly-forecast')
+router.register(r'climatology', ClimatologyViewSet, basename='climatology')
+router.register(r'alerts', AlertViewSet, basename='alerts')
 
 urlpatterns = [
+    path('events/', live_events, name='live-events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
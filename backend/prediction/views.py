@@ -1,20 +1,69 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from datetime import datetime
-from .models import WeatherData, WeatherPrediction, YearlyForecast
+from datetime import date, datetime
+import numpy as np
+from .models import Alert, Location, WeatherData, WeatherPrediction, YearlyForecast
+from .pagination import AlertFeedPagination
 from .serializers import (
-    WeatherDataSerializer, WeatherPredictionSerializer,
+    AlertSerializer, LocationSerializer, WeatherDataSerializer, WeatherPredictionSerializer,
     YearlyForecastSerializer, WeatherSyncSerializer,
-    MonthlyAnalysisSerializer, CurrentConditionsSerializer
+    MonthlyAnalysisSerializer, BatchAnalysisSerializer, CurrentConditionsSerializer
 )
 from .services import NASAPowerService, WeatherPredictionService
+from .climatology import CLIMATOLOGY_FIELDS, PERIOD_SLOTS, STATISTICS, ClimatologyService
+from .downsampling import ENVELOPE_FIELDS, downsample
+from .events import broadcaster, event_stream, parse_event_id
+from .snapshot import SNAPSHOT_FIELDS, WeatherSnapshot, mark_stale
+from .trends import cached_for_location, location_trends
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bounds for ?max_points on weather-data/series
+MIN_CHART_POINTS = 10
+MAX_CHART_POINTS = 10000
+CHART_CACHE_TIMEOUT = 60 * 60
+
+
+def requested_location(request):
+    """Location from ?location=<id>, defaulting to the county-wide point"""
+    location_id = request.query_params.get('location')
+    if not location_id:
+        return Location.get_default()
+    try:
+        return Location.objects.get(pk=int(location_id))
+    except ValueError:
+        raise ValidationError({'location': 'Must be a location id.'})
+    except Location.DoesNotExist:
+        raise NotFound(f'Location {location_id} does not exist.')
+
+
+class LocationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for weather locations.
+    Lists the points weather data is synced and analyzed for.
+    """
+    queryset = Location.objects.all()
+    serializer_class = LocationSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        """Filter locations by kind"""
+        queryset = Location.objects.all()
+
+        kind = self.request.query_params.get('kind', None)
+        if kind:
+            queryset = queryset.filter(kind=kind)
+
+        return queryset
+
 
 class WeatherDataViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -26,8 +75,8 @@ class WeatherDataViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        """Filter weather data by date range"""
-        queryset = WeatherData.objects.all()
+        """Filter weather data by location and date range"""
+        queryset = WeatherData.objects.filter(location=requested_location(self.request))
 
         start_date = self.request.query_params.get('start_date', None)
         end_date = self.request.query_params.get('end_date', None)
@@ -50,24 +99,26 @@ class WeatherDataViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Sync weather data from NASA POWER API
         POST /api/weather-data/sync/
-        Body: {"years": 5} or {"start_date": "2020-01-01", "end_date": "2024-12-31"}
+        Body: {"years": 5} or {"start_date": "2020-01-01", "end_date": "2024-12-31"},
+        optionally with "location": <id>
         """
         serializer = WeatherSyncSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         try:
-            service = NASAPowerService()
+            service = NASAPowerService(serializer.validated_data.get('location'))
 
             if 'start_date' in serializer.validated_data and 'end_date' in serializer.validated_data:
-                data = service.fetch_weather_data(
+                count = service.sync_range(
                     serializer.validated_data['start_date'],
                     serializer.validated_data['end_date']
                 )
-                count = service.store_weather_data(data) if data else 0
             else:
                 count = service.sync_historical_data(
                     years=serializer.validated_data.get('years', 5)
                 )
+            # The next scheduled ingest re-exports; until then this location is read from the database
+            mark_stale(service.location)
 
             return Response({
                 'status': 'success',
@@ -83,6 +134,116 @@ class WeatherDataViewSet(viewsets.ReadOnlyModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Daily series as columns for charts, read from the memory-mapped snapshot
+        GET /api/weather-data/series/?location=<id>&start_date=2020-01-01&end_date=2024-12-31
+        &fields=precipitation,temperature
+
+        With &max_points=N each field is downsampled server-side to at most N
+        points and returned with its own dates.
+        """
+        location = requested_location(request)
+        start_date = _query_date(request, 'start_date')
+        end_date = _query_date(request, 'end_date')
+        fields = request.query_params.get('fields')
+        fields = fields.split(',') if fields else ['precipitation', 'temperature', 'relative_humidity']
+        unknown = sorted(set(fields) - set(SNAPSHOT_FIELDS))
+        if unknown:
+            raise ValidationError({'fields': f'Unknown fields: {", ".join(unknown)}'})
+        max_points = _query_max_points(request)
+
+        snapshot = WeatherSnapshot.current()
+        series = snapshot.series(location, start_date, end_date, fields) if snapshot else None
+        source = 'snapshot'
+        if series is None:
+            series = _database_series(location, start_date, end_date, fields)
+            source = 'database'
+        dates, arrays = series
+
+        if max_points is None:
+            data = {
+                'dates': [day.isoformat() for day in dates],
+                'series': {field: _json_values(arrays[field]) for field in fields},
+            }
+        else:
+            data = {
+                'max_points': max_points,
+                'days': len(dates),
+                'series': {
+                    field: _downsampled_series(
+                        snapshot.version if source == 'snapshot' else None,
+                        location, dates, arrays[field], field, max_points,
+                    )
+                    for field in fields
+                },
+            }
+
+        return Response({
+            'status': 'success',
+            'data': {'location': location.pk, 'source': source, **data}
+        }, status=status.HTTP_200_OK)
+
+
+def _query_date(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'Expected a date as YYYY-MM-DD'})
+
+
+def _query_max_points(request):
+    value = request.query_params.get('max_points')
+    if not value:
+        return None
+    try:
+        max_points = int(value)
+    except ValueError:
+        raise ValidationError({'max_points': 'Must be an integer'})
+    if not MIN_CHART_POINTS <= max_points <= MAX_CHART_POINTS:
+        raise ValidationError({'max_points': f'Must be between {MIN_CHART_POINTS} and {MAX_CHART_POINTS}'})
+    return max_points
+
+
+def _downsampled_series(version, location, dates, values, field, max_points):
+    """{'method', 'dates', 'values'} for one field, cached per snapshot version
+
+    Series read from the database are not cached, as they have no version.
+    """
+    def compute():
+        envelope = field in ENVELOPE_FIELDS
+        kept = downsample(values, max_points, envelope=envelope)
+        return {
+            'method': 'minmax' if envelope else 'lttb',
+            'dates': [dates[i].isoformat() for i in kept],
+            'values': _json_values(np.asarray(values)[kept]),
+        }
+
+    if version is None or not dates:
+        return compute()
+    key = f'prediction:chart-series:{version}:{location.pk}:{dates[0]}:{dates[-1]}:{field}:{max_points}'
+    return cache.get_or_set(key, compute, timeout=CHART_CACHE_TIMEOUT)
+
+
+def _database_series(location, start_date, end_date, fields):
+    """Columnar (dates, arrays) straight from WeatherData when there is no snapshot"""
+    queryset = WeatherData.objects.filter(location=location)
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    columns = list(zip(*queryset.order_by('date').values_list('date', *fields))) or [[]] * (len(fields) + 1)
+    return list(columns[0]), {field: np.array(columns[i + 1], dtype=float) for i, field in enumerate(fields)}
+
+
+def _json_values(values):
+    return [None if np.isnan(value) else round(value, 3) for value in np.asarray(values, dtype=float).tolist()]
+
+
 class WeatherPredictionViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for weather predictions.
@@ -93,8 +254,8 @@ class WeatherPredictionViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        """Filter predictions by year, month, condition, severity"""
-        queryset = WeatherPrediction.objects.all()
+        """Filter predictions by location, year, month, condition, severity"""
+        queryset = WeatherPrediction.objects.filter(location=requested_location(self.request))
 
         year = self.request.query_params.get('year', None)
         month = self.request.query_params.get('month', None)
@@ -117,13 +278,15 @@ class WeatherPredictionViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Analyze weather conditions for a specific month
         POST /api/predictions/analyze_month/
-        Body: {"year": 2024, "month": 10}
+        Body: {"year": 2024, "month": 10}, optionally with "location": <id>
         """
         serializer = MonthlyAnalysisSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         try:
-            service = WeatherPredictionService()
+            service = WeatherPredictionService(
+                serializer.validated_data.get('location'), snapshot=WeatherSnapshot.current()
+            )
             prediction = service.analyze_monthly_conditions(
                 year=serializer.validated_data['year'],
                 month=serializer.validated_data['month']
@@ -147,20 +310,63 @@ class WeatherPredictionViewSet(viewsets.ReadOnlyModelViewSet):
                 'message': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'])
+    def analyze_months(self, request):
+        """
+        Analyze many months in one request
+        POST /api/predictions/analyze_months/
+        Body: {"start_date": "2020-01-01", "end_date": "2024-12-31"} or
+        {"months": [{"year": 2024, "month": 10}, ...]}, optionally with "location": <id>
+        """
+        serializer = BatchAnalysisSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            service = WeatherPredictionService(
+                serializer.validated_data.get('location'), snapshot=WeatherSnapshot.current()
+            )
+            predictions, errors = service.analyze_months(serializer.validated_data['pairs'])
+            errors = [
+                {'year': year, 'month': month, 'message': message}
+                for (year, month), message in errors.items()
+            ]
+
+            if not predictions:
+                return Response({
+                    'status': 'error',
+                    'message': 'No weather data available for the specified months',
+                    'errors': errors
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            return Response({
+                'status': 'success',
+                'data': WeatherPredictionSerializer(predictions, many=True).data,
+                'errors': errors
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error analyzing months: {e}")
+            return Response({
+                'status': 'error',
+                'message': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['get'])
     def current_conditions(self, request):
         """
         Get current month's weather conditions and alerts
-        GET /api/predictions/current_conditions/
+        GET /api/predictions/current_conditions/?location=<id>
         """
+        location = requested_location(request)
         try:
             now = timezone.now()
             current_year = now.year
             current_month = now.month
 
             # Try to get or create prediction for current month
-            service = WeatherPredictionService()
+            service = WeatherPredictionService(location, snapshot=WeatherSnapshot.current())
             prediction = WeatherPrediction.objects.filter(
+                location=location,
                 year=current_year,
                 month=current_month
             ).first()
@@ -216,6 +422,7 @@ class WeatherPredictionViewSet(viewsets.ReadOnlyModelViewSet):
         year = request.query_params.get('year', timezone.now().year)
 
         drought_predictions = WeatherPrediction.objects.filter(
+            location=requested_location(request),
             year=year,
             condition__in=['severe_drought', 'moderate_drought', 'mild_drought']
         )
@@ -236,6 +443,7 @@ class WeatherPredictionViewSet(viewsets.ReadOnlyModelViewSet):
         year = request.query_params.get('year', timezone.now().year)
 
         flood_predictions = WeatherPrediction.objects.filter(
+            location=requested_location(request),
             year=year,
             condition__in=['extreme_flood', 'severe_flood', 'moderate_flood']
         )
@@ -257,17 +465,22 @@ class YearlyForecastViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = YearlyForecastSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        """Forecasts for the requested location"""
+        return YearlyForecast.objects.filter(location=requested_location(self.request))
+
     @action(detail=False, methods=['post'])
     def generate_forecast(self, request):
         """
         Generate yearly forecast for a specific year
         POST /api/yearly-forecast/generate_forecast/
-        Body: {"year": 2024}
+        Body: {"year": 2024}, with ?location=<id> for a specific location
         """
         year = request.data.get('year', timezone.now().year)
+        location = requested_location(request)
 
         try:
-            service = WeatherPredictionService()
+            service = WeatherPredictionService(location)
             forecast = service.generate_yearly_forecast(year)
 
             if forecast:
@@ -295,12 +508,13 @@ class YearlyForecastViewSet(viewsets.ReadOnlyModelViewSet):
         GET /api/yearly-forecast/current_year/
         """
         current_year = timezone.now().year
+        location = requested_location(request)
 
-        forecast = YearlyForecast.objects.filter(year=current_year).first()
+        forecast = YearlyForecast.objects.filter(location=location, year=current_year).first()
 
         if not forecast:
             # Try to generate it
-            service = WeatherPredictionService()
+            service = WeatherPredictionService(location)
             forecast = service.generate_yearly_forecast(current_year)
 
         if forecast:
@@ -330,17 +544,11 @@ class YearlyForecastViewSet(viewsets.ReadOnlyModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            years = [int(y.strip()) for y in years_param.split(',')]
-            forecasts = YearlyForecast.objects.filter(year__in=years).order_by('year')
-
-            serializer = self.get_serializer(forecasts, many=True)
-
-            # Calculate comparison metrics
-            comparison = {
-                'years_compared': len(forecasts),
-                'forecasts': serializer.data,
-                'trends': self._calculate_trends(forecasts)
-            }
+            years = sorted({int(y.strip()) for y in years_param.split(',')})
+            location = requested_location(request)
+            comparison = cached_for_location(
+                'compare-years', location, years, lambda: self._compare(location, years)
+            )
 
             return Response({
                 'status': 'success',
@@ -353,24 +561,187 @@ class YearlyForecastViewSet(viewsets.ReadOnlyModelViewSet):
                 'message': 'Invalid year format. Please provide comma-separated years.'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-    def _calculate_trends(self, forecasts):
-        """Calculate trends across years"""
-        if len(forecasts) < 2:
-            return {}
+    def _compare(self, location, years):
+        forecasts = list(self.get_queryset().filter(year__in=years).order_by('year'))
 
-        first = forecasts.first()
-        last = forecasts.last()
+        # One query for every year's monthly predictions instead of one per forecast
+        monthly_predictions = {}
+        for prediction in WeatherPrediction.objects.filter(location=location, year__in=years):
+            monthly_predictions.setdefault((prediction.location_id, prediction.year), []).append(prediction)
+        serializer = self.get_serializer(forecasts, many=True, context={
+            **self.get_serializer_context(), 'monthly_predictions': monthly_predictions
+        })
 
-        precip_change = ((last.total_precipitation - first.total_precipitation) /
-                        first.total_precipitation * 100)
-        temp_change = last.avg_temperature - first.avg_temperature
+        # Calculate comparison metrics
+        return {
+            'years_compared': len(forecasts),
+            'forecasts': serializer.data,
+            'trends': location_trends(location, [forecast.year for forecast in forecasts])
+        }
 
-        drought_trend = 'increasing' if last.drought_months > first.drought_months else 'decreasing'
-        flood_trend = 'increasing' if last.flood_risk_months > first.flood_risk_months else 'decreasing'
+    @action(detail=False, methods=['get'])
+    def trends(self, request):
+        """
+        Trend statistics over monthly predictions
+        GET /api/yearly-forecast/trends/?start_year=1985&end_year=2024
+        """
+        try:
+            start_year = request.query_params.get('start_year')
+            end_year = request.query_params.get('end_year')
+            years = None
+            if start_year or end_year:
+                years = range(int(start_year or 1981), int(end_year or timezone.now().year) + 1)
+        except ValueError:
+            return Response({
+                'status': 'error',
+                'message': 'start_year and end_year must be years.'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        return {
-            'precipitation_change_percent': round(precip_change, 2),
-            'temperature_change_celsius': round(temp_change, 2),
-            'drought_trend': drought_trend,
-            'flood_trend': flood_trend
-        }
\ No newline at end of file
+        return Response({
+            'status': 'success',
+            'data': location_trends(requested_location(request), years)
+        }, status=status.HTTP_200_OK)
+
+
+class ClimatologyViewSet(viewsets.ViewSet):
+    """
+    ViewSet for long-term climatology normals.
+    Serves precomputed daily and monthly normals from memory.
+    """
+    permission_classes = [AllowAny]
+
+    def list(self, request):
+        """
+        Normals, standard deviations and p10/p50/p90 bands per parameter
+        GET /api/climatology/?location=<id>&period=month&parameters=precipitation,temperature
+        """
+        location = requested_location(request)
+        period = request.query_params.get('period', 'month')
+        if period not in PERIOD_SLOTS:
+            raise ValidationError({'period': 'Expected "day" or "month"'})
+        parameters = _climatology_parameters(request)
+
+        normals = ClimatologyService(location).normals()
+        if not normals:
+            return Response({
+                'status': 'error',
+                'message': 'No climatology available for this location. Please sync weather data.'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'status': 'success',
+            'data': {
+                'location': location.pk,
+                'period': period,
+                'base_period': settings.CLIMATOLOGY['base_period'],
+                'normals': {
+                    parameter: dict(zip(STATISTICS, map(_json_values, normals[(parameter, period)])))
+                    for parameter in parameters if (parameter, period) in normals
+                },
+            }
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """
+        A month's observed values against its normals
+        GET /api/climatology/compare/?location=<id>&year=2024&month=10
+        """
+        location = requested_location(request)
+        try:
+            year = int(request.query_params.get('year', timezone.now().year))
+            month = int(request.query_params.get('month', timezone.now().month))
+        except ValueError:
+            raise ValidationError({'detail': 'year and month must be integers'})
+        if not 1 <= month <= 12:
+            raise ValidationError({'month': 'Expected a month from 1 to 12'})
+        parameters = _climatology_parameters(request)
+
+        comparison = ClimatologyService(location, snapshot=WeatherSnapshot.current()).month_vs_normal(year, month)
+        if not comparison:
+            return Response({
+                'status': 'error',
+                'message': 'No climatology available for this location. Please sync weather data.'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'status': 'success',
+            'data': {
+                'location': location.pk,
+                'year': year,
+                'month': month,
+                'parameters': {
+                    parameter: comparison[parameter] for parameter in parameters if parameter in comparison
+                },
+            }
+        }, status=status.HTTP_200_OK)
+
+
+def _climatology_parameters(request):
+    parameters = request.query_params.get('parameters')
+    parameters = parameters.split(',') if parameters else CLIMATOLOGY_FIELDS
+    unknown = sorted(set(parameters) - set(CLIMATOLOGY_FIELDS))
+    if unknown:
+        raise ValidationError({'parameters': f'Unknown parameters: {", ".join(unknown)}'})
+    return parameters
+
+
+class AlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for the threshold alert feed.
+    Alerts are raised while ingesting data; the newest raised or extended come first.
+    """
+    serializer_class = AlertSerializer
+    permission_classes = [AllowAny]
+    pagination_class = AlertFeedPagination
+
+    def get_queryset(self):
+        """
+        Filter alerts by location, rule, severity and last day
+        GET /api/alerts/?location=<id>&severity=critical&since=2024-10-01
+        """
+        queryset = Alert.objects.select_related('location')
+
+        location = self.request.query_params.get('location')
+        rule = self.request.query_params.get('rule')
+        severity = self.request.query_params.get('severity')
+        since = _query_date(self.request, 'since')
+
+        if location:
+            queryset = queryset.filter(location=requested_location(self.request))
+        if rule:
+            queryset = queryset.filter(rule=rule)
+        if severity:
+            queryset = queryset.filter(severity=severity)
+        if since:
+            queryset = queryset.filter(end_date__gte=since)
+
+        return queryset
+
+
+async def live_events(request):
+    """
+    Server-Sent Events stream of new alerts, condition changes and completed syncs
+    GET /api/events/ (optionally ?location=<id>), served under ASGI
+    Reconnecting browsers send Last-Event-ID and receive the events they missed.
+    """
+    config = settings.EVENT_STREAM
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    location_id = request.GET.get('location')
+    try:
+        last_event_id = parse_event_id(last_event_id) if last_event_id else None
+        location_id = int(location_id) if location_id else None
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Last-Event-ID must be an event id and location an integer.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    client = await broadcaster().subscribe(last_event_id, location_id)
+    response = StreamingHttpResponse(
+        event_stream(client, config['heartbeat_seconds'], config['retry_ms']),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response